@@ -0,0 +1,405 @@
+"""
+API JSON locale (asyncio, sans dépendance) exposant le moteur et les presets.
+
+    python api.py --port 8765
+
+    GET  /health
+    GET  /model      clés d'inputs / outputs, valeurs par défaut
+    GET  /presets    SCENARIOS_PRESETS et PRESETS_BY_DATE
+    GET  /metrics    latences p50 / p95 / p99 par route, débit, taille des batchs
+    POST /evaluate   {"scenarios": [{...}, ...]}  ou  {"columns": {"revenu_pct": [...], ...}}
+
+Les inputs absents prennent DEFAULT_INPUTS (comme cli.py), la tenure du coût de
+liquidité (duree_liquidite_jours) 10 jours ; une tenure donnée sans coût de liquidité
+est chiffrée sur la courbe de taux (--curve, sinon DEFAULT_CURVE). Les petites
+requêtes concurrentes sont regroupées (coalescing) en une seule évaluation
+vectorisée : on attend au plus --max-wait-ms ou --max-batch-rows lignes. Les
+grosses requêtes (>= --direct-rows) sont évaluées seules.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from typing import Mapping, Optional
+
+import numpy as np
+
+from engine import INPUT_KEYS, OUTPUT_KEYS, TENURE_KEY, compute_metrics
+from presets import DEFAULT_INPUTS, PRESETS_BY_DATE, SCENARIOS_PRESETS
+from termstructure import TermStructure, price_liquidity
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_WAIT_MS = 2.0
+DEFAULT_MAX_BATCH_ROWS = 65_536
+DEFAULT_DIRECT_ROWS = 4_096
+MAX_BODY_BYTES = 64 * 1024 * 1024
+LATENCY_WINDOW = 10_000
+
+# colonnes évaluées : les 8 inputs + la tenure du coût de liquidité (optionnelle)
+EVAL_KEYS = INPUT_KEYS + (TENURE_KEY,)
+LIQUIDITY_KEY = "cout_liquidite_10j_pct"
+# coût et tenure restent NaN s'ils manquent, le temps de chiffrer le coût sur la courbe
+_PARSE_DEFAULTS = {**DEFAULT_INPUTS, LIQUIDITY_KEY: np.nan, TENURE_KEY: np.nan}
+
+ROUTES = ("/evaluate", "/health", "/model", "/presets", "/metrics")
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# --------------------------------------------------
+# ENTRÉES / SORTIES
+# --------------------------------------------------
+def parse_scenarios(payload, curve: Optional[TermStructure] = None) -> tuple:
+    """Corps JSON -> (colonnes {clé: array}, noms ou None, format de réponse "records" | "columns")."""
+    if not isinstance(payload, Mapping):
+        raise ApiError(400, "Le corps doit être un objet JSON.")
+    try:
+        if "columns" in payload:
+            columns = payload["columns"]
+            sizes = {len(v) for v in columns.values()}
+            if len(sizes) > 1:
+                raise ApiError(400, "Toutes les colonnes doivent avoir la même longueur.")
+            n = sizes.pop() if sizes else 0
+            cols = {
+                k: np.asarray(columns[k], dtype=np.float64) if k in columns else np.full(n, float(_PARSE_DEFAULTS[k]))
+                for k in EVAL_KEYS
+            }
+            for k, v in cols.items():
+                if v.ndim != 1:
+                    raise ApiError(400, f"Colonne {k}: liste de nombres attendue (1 dimension).")
+            _check_finite(cols, columns)
+            return _price_liquidity(cols, curve), columns.get("name"), "columns"
+
+        records = payload.get("scenarios", [payload] if any(k in payload for k in INPUT_KEYS) else None)
+        if not isinstance(records, list):
+            raise ApiError(400, "Attendu: {\"scenarios\": [...]} ou {\"columns\": {...}}.")
+        cols = {
+            k: np.fromiter((_record_value(r, k) for r in records), dtype=np.float64, count=len(records))
+            for k in EVAL_KEYS
+        }
+        _check_finite(cols, {k for r in records for k in r})
+        names = [r.get("name") for r in records] if any("name" in r for r in records) else None
+        return _price_liquidity(cols, curve), names, "records"
+    except (TypeError, ValueError, AttributeError) as e:
+        raise ApiError(400, f"Scénarios invalides: {e}") from e
+
+
+def _record_value(record: Mapping, k: str) -> float:
+    """Valeur d'un scénario "records" (null -> NaN, rejeté ensuite par _check_finite)."""
+    v = record.get(k, _PARSE_DEFAULTS[k])
+    return np.nan if v is None else float(v)
+
+
+def _check_finite(cols: dict, given) -> None:
+    """ApiError 400 si une valeur envoyée (clé dans `given`) n'est pas finie : null, NaN ou ±inf."""
+    for k in EVAL_KEYS:
+        if k in given and not np.isfinite(cols[k]).all():
+            rows = np.flatnonzero(~np.isfinite(cols[k]))
+            raise ApiError(400, f"Colonne {k}: valeur non finie (null, NaN ou inf) à l'index {', '.join(map(str, rows[:10]))}.")
+
+
+def _price_liquidity(cols: dict, curve: Optional[TermStructure]) -> dict:
+    """Tenure sans coût -> coût lu sur la courbe ; puis coût / tenure absents -> DEFAULT_INPUTS. ValueError si tenure <= 0."""
+    cols[LIQUIDITY_KEY] = price_liquidity(cols[LIQUIDITY_KEY], cols[TENURE_KEY], curve)
+    for k in (LIQUIDITY_KEY, TENURE_KEY):
+        cols[k] = np.where(np.isnan(cols[k]), float(DEFAULT_INPUTS[k]), cols[k])
+    return cols
+
+
+def _content_length(headers: Mapping) -> int:
+    """Content-Length de la requête (0 si absent) ; ApiError 400 s'il n'est pas un entier >= 0."""
+    raw = headers.get("content-length", "") or "0"
+    try:
+        length = int(raw)
+    except ValueError:
+        raise ApiError(400, f"Content-Length invalide: {raw!r}") from None
+    if length < 0:
+        raise ApiError(400, f"Content-Length invalide: {raw!r}")
+    return length
+
+
+def format_results(outputs: Mapping, names, fmt: str) -> dict:
+    if fmt == "columns":
+        out = {k: outputs[k].tolist() for k in OUTPUT_KEYS}
+        if names is not None:
+            out["name"] = list(names)
+        return {"columns": out}
+    lists = [outputs[k].tolist() for k in OUTPUT_KEYS]
+    rows = [dict(zip(OUTPUT_KEYS, values)) for values in zip(*lists)]
+    if names is not None:
+        for row, name in zip(rows, names):
+            row["name"] = name
+    return {"results": rows}
+
+
+def evaluate_columns(cols: Mapping) -> dict:
+    out = compute_metrics(*(cols[k] for k in INPUT_KEYS), duree_liquidite_jours=cols[TENURE_KEY])
+    return {k: np.atleast_1d(v) for k, v in out.items()}
+
+
+# --------------------------------------------------
+# COALESCING
+# --------------------------------------------------
+class Batcher:
+    """
+    File des petites requêtes : une tâche de fond les concatène et les évalue en
+    une passe (dans un thread), puis redécoupe les résultats. Pendant une
+    évaluation, les nouvelles requêtes s'accumulent pour le batch suivant.
+    """
+
+    def __init__(self, max_wait_ms: float = DEFAULT_MAX_WAIT_MS, max_batch_rows: int = DEFAULT_MAX_BATCH_ROWS):
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_rows = max_batch_rows
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.batches = 0
+        self.batched_requests = 0
+        self.batched_rows = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, cols: Mapping) -> dict:
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((cols, fut))
+        return await fut
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            rows = len(items[0][0][INPUT_KEYS[0]])
+            deadline = loop.time() + self.max_wait
+            while rows < self.max_batch_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                rows += len(item[0][INPUT_KEYS[0]])
+
+            try:
+                sizes = [len(cols[INPUT_KEYS[0]]) for cols, _ in items]
+                merged = {k: np.concatenate([cols[k] for cols, _ in items]) for k in EVAL_KEYS}
+                out = await loop.run_in_executor(None, evaluate_columns, merged)
+                bounds = np.cumsum([0] + sizes)
+                parts = [{k: v[lo:hi] for k, v in out.items()} for lo, hi in zip(bounds[:-1], bounds[1:])]
+            except Exception as e:  # l'erreur est rendue à chaque requête du batch, la boucle continue
+                for _, fut in items:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut), part in zip(items, parts):
+                if not fut.done():
+                    fut.set_result(part)
+            self.batches += 1
+            self.batched_requests += len(items)
+            self.batched_rows += rows
+
+
+# --------------------------------------------------
+# MÉTRIQUES
+# --------------------------------------------------
+class ApiMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.latencies = {}
+        self.counts = {}
+        self.errors = 0
+        self.scenarios = 0
+        self.recent = deque(maxlen=LATENCY_WINDOW)  # (instant, nb scénarios)
+
+    def record(self, route: str, seconds: float, status: int, n_scenarios: int = 0) -> None:
+        self.latencies.setdefault(route, deque(maxlen=LATENCY_WINDOW)).append(seconds * 1e3)
+        self.counts[route] = self.counts.get(route, 0) + 1
+        self.errors += status >= 400
+        if n_scenarios:
+            self.scenarios += n_scenarios
+            self.recent.append((time.perf_counter(), n_scenarios))
+
+    def snapshot(self, batcher: Batcher) -> dict:
+        now = time.perf_counter()
+        uptime = now - self.started
+        last_minute = sum(n for t, n in self.recent if now - t <= 60)
+        routes = {}
+        for route, samples in self.latencies.items():
+            arr = np.fromiter(samples, dtype=np.float64)
+            p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+            routes[route] = {"count": self.counts[route], "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+        return {
+            "uptime_s": uptime,
+            "errors": self.errors,
+            "scenarios_total": self.scenarios,
+            "scenarios_per_s": self.scenarios / uptime if uptime else 0.0,
+            "scenarios_per_s_last_minute": last_minute / min(60.0, uptime) if uptime else 0.0,
+            "routes": routes,
+            "coalescing": {
+                "batches": batcher.batches,
+                "requests": batcher.batched_requests,
+                "rows": batcher.batched_rows,
+                "avg_requests_per_batch": batcher.batched_requests / batcher.batches if batcher.batches else 0.0,
+            },
+        }
+
+
+# --------------------------------------------------
+# SERVEUR
+# --------------------------------------------------
+class ApiServer:
+    def __init__(
+        self,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        max_batch_rows: int = DEFAULT_MAX_BATCH_ROWS,
+        direct_rows: int = DEFAULT_DIRECT_ROWS,
+        curve: Optional[TermStructure] = None,
+    ):
+        self.batcher = Batcher(max_wait_ms, max_batch_rows)
+        self.direct_rows = direct_rows
+        self.curve = curve
+        self.metrics = ApiMetrics()
+        self.sockets = None
+
+    async def evaluate(self, payload) -> tuple:
+        cols, names, fmt = parse_scenarios(payload, self.curve)
+        n = len(cols[INPUT_KEYS[0]])
+        if n >= self.direct_rows:
+            out = await asyncio.get_running_loop().run_in_executor(None, evaluate_columns, cols)
+        else:
+            out = await self.batcher.submit(cols)
+        return format_results(out, names, fmt), n
+
+    async def route(self, method: str, path: str, body: bytes) -> tuple:
+        """-> (status, objet JSON, nb de scénarios évalués)."""
+        if path == "/evaluate":
+            if method != "POST":
+                raise ApiError(405, "POST attendu.")
+            try:
+                payload = json.loads(body or b"null")
+            except ValueError as e:
+                raise ApiError(400, f"JSON invalide: {e}") from e
+            result, n = await self.evaluate(payload)
+            return 200, result, n
+        if method != "GET":
+            raise ApiError(405, "GET attendu.")
+        if path == "/health":
+            return 200, {"status": "ok"}, 0
+        if path == "/model":
+            return 200, {"inputs": list(EVAL_KEYS), "outputs": list(OUTPUT_KEYS), "defaults": DEFAULT_INPUTS}, 0
+        if path == "/presets":
+            return 200, {"scenarios": SCENARIOS_PRESETS, "by_date": {d.isoformat(): p for d, p in PRESETS_BY_DATE.items()}}, 0
+        if path == "/metrics":
+            return 200, self.metrics.snapshot(self.batcher), 0
+        raise ApiError(404, f"Route inconnue: {path}")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Une connexion HTTP/1.1 (keep-alive), requêtes traitées l'une après l'autre."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                t0 = time.perf_counter()
+                path = target.split("?", 1)[0]
+                n = 0
+                body = None  # non lu (longueur invalide ou trop grande) : la connexion est fermée après la réponse
+                try:
+                    length = _content_length(headers)
+                    if length > MAX_BODY_BYTES:
+                        raise ApiError(413, f"Corps limité à {MAX_BODY_BYTES // 2**20} Mo.")
+                    body = await reader.readexactly(length) if length else b""
+                    status, obj, n = await self.route(method.upper(), path, body)
+                except ApiError as e:
+                    status, obj = e.status, {"error": str(e)}
+                except Exception as e:  # noqa: BLE001 - une requête ne doit pas tuer le serveur
+                    status, obj = 500, {"error": f"{type(e).__name__}: {e}"}
+
+                data = json.dumps(obj).encode()
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1" and body is not None
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    ).encode()
+                    + data
+                )
+                await writer.drain()
+                # hors ROUTES, une seule série (quel que soit le statut) : le nombre de séries de latence reste borné
+                route = f"{method.upper()} {path}" if path in ROUTES and method.upper() in ("GET", "POST") else "other"
+                self.metrics.record(route, time.perf_counter() - t0, status, n)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int, ready: Optional[asyncio.Event] = None) -> None:
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle, host, port)
+        self.sockets = server.sockets
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+# --------------------------------------------------
+# MAIN
+# --------------------------------------------------
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="API JSON locale du modèle unit economics Waribei.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS, help="Attente max pour regrouper les petites requêtes")
+    parser.add_argument("--max-batch-rows", type=int, default=DEFAULT_MAX_BATCH_ROWS, help="Lignes max par évaluation regroupée")
+    parser.add_argument("--direct-rows", type=int, default=DEFAULT_DIRECT_ROWS, help="Au-delà, la requête est évaluée seule")
+    parser.add_argument("--curve", help="Courbe de taux CSV (tenure_days, taux_annuel_pct) ; défaut: DEFAULT_CURVE")
+    args = parser.parse_args(argv)
+
+    curve = TermStructure.from_csv(args.curve) if args.curve else None
+    server = ApiServer(args.max_wait_ms, args.max_batch_rows, args.direct_rows, curve)
+    print(f"API Waribei sur http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
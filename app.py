@@ -1,104 +1,34 @@
+import importlib.util
+import io
+import os
+import sys
+import uuid
+
 import streamlit as st
-import pandas as pd
-import altair as alt
 from datetime import date
 
+# numpy / pandas / altair et les modules de calcul sont importés dans la page
+# Simulateur (plus bas) : la page de documentation n'en a pas besoin.
+from presets import (
+    DEFAULT_DATE,
+    DEFAULT_INPUTS,
+    HISTORY_DATES,
+    PRESET_PCT_KEYS,
+    PRESETS_BY_DATE,
+    SCENARIOS_PRESETS,
+)
+from profiling import RerunProfiler
+
 # --------------------------------------------------
 # CONFIG
 # --------------------------------------------------
 st.set_page_config(page_title="Waribei – Unit Economics", layout="wide")
-DUREE_PERIODE_LIQUIDITE_JOURS = 10
-
-# --------------------------------------------------
-# PRESETS (historique + défaut)
-# --------------------------------------------------
-PRESETS_BY_DATE = {
-    date(2025, 6, 1): {
-        "name": "Historique – Jun 2025",
-        "revenu_pct": 3.73,
-        "cout_paiement_pct": 1.75,
-        "cout_liquidite_10j_pct": 0.21,
-        "defaut_30j_pct": 1.43,
-    },
-    date(2025, 12, 1): {
-        "name": "Historique – Dec 2025",
-        "revenu_pct": 3.76,
-        "cout_paiement_pct": 1.80,
-        "cout_liquidite_10j_pct": 0.36,
-        "defaut_30j_pct": 1.00,
-    },
-    date(2026, 6, 1): {
-        "name": "Default – Jun 2026",
-        "revenu_pct": 3.80,
-        "cout_paiement_pct": 1.20,
-        "cout_liquidite_10j_pct": 0.40,
-        "defaut_30j_pct": 1.00,
-    },
-}
-DEFAULT_DATE = date(2026, 6, 1)
 
-HISTORY_DATES = [date(2025, 6, 1), date(2025, 12, 1), date(2026, 6, 1)]
-
-# --------------------------------------------------
-# SCÉNARIOS RAPIDES (hard-coded)
-# --------------------------------------------------
-SCENARIOS_PRESETS = {
-    "Custom": None,
-
-    "Base scénario — Aujourd’hui": {
-        "revenu_pct": 3.80,
-        "cout_paiement_pct": 1.60,
-        "cout_liquidite_10j_pct": 0.40,
-        "defaut_30j_pct": 1.00,
-        "loan_book_k": 800.0,
-        "cycles_per_month": 2.9,
-        # optionnel: si tu veux aussi pré-remplir
-        "scenario_name_autofill": "Base scénario — Aujourd’hui",
-    },
-
-    "Scénario 1 — Optimisation légère": {
-        "revenu_pct": 3.80,
-        "cout_paiement_pct": 1.20,
-        "cout_liquidite_10j_pct": 0.40,
-        "defaut_30j_pct": 1.00,
-        "loan_book_k": 530.0,
-        "cycles_per_month": 2.9,
-        "scenario_name_autofill": "Scénario 1 — Optimisation légère",
-    },
-
-    "Scénario 2 — Open Banking": {
-        "revenu_pct": 3.80,
-        "cout_paiement_pct": 0.50,
-        "cout_liquidite_10j_pct": 0.40,
-        "defaut_30j_pct": 0.62,
-        "loan_book_k": 280.0,
-        "cycles_per_month": 3.0,
-        "scenario_name_autofill": "Scénario 2 — Open Banking",
-    },
-
-    "Scénario 3 — Tenure 15j + OB": {
-        "revenu_pct": 4.00,
-        "cout_paiement_pct": 0.50,
-        # NOTE: tu as mis 0.50% ici (vs 0.40% dans les autres) -> je respecte ton tableau.
-        # Si tu veux modéliser le 15j proprement, il faudrait ajuster via DUREE_PERIODE_LIQUIDITE_JOURS.
-        "cout_liquidite_10j_pct": 0.50,
-        "defaut_30j_pct": 0.65,
-        "loan_book_k": 290.0,
-        "cycles_per_month": 2.7,
-        "scenario_name_autofill": "Scénario 3 — Tenure 15j + OB",
-    },
-
-    "Scénario Seed": {
-        "revenu_pct": 3.77,
-        "cout_paiement_pct": 1.38,
-        "cout_liquidite_10j_pct": 0.34,
-        "defaut_30j_pct": 1.26,
-        # ton tableau n’a pas donné loan_book/cycles pour Seed -> je laisse volontairement inchangé
-        "loan_book_k": 294.0,
-        "cycles_per_month": 3.3,
-        "scenario_name_autofill": "Scénario Seed",
-    },
-}
+# Profilage opt-in (sidebar ou ?profile=1) : temps par section de ce rerun
+if "profiler" not in st.session_state:
+    st.session_state.profiler = RerunProfiler()
+prof = st.session_state.profiler
+prof.start(enabled=st.session_state.get("profiling_enabled", False) or st.query_params.get("profile") == "1")
 
 
 def apply_scenario_preset(name: str):
@@ -115,8 +45,11 @@ def apply_scenario_preset(name: str):
         "defaut_30j_pct",
         "loan_book_k",
         "cycles_per_month",
+        "duree_liquidite_jours",
         "scenario_name_autofill",
     }
+    # tenure absente du preset -> tenure de référence (sinon celle du preset précédent resterait)
+    st.session_state["duree_liquidite_jours"] = DEFAULT_INPUTS["duree_liquidite_jours"]
 
     for k, v in preset.items():
         if k not in allowed:
@@ -127,133 +60,94 @@ def apply_scenario_preset(name: str):
 # --------------------------------------------------
 # SESSION STATE
 # --------------------------------------------------
-if "scenarios" not in st.session_state:
-    st.session_state.scenarios = []
 if "baseline" not in st.session_state:
     st.session_state.baseline = None
 if "scenario_date" not in st.session_state:
     st.session_state.scenario_date = DEFAULT_DATE
 if "last_loaded_date" not in st.session_state:
     st.session_state.last_loaded_date = None
+# identifiant de session : « abonné » des jobs en arrière-plan (jobs.py)
+if "session_uid" not in st.session_state:
+    st.session_state.session_uid = uuid.uuid4().hex
 
-for k, default_val in [
-    ("revenu_pct", 3.8),
-    ("cout_paiement_pct", 1.8),
-    ("cout_liquidite_10j_pct", 0.55),
-    ("defaut_30j_pct", 1.7),
-    ("cycles_per_month", 2.9),
-    ("loan_book_k", 300.0),
-    ("avg_loan_value_eur", 300.0),
-    ("tx_per_client_per_month", 2.9),
-]:
+for k, default_val in DEFAULT_INPUTS.items():
     if k not in st.session_state:
         st.session_state[k] = default_val
 
 
+def all_presets_by_date() -> dict:
+    """Presets hard-codés + presets dérivés d'un ledger ingéré (le ledger est prioritaire)."""
+    return {**PRESETS_BY_DATE, **st.session_state.get("ledger_presets", {})}
+
+
 def apply_preset_for_date(d: date, force: bool = False):
-    if d not in PRESETS_BY_DATE:
+    presets = all_presets_by_date()
+    if d not in presets:
         return
     if (not force) and (st.session_state.last_loaded_date == d):
         return
 
-    p = PRESETS_BY_DATE[d]
+    p = presets[d]
     st.session_state["revenu_pct"] = float(p["revenu_pct"])
     st.session_state["cout_paiement_pct"] = float(p["cout_paiement_pct"])
     st.session_state["cout_liquidite_10j_pct"] = float(p["cout_liquidite_10j_pct"])
     st.session_state["defaut_30j_pct"] = float(p["defaut_30j_pct"])
+    # presets par date (et ledger) ramenés à la tenure de référence
+    st.session_state["duree_liquidite_jours"] = DEFAULT_INPUTS["duree_liquidite_jours"]
     st.session_state["scenario_name_autofill"] = p.get("name", f"Preset – {d.isoformat()}")
     st.session_state.last_loaded_date = d
 
 
-# Seed historique (uniquement les dates demandées)
-if "seeded_history" not in st.session_state:
-    st.session_state.seeded_history = False
-
-if not st.session_state.seeded_history:
-    for d in HISTORY_DATES:
-        p = PRESETS_BY_DATE[d]
-        # on stocke aussi contribution_margin_pct pour simplifier la courbe
-        cm = p["revenu_pct"] - (p["cout_paiement_pct"] + p["cout_liquidite_10j_pct"] + p["defaut_30j_pct"])
-        st.session_state.scenarios.append(
-            {
-                "date": d,
-                "name": p["name"],
-                "contribution_margin_pct": cm,
-            }
-        )
-    st.session_state.seeded_history = True
+def on_scenario_picked():
+    apply_scenario_preset(st.session_state["scenario_choice"])
+
+
+def on_date_picked():
+    st.session_state["scenario_date"] = st.session_state["date_picker"]
+    apply_preset_for_date(st.session_state["scenario_date"], force=False)
+
+
+def on_today_clicked():
+    st.session_state["scenario_date"] = DEFAULT_DATE
+    st.session_state["date_picker"] = DEFAULT_DATE
+    apply_preset_for_date(DEFAULT_DATE, force=True)
+
+
+# Seed historique (uniquement les dates demandées) — une fois par process, dans la base partagée
+# (appelé depuis la page Simulateur, seule à lire la base)
+@st.cache_resource(show_spinner=False)
+def seed_history_store():
+    seed_if_missing(
+        # les presets historiques n'ont que les 4 % -> volumes par défaut
+        {**DEFAULT_INPUTS, **{k: PRESETS_BY_DATE[d][k] for k in PRESET_PCT_KEYS}, "date": d, "name": PRESETS_BY_DATE[d]["name"]}
+        for d in HISTORY_DATES
+    )
+    return True
+
 
 apply_preset_for_date(st.session_state.scenario_date, force=False)
 
+prof.lap("session_state")
+
 # --------------------------------------------------
-# GLOBAL CSS
+# ASSETS STATIQUES (lus une fois par process, partagés entre sessions)
 # --------------------------------------------------
-st.markdown(
-    """
-<style>
-div.block-container { padding-top: 1.2rem; }
-h1, h2, h3 { letter-spacing: -0.02em; }
-
-.wb-card {
-  border: 1px solid rgba(0,0,0,0.10);
-  border-radius: 14px;
-  padding: 14px 14px 12px 14px;
-  background: rgba(255,255,255,0.70);
-}
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+LOGO_PATH = "logo_waribei_icon@2x.png"
+
+
+@st.cache_resource(show_spinner=False)
+def static_assets() -> dict:
+    with open(os.path.join(ASSETS_DIR, "style.css"), "r", encoding="utf-8") as f:
+        css = f"<style>\n{f.read()}</style>"
+    try:
+        with open(LOGO_PATH, "rb") as f:
+            logo = f.read()
+    except OSError:
+        logo = None
+    return {"css": css, "logo": logo}
+
 
-/* Vertical bar */
-.vbar-wrap { display:flex; align-items:center; gap:12px; }
-.vbar {
-  height: 168px;
-  width: 16px;
-  border-radius: 14px;
-  border: 1px solid rgba(0,0,0,0.18);
-  background: rgba(0,0,0,0.06);
-  position: relative;
-  overflow: hidden;
-}
-.vbar-fill {
-  position:absolute;
-  bottom:0;
-  left:0;
-  width:100%;
-  border-radius: 14px;
-}
-.vbar-metric { display:flex; flex-direction:column; gap:2px; }
-.vbar-metric .big { font-size: 22px; font-weight: 800; line-height: 1; }
-.vbar-metric .sub { font-size: 12px; opacity: 0.7; }
-
-/* Simple knob like sketch */
-.knob-wrap { display:flex; align-items:center; gap:12px; }
-.knob-shell { width: 110px; height: 110px; position: relative; }
-.knob-ring {
-  width: 90px; height: 90px;
-  border-radius: 50%;
-  border: 3px solid rgba(0,0,0,0.55);
-  position:absolute; left:10px; top:10px;
-  background: rgba(255,255,255,0.15);
-}
-.knob-ticks {
-  position:absolute; inset:0;
-  border-radius: 50%;
-  border: 6px dotted rgba(0,0,0,0.25);
-  clip-path: inset(0 0 0 0 round 50%);
-  opacity: 0.9;
-}
-.knob-needle {
-  position:absolute;
-  width: 6px; height: 44px;
-  background: rgba(6,76,114,0.95);
-  left: 52px; top: 14px;
-  transform-origin: 50% 85%;
-  border-radius: 4px;
-  box-shadow: 0 0 0 1px rgba(0,0,0,0.08);
-}
-.small-label { font-size: 12px; opacity: 0.7; margin-top: 4px; }
-</style>
-""",
-    unsafe_allow_html=True,
-)
 
 
 def _clamp(x, lo, hi):
@@ -332,47 +226,1206 @@ def knob_simple_visual(label: str, value: float, vmin: float, vmax: float, value
     )
 
 
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_sweep_grid(metric: str, x_key: str, y_key: str, fixed: tuple, n: int):
+    """Surface de sensibilité mise en cache (LRU 32 entrées), clé = axes + inputs figés utiles."""
+    return sweep_grid(metric, x_key, y_key, fixed, n)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_tornado(base: tuple, pct: float):
+    """Tornado mis en cache : recalculé seulement si le point courant (8 inputs) ou ±X% change."""
+    return tornado(dict(zip(INPUT_KEYS, base)), pct)
+
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def cached_term_structure(curve: tuple) -> "TermStructure":
+    """Courbe interpolée (grille journalière) construite une fois par table, partagée entre sessions."""
+    return TermStructure(dict(curve))
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def cached_roll_rates(csv_bytes: bytes):
+    """Matrices par vintage estimées depuis un CSV de statuts (une fois par fichier)."""
+    return estimate_roll_rates(pd.read_csv(io.BytesIO(csv_bytes)))
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def cached_backtest(daily: "pd.DataFrame", windows: tuple):
+    bt = backtest(daily, windows)
+    return bt, error_summary(bt, windows)
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def cached_saved_history(version: tuple):
+    """Dernier SAVE par date, en colonnes (t, y) ; relu seulement quand la base change."""
+    df_hist = latest_per_date()
+    return df_hist, series_from_frame(df_hist, "contribution_margin_pct")
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def cached_comparison(ids: tuple, version: tuple, baseline: tuple):
+    """
+    Scénarios sélectionnés + baseline évalués en une passe (compute_frame).
+    Relu / recalculé seulement si la sélection, la base ou la baseline change.
+    """
+    frame = load_scenarios(ids)
+    frame["scenario"] = frame["date"].astype(str) + " — " + frame["name"]
+    base_row = pd.DataFrame([dict(baseline)]).assign(scenario="Baseline")
+    evaluated = compute_frame(pd.concat([frame, base_row], ignore_index=True))
+    return evaluated.iloc[:-1].reset_index(drop=True), evaluated.iloc[-1]
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def cached_monte_carlo(base: dict, specs: dict, n_draws: int, workers: int):
+    """Résultat Monte Carlo (agrégats seulement) mis en cache par jeu de paramètres."""
+    return run_monte_carlo(base, specs, n_draws=n_draws, workers=workers)
+
+
+# --------------------------------------------------
+# SECTIONS EN FRAGMENTS (une interaction dans une section ne relance qu'elle)
+# --------------------------------------------------
+@st.fragment
+def render_sensitivity():
+    """Heatmap de sensibilité 2D."""
+    st.markdown("### Sensibilité (heatmap)")
+    with st.expander("Balayer deux inputs", expanded=False):
+        axis_keys = list(SWEEP_AXES.keys())
+        s1, s2, s3, s4 = st.columns(4)
+        with s1:
+            x_key = st.selectbox("Axe X", axis_keys, index=0, format_func=lambda k: SWEEP_AXES[k][0], key="sens_x")
+        with s2:
+            y_choices = [k for k in axis_keys if k != x_key]
+            y_key = st.selectbox("Axe Y", y_choices, index=min(2, len(y_choices) - 1), format_func=lambda k: SWEEP_AXES[k][0], key="sens_y")
+        with s3:
+            metric_key = st.selectbox("Output", list(SURFACE_METRICS.keys()), format_func=lambda k: SURFACE_METRICS[k][0], key="sens_metric")
+        with s4:
+            grid_n = st.select_slider("Résolution", options=[100, 200, 300, 500], value=500, key="sens_n")
+
+        xs, ys, z = cached_sweep_grid(
+            metric_key, x_key, y_key, fixed_inputs_key(metric_key, x_key, y_key, st.session_state), grid_n
+        )
+        heat_df = surface_to_df(xs, ys, z)
+        current_df = pd.DataFrame({"x": [float(st.session_state[x_key])], "y": [float(st.session_state[y_key])]})
+
+        heatmap = (
+            alt.Chart(heat_df)
+            .mark_rect()
+            .encode(
+                x=alt.X("x:Q", title=SWEEP_AXES[x_key][0], scale=alt.Scale(domain=[SWEEP_AXES[x_key][1], SWEEP_AXES[x_key][2]], nice=False)),
+                x2="x2:Q",
+                y=alt.Y("y:Q", title=SWEEP_AXES[y_key][0], scale=alt.Scale(domain=[SWEEP_AXES[y_key][1], SWEEP_AXES[y_key][2]], nice=False)),
+                y2="y2:Q",
+                color=alt.Color("value:Q", title=SURFACE_METRICS[metric_key][0], scale=alt.Scale(scheme="redblue", domainMid=0)),
+                tooltip=[alt.Tooltip("value:Q", title=SURFACE_METRICS[metric_key][0], format=".2f")],
+            )
+        )
+        current_point = (
+            alt.Chart(current_df)
+            .mark_point(shape="cross", size=220, filled=True, color="#111")
+            .encode(x="x:Q", y="y:Q")
+        )
+        st.altair_chart((heatmap + current_point).properties(height=380), use_container_width=True)
+        st.caption(f"Grille {grid_n}×{grid_n} calculée en une passe ; la croix = point actuel.")
+
+
+def apply_liquidity_tenure(cost_pct: float, tenure_days: float):
+    st.session_state["cout_liquidite_10j_pct"] = round(float(cost_pct), 4)
+    st.session_state["duree_liquidite_jours"] = round(float(tenure_days), 2)
+
+
+def render_liquidity_term_structure():
+    """
+    Coût de liquidité tiré d'une structure par terme (taux annuel par tenure) et d'un mix de tenures.
+    Pas un fragment : « Appliquer » change des inputs de toute la page.
+    """
+    with st.expander(f"Coût de liquidité par tenure (actuel : {float(st.session_state['duree_liquidite_jours']):g}j)", expanded=False):
+        t1, t2 = st.columns(2)
+        with t1:
+            st.caption("Courbe : taux de financement annuel par tenure")
+            curve_df = st.data_editor(
+                pd.DataFrame({"tenure_days": list(DEFAULT_CURVE), "taux_annuel_pct": list(DEFAULT_CURVE.values())}),
+                num_rows="dynamic",
+                hide_index=True,
+                key="ts_curve",
+            )
+        with t2:
+            st.caption("Mix de tenures (poids = part du volume)")
+            mix_df = st.data_editor(
+                pd.DataFrame({"tenure_days": [10, 15], "poids_pct": [100.0, 0.0]}),
+                num_rows="dynamic",
+                hide_index=True,
+                key="ts_mix",
+            )
+
+        curve_df = curve_df.dropna()
+        mix_df = mix_df.dropna()
+        curve_points = tuple(zip(curve_df["tenure_days"].astype(float), curve_df["taux_annuel_pct"].astype(float)))
+        try:
+            ts = cached_term_structure(curve_points)
+        except ValueError as e:
+            st.error(f"Courbe invalide : {e}")
+            return
+        st.session_state["ts_curve_points"] = curve_points  # courbe des segments (tenure sans coût)
+        if mix_df.empty or mix_df["poids_pct"].sum() <= 0:
+            st.info("Renseigne au moins une tenure avec un poids > 0.")
+            return
+        cost, tenure = ts.mix_cost(mix_df["tenure_days"].to_numpy(float), mix_df["poids_pct"].to_numpy(float))
+
+        m1, m2, m3 = st.columns(3)
+        with m1:
+            st.metric("Coût liquidité / prêt", f"{float(cost):.3f} %")
+        with m2:
+            st.metric("Tenure moyenne", f"{float(tenure):.1f} j")
+        with m3:
+            st.metric("Taux annualisé", f"{float(cost) * 365 / float(tenure):.2f} %" if tenure > 0 else "—")
+
+        grid_days = ts.days[1 : int(min(ts.max_days, max(ts.tenors[-1], mix_df["tenure_days"].max()) * 1.2)) + 1]
+        curve_chart = alt.Chart(pd.DataFrame({"tenure_days": grid_days, "taux_annuel_pct": ts.rate(grid_days)})).mark_line(color="#064C72").encode(
+            x=alt.X("tenure_days:Q", title="Tenure (jours)"),
+            y=alt.Y("taux_annuel_pct:Q", title="Taux annuel (%)", scale=alt.Scale(zero=False)),
+        ) + alt.Chart(ts.to_frame()).mark_point(color="#064C72", filled=True).encode(
+            x="tenure_days:Q", y="taux_annuel_pct:Q", tooltip=["tenure_days:Q", alt.Tooltip("taux_annuel_pct:Q", format=".2f")]
+        )
+        st.altair_chart(curve_chart.properties(height=200), use_container_width=True)
+        st.button(
+            "Appliquer au scénario",
+            key="ts_apply",
+            on_click=apply_liquidity_tenure,
+            args=(float(cost), float(tenure)),
+            help="Remplace le coût de liquidité par trx et la tenure utilisée pour l'annualiser.",
+        )
+
+
+def apply_roll_rate_default(loss: float):
+    st.session_state["defaut_30j_pct"] = round(float(loss), 4)
+
+
+def render_default_model():
+    """
+    Défaut via roll-rates (current -> 30 -> 60 -> 90+ -> write-off) sur tous les vintages à la fois.
+    Pas un fragment : « Appliquer » change defaut_30j_pct (waterfall, outputs).
+    """
+    with st.expander("Défaut : modèle roll-rate par vintage", expanded=False):
+        source = st.radio("Matrice de transition", ["Par défaut (éditable)", "Estimée depuis un CSV"], horizontal=True, key="rr_source")
+        vintages, volumes = ["Pool"], None
+        if source == "Estimée depuis un CSV":
+            uploaded = st.file_uploader("Statuts de prêts (CSV : loan_id, period, status, amount)", type="csv", key="rr_csv")
+            if uploaded is None:
+                st.info("Charge un CSV (status : current / 30 / 60 / 90 / write_off / repaid).")
+                return
+            try:
+                vintages, P, volumes, pooled = cached_roll_rates(uploaded.getvalue())
+            except (KeyError, ValueError) as e:
+                st.error(f"Estimation impossible : {e}")
+                return
+            st.caption(f"{len(vintages)} vintages estimés ; matrice du pool :")
+            st.dataframe(matrix_to_frame(pooled).round(3), use_container_width=True)
+        else:
+            edited = st.data_editor(matrix_to_frame(default_matrix()), key="rr_matrix", use_container_width=True)
+            P = edited.to_numpy(dtype=np.float64)[np.newaxis]
+            P = P / np.where(P.sum(axis=-1, keepdims=True) > 0, P.sum(axis=-1, keepdims=True), 1.0)
+
+        r1, r2, r3 = st.columns(3)
+        with r1:
+            stress_x = st.slider("Stress roll-rates (×)", 0.5, 3.0, 1.0, 0.05, key="rr_stress")
+        with r2:
+            horizon = st.slider("Horizon (périodes de 30j)", 1, 24, 6, 1, key="rr_horizon")
+        with r3:
+            recovery = st.slider("Recouvrement (%)", 0, 90, 0, 5, key="rr_recovery")
+
+        # recalcul direct à chaque mouvement : V matrices 6x6, matrix_power vectorisé
+        P_s = stress(P, stress_x)
+        losses = loss_pct(P_s, horizon, recovery)
+        loss = portfolio_loss_pct(losses, volumes)
+        curves = loss_curves(P_s, horizon, recovery)
+
+        k1, k2 = st.columns(2)
+        with k1:
+            st.metric("Perte attendue", f"{loss:.2f} %", delta=f"{loss - float(st.session_state['defaut_30j_pct']):+.2f} pt vs actuel", delta_color="inverse")
+        with k2:
+            st.metric("Vintages", f"{len(vintages)}")
+
+        curve_df = pd.DataFrame(curves.T, columns=vintages).rename_axis("période").reset_index().melt("période", var_name="vintage", value_name="perte_pct")
+        rr_chart = (
+            alt.Chart(curve_df)
+            .mark_line(opacity=0.9 if len(vintages) <= 12 else 0.25)
+            .encode(
+                x=alt.X("période:Q", title="Périodes depuis l'origination"),
+                y=alt.Y("perte_pct:Q", title="Perte cumulée (%)"),
+                color=alt.Color("vintage:N", legend=None if len(vintages) > 12 else alt.Legend(title="Vintage")),
+                tooltip=["vintage:N", "période:Q", alt.Tooltip("perte_pct:Q", format=".2f")],
+            )
+            .properties(height=220)
+        )
+        st.altair_chart(rr_chart, use_container_width=True)
+        st.button(
+            "Appliquer au défaut 30j",
+            key="rr_apply",
+            on_click=apply_roll_rate_default,
+            args=(loss,),
+            help="Remplace defaut_30j_pct (outputs et waterfall) par la perte attendue du modèle.",
+        )
+
+
+@st.fragment
+def render_tornado():
+    """Tornado : impact de ±X% sur chaque input, classé."""
+    st.markdown("### Tornado (un input à la fois)")
+    with st.expander("Classer l'impact des 8 inputs", expanded=False):
+        pct = st.slider("Variation (± %)", 1, 50, 10, 1, key="tornado_pct")
+        tor_df = cached_tornado(tuple(float(st.session_state[k]) for k in INPUT_KEYS), float(pct))
+
+        cols = st.columns(len(TORNADO_METRICS))
+        for col, (metric, label) in zip(cols, TORNADO_METRICS.items()):
+            m_df = tor_df[tor_df["metric"] == metric].assign(label=lambda d: d["input"].map(INPUT_LABELS))
+            bars_df = pd.concat(
+                [
+                    m_df.assign(variation=f"-{pct}%", delta=m_df["low"] - m_df["base"], value=m_df["low"]),
+                    m_df.assign(variation=f"+{pct}%", delta=m_df["high"] - m_df["base"], value=m_df["high"]),
+                ]
+            )
+            tor_chart = (
+                alt.Chart(bars_df)
+                .mark_bar()
+                .encode(
+                    x=alt.X("delta:Q", title=f"Δ {label}"),
+                    y=alt.Y("label:N", title=None, sort=list(m_df["label"])),
+                    color=alt.Color(
+                        "variation:N",
+                        title=None,
+                        scale=alt.Scale(domain=[f"-{pct}%", f"+{pct}%"], range=["#F83131", "#1B5A43"]),
+                    ),
+                    tooltip=["label:N", "variation:N", alt.Tooltip("value:Q", format=",.2f"), alt.Tooltip("delta:Q", format="+,.2f")],
+                )
+                .properties(height=280, title=f"{label} (base {m_df['base'].iloc[0]:,.2f})")
+            )
+            with col:
+                st.altair_chart(tor_chart, use_container_width=True)
+        at_zero = [INPUT_LABELS[k] for k in INPUT_KEYS if float(st.session_state[k]) == 0]
+        st.caption(
+            f"{1 + 2 * len(INPUT_KEYS)} scénarios évalués en une passe ; recalcul seulement si le point courant change."
+            + (f" Input à 0 ({', '.join(at_zero)}) : ±{pct}% de la plage du curseur." if at_zero else "")
+        )
+
+
+@st.fragment
+def render_monte_carlo():
+    """Monte Carlo défaut + liquidité."""
+    st.markdown("### Monte Carlo (incertitude défaut & liquidité)")
+    with st.expander("Distribuer les inputs incertains", expanded=False):
+        mc1, mc2, mc3 = st.columns(3)
+        with mc1:
+            mc_def_kind = st.selectbox("Distribution défaut 30j", DISTRIBUTIONS, index=1, key="mc_def_kind")
+            mc_def_spread = st.slider("Dispersion défaut (%)", 0.0, 100.0, 30.0, 5.0, key="mc_def_spread")
+        with mc2:
+            mc_liq_kind = st.selectbox("Distribution coût liquidité", DISTRIBUTIONS, index=2, key="mc_liq_kind")
+            mc_liq_spread = st.slider("Dispersion liquidité (%)", 0.0, 100.0, 25.0, 5.0, key="mc_liq_spread")
+        with mc3:
+            mc_cycles_on = st.checkbox("Cycles / mois incertains", value=False, key="mc_cycles_on")
+            mc_cycles_spread = st.slider("Dispersion cycles (%)", 0.0, 50.0, 10.0, 1.0, key="mc_cycles_spread", disabled=not mc_cycles_on)
+
+        mc4, mc5 = st.columns(2)
+        with mc4:
+            mc_n = st.select_slider("Tirages", options=[100_000, 1_000_000, 5_000_000, 10_000_000], value=1_000_000, format_func=lambda n: f"{n:,}", key="mc_n")
+        with mc5:
+            mc_workers = st.number_input("Process", min_value=1, max_value=max(1, os.cpu_count() or 1), value=1, step=1, key="mc_workers")
+
+        mc_base = {k: float(st.session_state[k]) for k in INPUT_KEYS}
+        mc_specs = {
+            "defaut_30j_pct": spec_from_spread(mc_def_kind, mc_base["defaut_30j_pct"], mc_def_spread),
+            "cout_liquidite_10j_pct": spec_from_spread(mc_liq_kind, mc_base["cout_liquidite_10j_pct"], mc_liq_spread),
+        }
+        if mc_cycles_on:
+            mc_specs["cycles_per_month"] = spec_from_spread("normal", mc_base["cycles_per_month"], mc_cycles_spread)
+
+        if st.button("Lancer la simulation", key="mc_run"):
+            with st.spinner("Simulation en cours…"):
+                st.session_state.mc_result = cached_monte_carlo(mc_base, mc_specs, int(mc_n), int(mc_workers))
+
+        mc_result = st.session_state.get("mc_result")
+        if mc_result:
+            cm_res = mc_result["contribution_margin_pct"]
+            cv_res = mc_result["contribution_value_k"]
+            k1, k2, k3 = st.columns(3)
+            with k1:
+                st.metric("P(marge < 0)", f"{cm_res['prob_negative'] * 100:.2f} %")
+            with k2:
+                st.metric("Marge médiane", f"{cm_res['p50']:.2f} %")
+            with k3:
+                st.metric("Contribution médiane", f"{cv_res['p50']:.2f} k€")
+
+            pct_cols = [f"p{q:02d}" for q in MC_PERCENTILES]
+            st.dataframe(
+                pd.DataFrame(
+                    {
+                        "Contribution margin (%)": [cm_res[c] for c in ["mean", "std", *pct_cols]],
+                        "Contribution value (k€)": [cv_res[c] for c in ["mean", "std", *pct_cols]],
+                    },
+                    index=["mean", "std", *pct_cols],
+                ),
+                use_container_width=True,
+            )
+
+            edges = cm_res["hist_edges"]
+            counts = cm_res["hist_counts"]
+            # on regroupe les bins fins en ~80 barres pour l'affichage
+            group = max(1, len(counts) // 80)
+            n_keep = len(counts) // group * group
+            mc_hist_df = pd.DataFrame(
+                {
+                    "start": edges[:n_keep:group],
+                    "end": edges[group:n_keep + 1:group],
+                    "share": counts[:n_keep].reshape(-1, group).sum(axis=1) / cm_res["n"],
+                }
+            )
+            mc_hist_df = mc_hist_df[mc_hist_df["share"] > 0]
+            mc_chart = (
+                alt.Chart(mc_hist_df)
+                .mark_bar(color="#064C72")
+                .encode(
+                    x=alt.X("start:Q", title="Contribution margin (%)", bin="binned"),
+                    x2="end:Q",
+                    y=alt.Y("share:Q", title="Part des tirages", axis=alt.Axis(format="%")),
+                )
+            )
+            zero_rule = alt.Chart(pd.DataFrame({"x": [0.0]})).mark_rule(color="#F83131").encode(x="x:Q")
+            st.altair_chart((mc_chart + zero_rule).properties(height=240), use_container_width=True)
+            st.caption(f"{cm_res['n']:,} tirages ; les inputs non distribués restent au point actuel du lancement.")
+
+
+@st.fragment
+def render_cohorts(inputs: dict, metrics: dict):
+    """Section cohortes (fragment : ses sliders ne relancent que cette section)."""
+    revenu_pct = inputs["revenu_pct"]
+    cout_paiement_pct = inputs["cout_paiement_pct"]
+    cout_liquidite_10j_pct = inputs["cout_liquidite_10j_pct"]
+    defaut_30j_pct = inputs["defaut_30j_pct"]
+    monthly_volume_eur = metrics["monthly_volume_eur"]
+    taux_liquidite_annuel_pct = metrics["taux_liquidite_annuel_pct"]
+
+    st.markdown("### Loan book par cohortes (tenure)")
+    with st.expander("Simuler jour par jour", expanded=False):
+        co1, co2, co3, co4 = st.columns(4)
+        with co1:
+            tenure_days = st.slider("Tenure (jours)", 5, 60, 10, 1, key="cohort_tenure")
+        with co2:
+            horizon_months = st.slider("Horizon (mois)", 6, 36, 24, 1, key="cohort_horizon")
+        with co3:
+            growth_pct = st.slider("Croissance originations / mois (%)", -5.0, 15.0, 0.0, 0.5, key="cohort_growth")
+        with co4:
+            funding_ratio_pct = st.slider("Part financée par la ligne (%)", 0, 100, 100, 5, key="cohort_funding")
+
+        horizon_days = int(round(horizon_months * 365 / 12))
+        cohort_daily = simulate_cohorts(
+            daily_originations(monthly_volume_eur, horizon_days, growth_pct),
+            tenure_days,
+            revenu_pct,
+            cout_paiement_pct,
+            defaut_30j_pct,
+            taux_liquidite_annuel_pct,
+            funding_ratio=funding_ratio_pct / 100,
+            start=st.session_state["scenario_date"],
+        )
+        cohort_monthly = monthly_summary(cohort_daily)
+        liq_equiv_pct = liquidity_cost_pct(cohort_daily, warmup_days=tenure_days)
+
+        ck1, ck2, ck3 = st.columns(3)
+        with ck1:
+            st.metric(f"Coût liquidité équivalent ({tenure_days}j)", f"{liq_equiv_pct:.2f} %", delta=f"{liq_equiv_pct - cout_liquidite_10j_pct:+.2f} pt vs slider", delta_color="inverse")
+        with ck2:
+            st.metric("Encours final", f"{cohort_daily['outstanding_eur'].iloc[-1] / 1000:,.0f} k€")
+        with ck3:
+            st.metric("Contribution cumulée", f"{cohort_daily['contribution_eur'].sum() / 1000:,.0f} k€")
+
+        book_df = (
+            cohort_daily[["outstanding_eur", "capital_drawn_eur"]]
+            .rename(columns={"outstanding_eur": "Encours", "capital_drawn_eur": "Capital tiré"})
+            .reset_index()
+            .melt("date", var_name="série", value_name="eur")
+        )
+        book_chart = (
+            alt.Chart(book_df)
+            .mark_line()
+            .encode(
+                x=alt.X("date:T", title=None),
+                y=alt.Y("eur:Q", title="€"),
+                color=alt.Color("série:N", scale=alt.Scale(range=["#064C72", "#1B5A43"])),
+            )
+            .properties(height=220)
+        )
+        st.altair_chart(book_chart, use_container_width=True)
+
+        liq_chart = (
+            alt.Chart(cohort_monthly.reset_index())
+            .mark_bar(color="#F83131")
+            .encode(
+                x=alt.X("date:T", title=None, timeUnit="yearmonth"),
+                y=alt.Y("liquidity_cost_eur:Q", title="Coût liquidité / mois (€)"),
+                tooltip=[alt.Tooltip("date:T", timeUnit="yearmonth", title="Mois"), alt.Tooltip("liquidity_cost_eur:Q", format=",.0f")],
+            )
+            .properties(height=180)
+        )
+        st.altair_chart(liq_chart, use_container_width=True)
+
+
+@st.fragment
+def render_goal_seek(inputs: dict, metrics: dict):
+    """Goal seek / break-even : un output cible, un input libre."""
+    st.markdown("### Goal seek / break-even")
+    with st.expander("Résoudre pour un input", expanded=False):
+        g1, g2, g3 = st.columns(3)
+        with g1:
+            goal_metric = st.selectbox("Output cible", list(GOAL_METRICS), format_func=GOAL_METRICS.get, key="goal_metric")
+        with g2:
+            goal_free = st.selectbox("Input libre", list(INPUT_LABELS), index=1, format_func=INPUT_LABELS.get, key="goal_free")
+        with g3:
+            goal_target = st.number_input("Valeur cible", value=1.0, key="goal_target")
+
+        solution, method = solve_for(goal_metric, goal_free, goal_target, inputs)
+        x = float(solution)
+        lo, hi = SOLVER_BOUNDS[goal_free]
+        if np.isnan(x):
+            st.warning("Cible inatteignable en ne bougeant que cet input.")
+        else:
+            st.metric(
+                INPUT_LABELS[goal_free],
+                f"{x:,.4g}",
+                delta=f"{x - inputs[goal_free]:+,.4g} vs actuel",
+                delta_color="off",
+            )
+            st.caption(
+                f"Méthode : {method}."
+                + ("" if lo <= x <= hi else f" ⚠️ hors de la plage du curseur ({lo:g} → {hi:g}).")
+            )
+
+        st.markdown("**Courbes iso-output**")
+        i1, i2 = st.columns(2)
+        with i1:
+            iso_x = st.selectbox(
+                "Axe X",
+                [k for k in INPUT_LABELS if k != goal_free],
+                format_func=INPUT_LABELS.get,
+                key="iso_x",
+            )
+        with i2:
+            iso_targets_txt = st.text_input("Cibles (séparées par des virgules)", value="0, 0.5, 1, 1.5", key="iso_targets")
+        try:
+            iso_targets = [float(t) for t in iso_targets_txt.split(",") if t.strip()]
+        except ValueError:
+            st.error("Cibles invalides.")
+            iso_targets = []
+        if iso_targets:
+            xs, ys = iso_curves(goal_metric, goal_free, iso_targets, iso_x, inputs)
+            iso_df = pd.DataFrame(
+                {
+                    "x": np.tile(xs, len(iso_targets)),
+                    "y": ys.ravel(),
+                    "cible": np.repeat([f"{t:g}" for t in iso_targets], len(xs)),
+                }
+            ).dropna()
+            iso_chart = (
+                alt.Chart(iso_df)
+                .mark_line()
+                .encode(
+                    x=alt.X("x:Q", title=INPUT_LABELS[iso_x]),
+                    y=alt.Y("y:Q", title=INPUT_LABELS[goal_free]),
+                    color=alt.Color("cible:N", title=GOAL_METRICS[goal_metric]),
+                )
+            )
+            current_pt = (
+                alt.Chart(pd.DataFrame({"x": [inputs[iso_x]], "y": [inputs[goal_free]]}))
+                .mark_point(shape="cross", size=200, filled=True, color="#111")
+                .encode(x="x:Q", y="y:Q")
+            )
+            st.altair_chart((iso_chart + current_pt).properties(height=300), use_container_width=True)
+
+
+@st.fragment
+def render_projection(inputs: dict):
+    """Projection mensuelle : drivers par mois, recalcul incrémental (objet gardé en session)."""
+    st.markdown("### Projection mensuelle")
+    with st.expander("Projeter sur plusieurs mois", expanded=False):
+        p1, p2, p3 = st.columns(3)
+        with p1:
+            horizon = st.slider("Horizon (mois)", 12, 60, 24, 1, key="proj_horizon")
+        with p2:
+            book_growth = st.slider("Croissance loan book / mois (%)", -5.0, 15.0, 3.0, 0.5, key="proj_growth")
+        with p3:
+            ob_on = st.checkbox("Open Banking (baisse coût paiement)", value=False, key="proj_ob_on")
+        if ob_on:
+            o1, o2, o3 = st.columns(3)
+            with o1:
+                ob_start = st.slider("Début (mois)", 1, horizon - 1, min(6, horizon - 1), 1, key="proj_ob_start")
+            with o2:
+                ob_months = st.slider("Durée de la rampe (mois)", 1, 24, 6, 1, key="proj_ob_months")
+            with o3:
+                ob_target = st.slider("Coût paiement cible (%)", 0.0, 2.0, 0.5, 0.05, key="proj_ob_target")
+
+        start = date(st.session_state["scenario_date"].year, st.session_state["scenario_date"].month, 1)
+        proj = st.session_state.get("projection")
+        if proj is None or proj.horizon != horizon or proj.start != start:
+            proj = st.session_state.projection = Projection(inputs, horizon, start)
+
+        growth = np.zeros((horizon, len(INPUT_KEYS)))
+        growth[:, INPUT_KEYS.index("loan_book_k")] = book_growth
+        overrides = np.full((horizon, len(INPUT_KEYS)), np.nan)
+        if ob_on:
+            overrides = ramp_overrides(
+                horizon, "cout_paiement_pct", ob_start, ob_start + ob_months - 1, inputs["cout_paiement_pct"], ob_target
+            )
+
+        st.caption("Overrides par mois (vide = hérité du mois précédent).")
+        manual = st.data_editor(
+            pd.DataFrame(np.nan, index=[m.strftime("%Y-%m") for m in proj.months()], columns=list(INPUT_KEYS)),
+            key=f"proj_overrides_{horizon}",
+            use_container_width=True,
+            height=200,
+        ).to_numpy(dtype=np.float64)
+        overrides = np.where(np.isnan(manual), overrides, manual)
+
+        n_recomputed = proj.update(base=inputs, overrides=overrides, growth=growth)
+        proj_df = proj.to_frame()
+
+        pk1, pk2, pk3 = st.columns(3)
+        with pk1:
+            st.metric("Contribution cumulée", f"{proj_df['cum_contribution_value_k'].iloc[-1]:,.0f} k€")
+        with pk2:
+            st.metric("Revenue cumulé", f"{proj_df['cum_monthly_revenue_eur'].iloc[-1] / 1000:,.0f} k€")
+        with pk3:
+            st.metric("Clients / mois (fin)", f"{proj_df['nb_clients_per_month'].iloc[-1]:,.0f}")
+
+        flows_df = (
+            proj_df[["monthly_revenue_eur", "contribution_value_k"]]
+            .assign(monthly_revenue_eur=lambda d: d["monthly_revenue_eur"] / 1000)
+            .rename(columns={"monthly_revenue_eur": "Revenue (k€)", "contribution_value_k": "Contribution (k€)"})
+            .reset_index()
+            .melt("month", var_name="série", value_name="k€")
+        )
+        proj_chart = (
+            alt.Chart(flows_df)
+            .mark_line(point=True)
+            .encode(
+                x=alt.X("month:T", title=None),
+                y=alt.Y("k€:Q"),
+                color=alt.Color("série:N", scale=alt.Scale(range=["#064C72", "#1B5A43"])),
+                tooltip=["month:T", "série:N", alt.Tooltip("k€:Q", format=",.1f")],
+            )
+            .properties(height=240)
+        )
+        st.altair_chart(proj_chart, use_container_width=True)
+        st.dataframe(
+            proj_df[["loan_book_k", "cout_paiement_pct", "contribution_margin_pct", "contribution_value_k", "nb_loans_per_month", "nb_clients_per_month"]].round(2),
+            use_container_width=True,
+        )
+        st.caption(f"Dernière modification : {n_recomputed} mois recalculé(s) sur {horizon}.")
+
+
+SEGMENT_MAX_WATERFALLS = 8
+SEGMENT_TOP_BARS = 25
+
+
+@st.fragment
+def render_segments(inputs: dict):
+    """Portefeuille multi-segments : une passe moteur sur toute la table, agrégat pondéré par le volume."""
+    st.markdown("### Portefeuille multi-segments")
+    with st.expander("Découper le loan book par segment", expanded=False):
+        uploaded = st.file_uploader(f"Table de segments (CSV : {NAME_COL}, {SHARE_COL}, inputs optionnels)", type="csv", key="seg_csv")
+        try:
+            base_df = pd.read_csv(uploaded) if uploaded is not None else default_segments().to_frame()
+        except (KeyError, ValueError) as e:  # EmptyDataError / ParserError sont des ValueError
+            st.error(f"CSV illisible : {e}")
+            return
+        st.caption(
+            f"Case vide = valeur globale de la page (loan book {inputs['loan_book_k']:,.0f} k€, "
+            f"{inputs['cycles_per_month']:.2f} cycles/mois…). Les parts sont renormalisées à 100 %."
+        )
+        edited = st.data_editor(
+            base_df,
+            key=f"seg_table_{uploaded.file_id if uploaded is not None else 'default'}",
+            num_rows="dynamic",
+            use_container_width=True,
+            height=220,
+            column_order=[NAME_COL, SHARE_COL, *SEGMENT_KEYS],
+        )
+        try:
+            table = SegmentTable.from_frame(edited)
+        except (KeyError, ValueError) as e:
+            st.error(f"Table invalide : {e}")
+            return
+        if len(table) == 0:
+            st.info("Ajoute au moins un segment avec une part de loan book.")
+            return
+        share_total = float(np.nansum(table.columns[SHARE_COL]))
+        if abs(share_total - 100) > 0.01:
+            st.caption(f"Parts saisies : {share_total:.1f} % → renormalisées.")
+
+        curve = cached_term_structure(st.session_state.get("ts_curve_points", tuple(DEFAULT_CURVE.items())))
+        try:
+            seg_df, agg = evaluate_segments(table, {**inputs, "duree_liquidite_jours": float(st.session_state["duree_liquidite_jours"])}, curve)
+        except ValueError as e:
+            st.error(f"Table invalide : {e}")
+            return
+
+        s1, s2, s3, s4 = st.columns(4)
+        with s1:
+            st.metric("Contribution margin (portefeuille)", f"{agg['contribution_margin_pct']:.2f} %")
+        with s2:
+            st.metric("Contribution", f"{agg['contribution_value_k']:,.1f} k€ / mois")
+        with s3:
+            st.metric("Volume", f"{agg['monthly_volume_eur'] / 1000:,.0f} k€ / mois")
+        with s4:
+            st.metric("Clients / mois", f"{agg['nb_clients_per_month']:,.0f}")
+
+        agg_wf = make_waterfall_df(
+            agg["revenu_pct"], agg["cout_paiement_pct"], agg["cout_liquidite_10j_pct"], agg["defaut_30j_pct"], agg["contribution_margin_pct"], "Coût liquidité"
+        )
+        if len(seg_df) <= SEGMENT_MAX_WATERFALLS:
+            wf = pd.concat([agg_wf.assign(segment="Portefeuille"), make_waterfalls_df(seg_df, label_col=NAME_COL)], ignore_index=True)
+            st.altair_chart(waterfall_chart(wf, row=NAME_COL), use_container_width=True)
+        else:
+            st.altair_chart(waterfall_chart(agg_wf), use_container_width=True)
+
+        top = seg_df.nlargest(SEGMENT_TOP_BARS, "monthly_volume_eur")
+        vol_chart = (
+            alt.Chart(top)
+            .mark_bar()
+            .encode(
+                y=alt.Y(f"{NAME_COL}:N", sort="-x", title=None),
+                x=alt.X("monthly_volume_eur:Q", title="Volume mensuel (€)"),
+                color=alt.Color(
+                    "contribution_margin_pct:Q",
+                    title="Marge (%)",
+                    scale=alt.Scale(scheme="redyellowgreen", domainMid=0),
+                ),
+                tooltip=[
+                    f"{NAME_COL}:N",
+                    alt.Tooltip("monthly_volume_eur:Q", format=",.0f"),
+                    alt.Tooltip("part_volume_pct:Q", format=".1f"),
+                    alt.Tooltip("contribution_margin_pct:Q", format=".2f"),
+                    alt.Tooltip("contribution_value_k:Q", format=",.2f"),
+                ],
+            )
+            .properties(height=min(24 * len(top), 480))
+        )
+        if len(seg_df) > SEGMENT_TOP_BARS:
+            st.caption(f"Top {SEGMENT_TOP_BARS} segments par volume sur {len(seg_df)}.")
+        st.altair_chart(vol_chart, use_container_width=True)
+        st.dataframe(
+            seg_df[
+                [NAME_COL, "loan_book_k", "part_volume_pct", "revenu_pct", "cout_total_pct", "contribution_margin_pct", "contribution_value_k", "monthly_volume_eur", "nb_loans_per_month", "nb_clients_per_month"]
+            ].round(2),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+
+JOB_KINDS = {
+    "sweep": "Balayage haute résolution",
+    "batch": "Fichier de scénarios",
+    "export": "Pack de rapports (Excel / PDF)",
+    "ledger": "Ingestion ledger",
+}
+EXPORT_FORMATS = {"pdf": ("PDF", "application/pdf"), "xlsx": ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+EXPORT_SAVED = {"all": "Toute la base", "compare": "Sélection de la comparaison", "none": "Aucun"}
+JOB_STATUS_LABELS = {"queued": "En attente", "running": "En cours", "done": "Terminé", "failed": "Échec", "cancelled": "Annulé"}
+JOBS_REFRESH_S = 1.0
+JOB_PREVIEW_ROWS = 1000
+JOB_EXPIRED_MSG = "Résultat expiré : supprimé du disque pour libérer de la place. Relance le même calcul pour le refaire."
+
+
+def apply_ledger_job(job):
+    """Résultat d'un job d'ingestion -> presets et historique de la session (une seule fois)."""
+    st.session_state.ledger_presets = job.result["presets"]
+    st.session_state.ledger_history = series_from_frame(job.result["daily_cm"], "contribution_margin_pct", date_col=None)
+    st.session_state.ledger_daily = job.result["daily"]
+    st.session_state.ledger_job_applied = True
+
+
+def cancel_job(job_id: str):
+    QUEUE.cancel(job_id, st.session_state.session_uid)
+
+
+def forget_job(job_id: str):
+    QUEUE.forget(job_id, st.session_state.session_uid)
+
+
+def render_job(job):
+    status = JOB_STATUS_LABELS[job.status]
+    head = st.columns([0.55, 0.3, 0.15])
+    with head[0]:
+        st.markdown(f"**{JOB_KINDS[job.kind]}** — {status} · {job.elapsed_s():.1f} s")
+    with head[1]:
+        st.caption(job.error or job.message)
+    with head[2]:
+        if job.active:
+            st.button("Annuler", key=f"job_cancel_{job.id}", on_click=cancel_job, args=(job.id,))
+        else:
+            st.button("Retirer", key=f"job_forget_{job.id}", on_click=forget_job, args=(job.id,))
+    if job.active:
+        st.progress(job.progress)
+
+    if job.kind == "sweep":
+        if job.status == "done":
+            stored = STORE.open_key(job.result["key"])
+            grid = None if stored is None else (stored["xs"], stored["ys"], stored["z"])  # memmaps
+            if stored is None:
+                st.warning(JOB_EXPIRED_MSG)
+        else:
+            grid = job.partial
+        if grid is not None and len(grid[1]):
+            xs, ys, z = grid
+            p = job.params
+            heat = (
+                alt.Chart(surface_to_df(xs, ys, z))
+                .mark_rect()
+                .encode(
+                    x=alt.X("x:Q", title=SWEEP_AXES[p["x_key"]][0], scale=alt.Scale(domain=[SWEEP_AXES[p["x_key"]][1], SWEEP_AXES[p["x_key"]][2]], nice=False)),
+                    x2="x2:Q",
+                    y=alt.Y("y:Q", title=SWEEP_AXES[p["y_key"]][0], scale=alt.Scale(domain=[SWEEP_AXES[p["y_key"]][1], SWEEP_AXES[p["y_key"]][2]], nice=False)),
+                    y2="y2:Q",
+                    color=alt.Color("value:Q", title=SURFACE_METRICS[p["metric"]][0], scale=alt.Scale(scheme="redblue", domainMid=0)),
+                )
+                .properties(height=300)
+            )
+            st.altair_chart(heat, use_container_width=True)
+            st.caption(f"Grille {p['n']}×{p['n']} ({len(ys)} lignes calculées).")
+    elif job.kind == "batch" and job.status == "done":
+        summary = job.result["summary"]
+        b1, b2, b3 = st.columns(3)
+        with b1:
+            st.metric("Scénarios", f"{summary['scenarios']:,}")
+        with b2:
+            st.metric("Marge moyenne", f"{summary['contribution_margin_moyenne_pct']:.2f} %")
+        with b3:
+            st.metric("Marge négative", f"{summary['scenarios_marge_negative']:,}")
+        stored = STORE.open_key(job.result["key"])
+        if stored is None:
+            st.warning(JOB_EXPIRED_MSG)
+        elif stored.n_rows:
+            start = st.number_input(
+                "Première ligne affichée", 0, stored.n_rows - 1, 0, JOB_PREVIEW_ROWS, key=f"job_rows_{job.id}"
+            )
+            # slice du memmap : seules ces lignes sont lues depuis le disque
+            st.dataframe(stored.slice(int(start), int(start) + JOB_PREVIEW_ROWS), use_container_width=True, height=200)
+    elif job.kind == "export" and job.status == "done":
+        stats = job.result["stats"]
+        st.caption(f"{stats['n']:,} scénarios • marge moyenne {stats['cm_mean']:.2f} % • {stats['negative']:,} à marge négative.")
+        cols = st.columns(len(job.result["paths"]))
+        for col, (fmt, path) in zip(cols, job.result["paths"].items()):
+            with col:
+                if os.path.exists(path):
+                    with open(path, "rb") as f:
+                        st.download_button(
+                            f"Télécharger ({EXPORT_FORMATS[fmt][0]})",
+                            f,
+                            file_name=os.path.basename(path),
+                            mime=EXPORT_FORMATS[fmt][1],
+                            key=f"job_dl_{job.id}_{fmt}",
+                        )
+    elif job.kind == "ledger" and job.status == "done":
+        st.caption(f"{len(job.result['presets'])} mois agrégés ({job.params['path']}).")
+
+
+def render_jobs():
+    """
+    Calculs longs dans jobs.QUEUE (pool de threads) : le script ne fait que soumettre et relire.
+    Le fragment se relance tout seul tant qu'un job de la session tourne.
+    """
+    uid = st.session_state.session_uid
+    polling = any(j.active for j in QUEUE.jobs_for(uid))
+
+    def body():
+        jobs = QUEUE.jobs_for(uid)
+        ledger_job = QUEUE.get(st.session_state.get("ledger_job", ""))
+        if ledger_job is not None and ledger_job.status == "done" and not st.session_state.get("ledger_job_applied"):
+            apply_ledger_job(ledger_job)
+            st.rerun()  # presets / historique : toute la page
+        if polling and not any(j.active for j in jobs):
+            st.rerun()  # plus rien ne tourne : rerun complet pour couper le rafraîchissement
+
+        st.markdown("### Calculs en arrière-plan")
+        with st.expander("Lancer un calcul long", expanded=bool(jobs)):
+            kind = st.radio("Type", ["sweep", "batch", "export"], format_func=JOB_KINDS.get, horizontal=True, key="job_kind")
+            if kind == "sweep":
+                x_key, y_key, metric = st.session_state.get("sens_x"), st.session_state.get("sens_y"), st.session_state.get("sens_metric")
+                n = st.select_slider("Résolution", options=[1000, 2000, 3000, 4000], value=2000, key="job_sweep_n")
+                st.caption("Axes et output de la section Sensibilité.")
+                if st.button("Lancer", key="job_submit_sweep") and x_key and y_key and metric:
+                    fixed = [list(p) for p in fixed_inputs_key(metric, x_key, y_key, st.session_state)]
+                    QUEUE.submit("sweep", {"metric": metric, "x_key": x_key, "y_key": y_key, "fixed": fixed, "n": n}, uid)
+                    st.rerun()
+            elif kind == "export":
+                preset_names = [k for k, v in SCENARIOS_PRESETS.items() if v]
+                e1, e2, e3 = st.columns([0.45, 0.3, 0.25])
+                with e1:
+                    chosen = st.multiselect("Presets", preset_names, default=preset_names, key="job_export_presets")
+                with e2:
+                    saved = st.radio("Scénarios sauvegardés", list(EXPORT_SAVED), format_func=EXPORT_SAVED.get, key="job_export_saved")
+                with e3:
+                    # l'Excel dépend de xlsxwriter (optionnel)
+                    available = [f for f in EXPORT_FORMATS if f != "xlsx" or importlib.util.find_spec("xlsxwriter")]
+                    formats = st.multiselect("Formats", available, default=available, format_func=lambda f: EXPORT_FORMATS[f][0], key="job_export_formats")
+                if "xlsx" not in available:
+                    st.caption("Excel indisponible : `pip install xlsxwriter`.")
+                if st.button("Lancer", key="job_submit_export") and formats:
+                    params = {
+                        "formats": sorted(formats),
+                        "preset_names": chosen,
+                        "saved_ids": [int(i) for i in st.session_state.get("cmp_ids", [])] if saved == "compare" else None,
+                        "include_saved": saved != "none",
+                        "db_version": list(history_version()),
+                    }
+                    QUEUE.submit("export", params, uid)
+                    st.rerun()
+            else:
+                path = st.text_input("Chemin du fichier (CSV / JSON / JSONL / YAML / Parquet)", key="job_batch_path")
+                if st.button("Lancer", key="job_submit_batch") and path:
+                    try:
+                        QUEUE.submit("batch", {"path": path, **file_stamp(path)}, uid)
+                        st.rerun()
+                    except OSError as e:
+                        st.error(f"Fichier illisible : {e}")
+            for job in jobs:
+                st.divider()
+                render_job(job)
+            stored = STORE.entries()
+            if len(stored):
+                st.divider()
+                st.caption(
+                    f"Résultats sur disque (partagés entre sessions) : {len(stored)} • {stored['mb'].sum():,.1f} Mo "
+                    f"dans {STORE.root}"
+                )
+
+    st.fragment(body, run_every=JOBS_REFRESH_S if polling else None)()
+
+
+HISTORY_PERIODS = {"Tout": None, "5 ans": 5 * 365, "1 an": 365, "3 mois": 91}
+HISTORY_MAX_POINTS = 500
+
+
+BACKTEST_WINDOWS = [7, 30, 60, 90, 180]
+# taux réalisé -> colonne du preset en vigueur
+BACKTEST_METRICS = {
+    "contribution_margin_pct": ("Contribution margin (%)", "predicted_cm_pct"),
+    "revenu_pct": ("Revenus / trx (%)", "preset_revenu_pct"),
+    "cout_paiement_pct": ("Coût paiement / trx (%)", "preset_cout_paiement_pct"),
+    "cout_liquidite_10j_pct": ("Coût liquidité (ramené à 10j, %)", "preset_cout_liquidite_10j_pct"),
+    "defaut_30j_pct": ("Défaut 30j / trx (%)", "preset_defaut_30j_pct"),
+}
+
+
+@st.fragment
+def render_backtest():
+    """Backtest : taux glissants réalisés (ledger ingéré) vs preset en vigueur à chaque date."""
+    st.markdown("### Backtest (ledger vs presets)")
+    with st.expander("Rejouer le ledger en fenêtres glissantes", expanded=False):
+        daily = st.session_state.get("ledger_daily")
+        if daily is None or len(daily) == 0:
+            st.info("Ingère d'abord un ledger (sidebar « Presets depuis un ledger ») : le backtest rejoue ses agrégats journaliers.")
+            return
+        b1, b2 = st.columns([0.5, 0.5])
+        with b1:
+            windows = st.multiselect("Fenêtres (jours)", BACKTEST_WINDOWS, default=[30, 90], key="bt_windows")
+        with b2:
+            metric = st.selectbox("Taux", list(BACKTEST_METRICS), format_func=lambda k: BACKTEST_METRICS[k][0], key="bt_metric")
+        if not windows:
+            return
+        windows = tuple(sorted(windows))
+        bt, errors = cached_backtest(daily, windows)
+
+        label, preset_col = BACKTEST_METRICS[metric]
+        frames = []
+        for w in windows:
+            t, y = downsample(series_from_frame(bt, f"{metric}_{w}j", date_col=None), HISTORY_MAX_POINTS)
+            frames.append(to_frame((t, y), "valeur").assign(série=f"Réalisé {w}j"))
+        t, y = downsample(series_from_frame(bt, preset_col, date_col=None), HISTORY_MAX_POINTS)
+        frames.append(to_frame((t, y), "valeur").assign(série="Preset en vigueur"))
+        bt_df = pd.concat(frames, ignore_index=True)
+        bt_chart = (
+            alt.Chart(bt_df)
+            .mark_line()
+            .encode(
+                x=alt.X("date:T", title=None),
+                y=alt.Y("valeur:Q", title=label),
+                color=alt.Color("série:N", title=None),
+                strokeDash=alt.condition(alt.datum.série == "Preset en vigueur", alt.value([6, 3]), alt.value([1, 0])),
+                tooltip=["date:T", "série:N", alt.Tooltip("valeur:Q", format=".3f")],
+            )
+            .properties(height=280)
+        )
+        st.altair_chart(bt_chart, use_container_width=True)
+        st.caption(
+            f"{len(bt):,} jours ({bt.index[0]:%Y-%m-%d} → {bt.index[-1]:%Y-%m-%d}) ; une fenêtre n'est tracée qu'une fois pleine. "
+            "Prédiction = dernier preset daté à la date (presets hard-codés)."
+        )
+        if len(errors):
+            st.dataframe(errors.round(3), use_container_width=True, hide_index=True)
+            st.caption("Écart de contribution margin réalisé − prédit, en points : biais (moyenne) et MAE par période de preset.")
+
+
+COMPARE_COLUMNS = {
+    "contribution_margin_pct": "Contribution margin (%)",
+    "contribution_value_k": "Contribution (k€/mois)",
+    "monthly_revenue_eur": "Revenue / mois (€)",
+    "take_rate_effective_pct": "Take rate effectif (%)",
+    "nb_loans_per_month": "Prêts / mois",
+    "nb_clients_per_month": "Clients / mois",
+}
+COMPARE_MAX_SELECTION = 500
+COMPARE_MAX_WATERFALLS = 12
+
+
+def set_baseline_from_current():
+    st.session_state.baseline = {"label": f"Point actuel ({st.session_state['scenario_date']})", **{k: float(st.session_state[k]) for k in (*INPUT_KEYS, TENURE_KEY)}}
+
+
+def set_baseline_from_saved():
+    sid = st.session_state.get("cmp_baseline_pick")
+    if sid is None:
+        return
+    row = load_scenarios([sid]).iloc[0]
+    st.session_state.baseline = {"label": f"{row['date']} — {row['name']}", **{k: float(row[k]) for k in (*INPUT_KEYS, TENURE_KEY)}}
+
+
+@st.fragment
+def render_comparison():
+    """Comparaison de N scénarios sauvegardés : matrice d'outputs, deltas vs baseline, waterfalls empilés."""
+    st.markdown("### Comparer des scénarios sauvegardés")
+    with st.expander("Sélection et baseline", expanded=False):
+        f1, f2 = st.columns([0.6, 0.4])
+        with f1:
+            cmp_search = st.text_input("Filtrer par label", key="cmp_search")
+        options = list_scenarios(name_like=cmp_search, limit=COMPARE_MAX_SELECTION)
+        filtered = dict(zip(options["id"], options["date"] + " — " + options["name"]))
+        # la sélection reste dans les options : le filtre réduit la liste sans la vider
+        picked = [*st.session_state.get("cmp_ids", []), st.session_state.get("cmp_baseline_pick")]
+        hidden = list(dict.fromkeys(int(i) for i in picked if i is not None and i not in filtered))
+        labels = dict(filtered)
+        if hidden:
+            selected = load_scenarios(hidden)
+            labels = {**dict(zip(selected["id"], selected["date"].astype(str) + " — " + selected["name"].astype(str))), **filtered}
+        with f2:
+            take_all = st.checkbox(f"Tous les scénarios filtrés (max {COMPARE_MAX_SELECTION})", key="cmp_all")
+        if take_all:
+            ids = list(filtered)
+        else:
+            ids = st.multiselect("Scénarios", list(labels), format_func=labels.get, key="cmp_ids")
+
+        b1, b2 = st.columns([0.6, 0.4])
+        with b1:
+            st.selectbox(
+                "Baseline = un scénario sauvegardé",
+                list(labels),
+                index=None,
+                format_func=labels.get,
+                key="cmp_baseline_pick",
+                on_change=set_baseline_from_saved,
+            )
+        with b2:
+            st.button("Baseline = point actuel", key="cmp_baseline_current", on_click=set_baseline_from_current)
+
+        if st.session_state.baseline is None:
+            set_baseline_from_current()
+        baseline = st.session_state.baseline
+        st.caption(f"Baseline : **{baseline['label']}**")
+
+        if not ids:
+            st.info("Sélectionne des scénarios à comparer.")
+            return
+
+        evaluated, base_metrics = cached_comparison(
+            tuple(int(i) for i in ids), history_version(), tuple((k, baseline[k]) for k in (*INPUT_KEYS, TENURE_KEY) if k in baseline)
+        )
+        cols = list(COMPARE_COLUMNS)
+        matrix = evaluated.set_index("scenario")[cols].rename(columns=COMPARE_COLUMNS)
+        deltas = (evaluated.set_index("scenario")[cols] - base_metrics[cols].astype(float)).rename(
+            columns={c: f"Δ {label}" for c, label in COMPARE_COLUMNS.items()}
+        )
+
+        tab_matrix, tab_deltas, tab_wf = st.tabs(["Outputs", "Δ vs baseline", "Waterfalls"])
+        with tab_matrix:
+            st.dataframe(matrix.round(2), use_container_width=True)
+        with tab_deltas:
+            st.dataframe(
+                deltas.round(2).style.map(lambda v: f"color: {'#1B5A43' if v > 0 else '#F83131' if v < 0 else 'inherit'}"),
+                use_container_width=True,
+            )
+        with tab_wf:
+            shown = evaluated.head(COMPARE_MAX_WATERFALLS)
+            st.altair_chart(waterfall_chart(make_waterfalls_df(shown), row="scenario"), use_container_width=True)
+            if len(evaluated) > COMPARE_MAX_WATERFALLS:
+                st.caption(f"{COMPARE_MAX_WATERFALLS} premiers waterfalls sur {len(evaluated)} scénarios.")
+        st.caption(f"{len(evaluated)} scénarios + baseline évalués en une passe.")
+
+
+@st.fragment
+@prof.fragment("historique")
+def render_history():
+    """Courbe d'historique + scénarios sauvegardés (pagination / import sans relancer la page)."""
+    st.markdown("### Évolution dans le temps (Contribution margin uniquement)")
+
+    # Dernier SAVE par date (toutes dates) + marge journalière du ledger ingéré, en colonnes
+    df_hist, saved_series = cached_saved_history(history_version())
+    series = merge_series(saved_series, st.session_state.get("ledger_history", empty_series()))
+
+    period = st.radio("Période", list(HISTORY_PERIODS), horizontal=True, key="hist_period")
+    if HISTORY_PERIODS[period] is not None and len(series[0]):
+        start = series[0][-1] - np.timedelta64(HISTORY_PERIODS[period], "D")
+        series = window(series, start=start)
+        df_hist = df_hist[pd.to_datetime(df_hist["date"]).to_numpy(dtype="datetime64[D]") >= start]
+    shown = downsample(series, HISTORY_MAX_POINTS)
+
+    st.altair_chart(history_chart(to_frame(shown, "contribution_margin_pct")), use_container_width=True)
+    st.caption(f"{len(series[0]):,} jours d'historique • {len(shown[0]):,} points affichés (LTTB)")
+    prof.lap("historique_chart")
+
+    # tableau borné lui aussi : les dates les plus récentes de la période, au plus HISTORY_MAX_POINTS
+    st.dataframe(df_hist.iloc[::-1].head(HISTORY_MAX_POINTS), use_container_width=True, hide_index=True)
+    if len(df_hist) > HISTORY_MAX_POINTS:
+        st.caption(f"{HISTORY_MAX_POINTS:,} dates les plus récentes sur {len(df_hist):,} (voir « Scénarios sauvegardés » pour tout parcourir)")
+    prof.lap("historique_dataframe")
+
+    # --------------------------------------------------
+    # SCÉNARIOS SAUVEGARDÉS (base partagée, paginée)
+    # --------------------------------------------------
+    with st.expander("Scénarios sauvegardés", expanded=False):
+        h1, h2, h3 = st.columns([0.5, 0.25, 0.25])
+        with h1:
+            hist_search = st.text_input("Filtrer par label", key="hist_search")
+        with h2:
+            hist_page_size = st.selectbox("Lignes / page", [25, 50, 100, 250], index=1, key="hist_page_size")
+        n_saved = count_scenarios(name_like=hist_search)
+        n_pages = max(1, -(-n_saved // hist_page_size))
+        with h3:
+            hist_page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key="hist_page")
+        st.dataframe(
+            query_page(int(hist_page) - 1, hist_page_size, name_like=hist_search),
+            use_container_width=True,
+            hide_index=True,
+        )
+        st.caption(f"{n_saved:,} scénarios • page {int(hist_page)}/{n_pages}")
+
+        uploaded = st.file_uploader("Importer des scénarios (CSV : date, name + les 8 inputs)", type="csv", key="hist_import")
+        if uploaded is not None and st.button("Importer", key="hist_import_btn"):
+            try:
+                n_imported = import_csv(uploaded)
+                st.success(f"{n_imported:,} scénarios importés.")
+            except (KeyError, ValueError) as e:
+                st.error(f"Import impossible : {e}")
+    prof.lap("scenarios_sauvegardes")
+
+
+prof.lap("helpers")
+
 # --------------------------------------------------
 # NAVIGATION
 # --------------------------------------------------
-page = st.sidebar.radio("Navigation", ["Simulateur", "Comment je modélise une courbe ?"])
+page = st.sidebar.radio("Navigation", ["Simulateur", "Comment je modélise une courbe ?"], key="page")
+
+# --------------------------------------------------
+# LEDGER -> PRESETS (sidebar)
+# --------------------------------------------------
+with st.sidebar.expander("Presets depuis un ledger", expanded=False):
+    ledger_path = st.text_input("Chemin du ledger (CSV / Parquet)", key="ledger_path")
+    st.caption("Colonnes: date, amount_eur, revenue_eur, payment_cost_eur, liquidity_cost_eur, default_30j_eur (+ tenure_days optionnel).")
+    if st.button("Ingérer", key="ledger_ingest") and ledger_path:
+        # en arrière-plan : la page reste utilisable, le résultat est appliqué par « Calculs en arrière-plan »
+        try:
+            from jobs import QUEUE, file_stamp
+
+            job = QUEUE.submit("ledger", {"path": ledger_path, **file_stamp(ledger_path)}, st.session_state.session_uid)
+            st.session_state.ledger_job = job.id
+            st.session_state.ledger_job_applied = False
+            st.info("Ingestion lancée : suivi dans « Calculs en arrière-plan » (page Simulateur).")
+        except OSError as e:
+            st.error(f"Ingestion impossible : {e}")
+    if st.session_state.get("ledger_presets"):
+        import pandas as pd
+
+        st.dataframe(
+            pd.DataFrame.from_dict(st.session_state.ledger_presets, orient="index").drop(columns="name"),
+            use_container_width=True,
+        )
+        st.caption("Choisis le 1er du mois dans « Date » pour appliquer un preset.")
+prof.lap("sidebar")
 
 # ==================================================
 # PAGE 2
 # ==================================================
 if page == "Comment je modélise une courbe ?":
     st.title("Comment fonctionne le simulateur Waribei ?")
+    prof.mark_first_paint()
     st.markdown(
         """
 - Historique: **Jun 2025**, **Dec 2025**, **Jun 2026**
 - Courbe "Évolution dans le temps" : uniquement **contribution_margin_pct**
 """
     )
+    prof.lap("page_modelisation")
 
 # ==================================================
 # PAGE 1
 # ==================================================
 else:
+    # Bibliothèques lourdes : chargées au premier affichage de cette page (ensuite déjà dans sys.modules)
+    import numpy as np
+    import pandas as pd
+    import altair as alt
+
+    from charts import history_chart, make_waterfall_df, make_waterfalls_df, waterfall_chart
+    from cohort import daily_originations, liquidity_cost_pct, monthly_summary, simulate_cohorts
+    from engine import INPUT_KEYS, TENURE_KEY, compute_frame
+    from montecarlo import DISTRIBUTIONS, MC_PERCENTILES, run_monte_carlo, spec_from_spread
+    from projection import Projection, ramp_overrides
+    from resultcache import point_results
+    from sensitivity import SURFACE_METRICS, SWEEP_AXES, TORNADO_METRICS, fixed_inputs_key, surface_to_df, sweep_grid, tornado
+    from solver import GOAL_METRICS, INPUT_LABELS, SOLVER_BOUNDS, iso_curves, solve_for
+    from rollrate import (
+        default_matrix,
+        estimate_roll_rates,
+        loss_curves,
+        loss_pct,
+        matrix_to_frame,
+        portfolio_loss_pct,
+        stress,
+    )
+    from termstructure import DEFAULT_CURVE, TermStructure
+    from store import (
+        count_scenarios,
+        history_version,
+        import_csv,
+        latest_per_date,
+        list_scenarios,
+        load_scenarios,
+        query_page,
+        save_scenario,
+        seed_if_missing,
+    )
+    from backtest import backtest, error_summary
+    from diskstore import STORE
+    from jobs import QUEUE, file_stamp
+    from segments import NAME_COL, SEGMENT_KEYS, SHARE_COL, SegmentTable, default_segments, evaluate as evaluate_segments
+    from timeseries import downsample, empty_series, merge_series, series_from_frame, to_frame, window
+
+    prof.lap("imports")
+    seed_history_store()
+    st.markdown(static_assets()["css"], unsafe_allow_html=True)
+    prof.lap("assets")
+
     top = st.columns([0.7, 0.3])
     with top[0]:
         st.title("Unit Economics – Waribei")
     with top[1]:
-        try:
-            st.image("logo_waribei_icon@2x.png", width=100)
-        except Exception:
+        if static_assets()["logo"] is not None:
+            st.image(static_assets()["logo"], width=100)
+        else:
             st.write("Logo Waribei (ajoute `logo_waribei_icon@2x.png`)")
+    prof.mark_first_paint()
 
     st.markdown("---")
+    prof.lap("header")
 
-    # --------------------------------------------------
-    # APPLY PENDING SCENARIO (avant widgets)
-    # --------------------------------------------------
-    if "pending_scenario" in st.session_state and st.session_state.pending_scenario:
-        apply_scenario_preset(st.session_state.pending_scenario)
-        # important : on consomme l'action pour éviter de ré-appliquer à chaque rerun
-        st.session_state.pending_scenario = None
-
-    
     main_left, main_right = st.columns([0.68, 0.32], gap="large")
 
     # =========================
@@ -389,9 +1442,26 @@ else:
         with c2:
             vbar_widget("Coût paiement / trx", "cout_paiement_pct", 0.0, 2.0, 0.01, "Coût des rails de paiement.", "cost")
         with c3:
-            vbar_widget("Coût liquidité (10j)", "cout_liquidite_10j_pct", 0.0, 1.5, 0.01, "Coût de financement sur 10 jours.", "cost")
+            liq_days = float(st.session_state["duree_liquidite_jours"])
+            vbar_widget(
+                f"Coût liquidité ({liq_days:g}j)",
+                "cout_liquidite_10j_pct",
+                0.0,
+                max(1.5, float(np.ceil(st.session_state["cout_liquidite_10j_pct"] * 2) / 2)),  # tenures longues
+                0.01,
+                f"Coût de financement sur {liq_days:g} jours.",
+                "cost",
+            )
         with c4:
-            vbar_widget("Défaut 30j / trx", "defaut_30j_pct", 0.0, 5.0, 0.01, "Perte attendue (net) à 30 jours.", "cost")
+            vbar_widget(
+                "Défaut 30j / trx",
+                "defaut_30j_pct",
+                0.0,
+                max(5.0, float(np.ceil(st.session_state["defaut_30j_pct"]))),  # pertes stressées (roll-rate)
+                0.01,
+                "Perte attendue (net) à 30 jours.",
+                "cost",
+            )
 
         st.markdown("</div>", unsafe_allow_html=True)
         st.markdown("")
@@ -463,36 +1533,37 @@ else:
             )
 
         st.markdown("</div>", unsafe_allow_html=True)
+        st.markdown("")
+        render_liquidity_term_structure()
+        render_default_model()
+
+    prof.lap("inputs")
 
     # =========================
     # RIGHT: Outputs + panel Inputs en bas
     # =========================
     with main_right:
-        # --- CALCULS
+        # --- CALCULS (moteur vectorisé, cf. engine.py — ici pour un seul point)
         revenu_pct = float(st.session_state["revenu_pct"])
         cout_paiement_pct = float(st.session_state["cout_paiement_pct"])
         cout_liquidite_10j_pct = float(st.session_state["cout_liquidite_10j_pct"])
         defaut_30j_pct = float(st.session_state["defaut_30j_pct"])
-        cycles_per_month = float(st.session_state["cycles_per_month"])
-        loan_book_k = float(st.session_state["loan_book_k"])
-        avg_loan_value_eur = float(st.session_state["avg_loan_value_eur"])
-        tx_per_client_per_month = float(st.session_state["tx_per_client_per_month"])
-
-        taux_liquidite_annuel_pct = cout_liquidite_10j_pct * 365 / DUREE_PERIODE_LIQUIDITE_JOURS
-        cout_total_pct = cout_paiement_pct + cout_liquidite_10j_pct + defaut_30j_pct
-        contribution_margin_pct = revenu_pct - cout_total_pct
-
-        monthly_volume_eur = loan_book_k * 1000 * cycles_per_month
-        monthly_revenue_eur = monthly_volume_eur * (revenu_pct / 100)
-        annual_revenue_eur = monthly_revenue_eur * 12
-        contribution_value_k = loan_book_k * cycles_per_month * contribution_margin_pct / 100
 
-        nb_loans_per_month = monthly_volume_eur / avg_loan_value_eur if avg_loan_value_eur > 0 else 0.0
-        nb_clients_per_month = nb_loans_per_month / tx_per_client_per_month if tx_per_client_per_month > 0 else 0.0
-
-        revenue_per_loan_eur = avg_loan_value_eur * (revenu_pct / 100)
-        revenue_per_client_month_eur = revenue_per_loan_eur * tx_per_client_per_month
-        take_rate_effective_pct = (monthly_revenue_eur / monthly_volume_eur * 100) if monthly_volume_eur > 0 else 0.0
+        # metrics + waterfall depuis le cache partagé entre sessions (clé = hash des 8 inputs)
+        point = point_results({k: st.session_state[k] for k in (*INPUT_KEYS, TENURE_KEY)})
+        metrics = point["metrics"]
+        taux_liquidite_annuel_pct = metrics["taux_liquidite_annuel_pct"]
+        contribution_margin_pct = metrics["contribution_margin_pct"]
+        monthly_volume_eur = metrics["monthly_volume_eur"]
+        monthly_revenue_eur = metrics["monthly_revenue_eur"]
+        annual_revenue_eur = metrics["annual_revenue_eur"]
+        contribution_value_k = metrics["contribution_value_k"]
+        nb_loans_per_month = metrics["nb_loans_per_month"]
+        nb_clients_per_month = metrics["nb_clients_per_month"]
+        revenue_per_loan_eur = metrics["revenue_per_loan_eur"]
+        revenue_per_client_month_eur = metrics["revenue_per_client_month_eur"]
+        take_rate_effective_pct = metrics["take_rate_effective_pct"]
+        prof.lap("calculs")
 
         # --- OUTPUTS
         st.subheader("Contribution")
@@ -555,137 +1626,94 @@ else:
         st.markdown('<div class="wb-card">', unsafe_allow_html=True)
         st.markdown("### Inputs")
 
-        scenario = st.selectbox(
+        # preset appliqué en callback (avant le rerun) -> pas de second st.rerun()
+        st.selectbox(
             "Scénarios rapides",
             list(SCENARIOS_PRESETS.keys()),
+            key="scenario_choice",
+            on_change=on_scenario_picked,
         )
         st.caption("Choisis un scénario puis ajuste les curseurs.")
-        
-        if "pending_scenario" not in st.session_state:
-            st.session_state.pending_scenario = None
-        
-        if scenario != "Custom":
-            st.session_state.pending_scenario = scenario
-            st.rerun()
-
-
 
+        # les presets de date modifient des widgets déjà créés -> appliqués en callback (avant le rerun)
+        if "date_picker" not in st.session_state:
+            st.session_state["date_picker"] = st.session_state["scenario_date"]
         dcols = st.columns([0.72, 0.28])
         with dcols[1]:
-            if st.button("Today"):
-                st.session_state["scenario_date"] = DEFAULT_DATE
-                apply_preset_for_date(DEFAULT_DATE, force=True)
+            st.button("Today", on_click=on_today_clicked)
         with dcols[0]:
-            picked = st.date_input("Date", value=st.session_state.get("scenario_date", DEFAULT_DATE))
-            st.session_state["scenario_date"] = picked
-        apply_preset_for_date(st.session_state["scenario_date"], force=False)
+            st.date_input("Date", key="date_picker", on_change=on_date_picked)
 
         default_label = st.session_state.get("scenario_name_autofill", "Scenario")
         scenario_name = st.text_input("Label du scénario", value=default_label)
 
         if st.button("SAVE"):
-            # On met à jour (ou crée) le point Jun 2026 pour la courbe contribution_margin_pct
+            # upsert (date, label) dans la base partagée ; la courbe prend le dernier point sauvegardé par date
             d = st.session_state["scenario_date"]
-            cm_now = contribution_margin_pct
-
-            # on remplace si date déjà présente, sinon on ajoute
-            replaced = False
-            for i, s in enumerate(st.session_state.scenarios):
-                if s.get("date") == d:
-                    st.session_state.scenarios[i] = {"date": d, "name": scenario_name, "contribution_margin_pct": cm_now}
-                    replaced = True
-                    break
-            if not replaced:
-                st.session_state.scenarios.append({"date": d, "name": scenario_name, "contribution_margin_pct": cm_now})
+            save_scenario(d, scenario_name, {k: st.session_state[k] for k in (*INPUT_KEYS, TENURE_KEY)}, metrics)
 
             st.success(f"Scénario '{scenario_name}' sauvegardé ({d}).")
 
         st.markdown("</div>", unsafe_allow_html=True)
 
     st.markdown("---")
+    prof.lap("outputs")
 
     # --------------------------------------------------
-    # WATERFALL (inchangé)
+    # WATERFALL
     # --------------------------------------------------
-    def make_waterfall_df(revenue, pay_cost, liq_cost, default_cost, margin):
-        steps = ["Revenu", "Coût paiement", "Coût liquidité (10j)", "Défaut 30j", "Contribution"]
-        values = [revenue, -pay_cost, -liq_cost, -default_cost, margin]
-
-        start, end = [], []
-        running = 0.0
-        for v in values[:-1]:
-            start.append(running)
-            running += v
-            end.append(running)
-
-        start.append(0.0)
-        end.append(margin)
-
-        types = []
-        for i, v in enumerate(values):
-            if i == len(values) - 1:
-                types.append("total")
-            elif v >= 0:
-                types.append("positive")
-            else:
-                types.append("negative")
-
-        return pd.DataFrame({"step": steps, "value": values, "start": start, "end": end, "type": types})
-
     st.markdown("### Décomposition par transaction (waterfall)")
-    wf_df = make_waterfall_df(
-        revenu_pct,
-        cout_paiement_pct,
-        cout_liquidite_10j_pct,
-        defaut_30j_pct,
-        contribution_margin_pct,
-    )
-
-    color_scale = alt.Scale(domain=["positive", "negative", "total"], range=["#1B5A43", "#F83131", "#064C72"])
-    waterfall_chart = (
-        alt.Chart(wf_df)
-        .mark_bar()
-        .encode(
-            x=alt.X("step:N", title=None, sort=list(wf_df["step"])),
-            y=alt.Y("start:Q", axis=alt.Axis(title="%")),
-            y2="end:Q",
-            color=alt.Color("type:N", scale=color_scale, legend=None),
-        )
-    )
-    wf_labels = (
-        alt.Chart(wf_df)
-        .mark_text(dy=-6, color="#333", fontSize=11)
-        .encode(
-            x=alt.X("step:N", sort=list(wf_df["step"])),
-            y="end:Q",
-            text=alt.Text("value:Q", format=".2f"),
-        )
-    )
-    st.altair_chart((waterfall_chart + wf_labels).properties(height=260), use_container_width=True)
+    st.vega_lite_chart(point["waterfall_spec"], use_container_width=True)
+    prof.lap("waterfall")
 
     # --------------------------------------------------
-    # TIME SERIES: seulement contribution_margin_pct (3 dates)
+    # SECTIONS (fragments)
     # --------------------------------------------------
-    st.markdown("### Évolution dans le temps (Contribution margin uniquement)")
-
-    df_hist = pd.DataFrame(st.session_state.scenarios)
-
-    # Garde uniquement les 3 dates demandées (si Jun 2026 a été modifié via SAVE, il sera mis à jour)
-    df_hist = df_hist[df_hist["date"].isin(HISTORY_DATES)].sort_values("date")
-
-    # Sécurité: si doublons, on garde la dernière occurrence
-    df_hist = df_hist.drop_duplicates(subset=["date"], keep="last")
+    render_sensitivity()
+    prof.lap("sensibilite")
+    render_tornado()
+    prof.lap("tornado")
+    render_monte_carlo()
+    prof.lap("monte_carlo")
+    render_cohorts({k: float(st.session_state[k]) for k in INPUT_KEYS}, metrics)
+    prof.lap("cohortes")
+    render_goal_seek({k: float(st.session_state[k]) for k in INPUT_KEYS}, metrics)
+    prof.lap("goal_seek")
+    render_projection({k: float(st.session_state[k]) for k in INPUT_KEYS})
+    prof.lap("projection")
+    render_segments({k: float(st.session_state[k]) for k in INPUT_KEYS})
+    prof.lap("segments")
+    render_history()
+    render_backtest()
+    prof.lap("backtest")
+    render_comparison()
+    prof.lap("comparaison")
+    render_jobs()
+    prof.lap("jobs")
 
-    line_chart = (
-        alt.Chart(df_hist)
-        .mark_line(point=True)
-        .encode(
-            x=alt.X("date:T", title="Date"),
-            y=alt.Y("contribution_margin_pct:Q", title="%"),
-            tooltip=[alt.Tooltip("date:T", title="Date"), alt.Tooltip("contribution_margin_pct:Q", title="Contribution (%)", format=".2f")],
+# --------------------------------------------------
+# PROFILAGE (sidebar)
+# --------------------------------------------------
+prof.finish()
+with st.sidebar.expander("Profilage des reruns", expanded=False):
+    st.checkbox("Activer le profilage", key="profiling_enabled")
+    if "resultcache" in sys.modules:
+        cache_stats = sys.modules["resultcache"].RESULTS.stats()
+        st.caption(
+            f"Cache résultats (process) : {cache_stats['hits']:,} hits • {cache_stats['misses']:,} misses "
+            f"({cache_stats['hit_rate']:.0%}) • {cache_stats['size']}/{cache_stats['maxsize']} entrées • {cache_stats['evictions']:,} évictions"
         )
-        .properties(height=260)
-    )
-    st.altair_chart(line_chart, use_container_width=True)
-
-    st.dataframe(df_hist, use_container_width=True)
+    if "jobs" in sys.modules:
+        job_stats = sys.modules["jobs"].QUEUE.stats()
+        st.caption(
+            f"Jobs (process) : {job_stats['running']} en cours • {job_stats['queued']} en attente • "
+            f"{job_stats['submitted']:,} soumis • {job_stats['deduplicated']:,} dédupliqués"
+        )
+    if prof.first_paint_ms is not None:
+        st.caption(f"Premier affichage de la session : {prof.first_paint_ms:,.0f} ms ({'process froid' if prof.cold_start else 'process chaud'}).")
+    if prof.runs:
+        st.dataframe(prof.summary().round(2), use_container_width=True, hide_index=True)
+        st.caption(f"{len(prof.runs)} reruns mesurés (fenêtre glissante) ; p50 / p95 en ms.")
+        st.download_button("Exporter (JSON)", prof.to_json(), file_name="waribei_profiling.json", mime="application/json")
+    else:
+        st.caption("Active puis interagis avec la page : chaque rerun (complet ou d'un fragment seul) est chronométré par section.")
@@ -0,0 +1,137 @@
+"""
+Backtest : contribution margin réalisée (fenêtres glissantes 30 / 90 jours) contre
+celle que prédisait le preset en vigueur à chaque date.
+
+Les transactions ne sont lues qu'une fois, par l'ingestion du ledger (agrégats
+journaliers, voir ledger.py). Les fenêtres glissantes sont ensuite incrémentales :
+sommes cumulées sur le calendrier complet (jours sans transaction = 0), et chaque
+fenêtre = cumul[t] - cumul[t - w], soit O(1) par jour et par fenêtre quel que soit w,
+pour toutes les fenêtres d'un coup. Les taux sont des ratios de sommes (pondérés
+par le montant), jamais des moyennes de taux journaliers.
+
+Prédiction : preset « as-of » (dernier preset daté <= jour), contribution margin =
+revenu_pct - coûts du preset.
+"""
+from typing import Iterable, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from ledger import AGG_FIELDS
+from presets import PRESET_PCT_KEYS, PRESETS_BY_DATE
+
+DEFAULT_WINDOWS = (30, 90)
+REF_TENURE_DAYS = 10
+RATE_KEYS = ("revenu_pct", "cout_paiement_pct", "cout_liquidite_pct", "cout_liquidite_10j_pct", "defaut_30j_pct", "contribution_margin_pct")
+
+
+def calendar_sums(daily: pd.DataFrame) -> tuple:
+    """
+    Agrégats journaliers (index 'YYYY-MM-DD' ou dates) -> (jours datetime64[D] du premier
+    au dernier jour, sommes (jours, AGG_FIELDS) avec des zéros pour les jours sans transaction).
+    """
+    if daily is None or len(daily) == 0:
+        return np.array([], dtype="datetime64[D]"), np.zeros((0, len(AGG_FIELDS)))
+    t = pd.to_datetime(daily.index).to_numpy(dtype="datetime64[D]")
+    values = daily.reindex(columns=list(AGG_FIELDS)).fillna(0.0).to_numpy(dtype=np.float64)
+    days = np.arange(t.min(), t.max() + np.timedelta64(1, "D"), dtype="datetime64[D]")
+    sums = np.zeros((len(days), len(AGG_FIELDS)))
+    np.add.at(sums, (t - days[0]).astype(np.int64), values)  # doublons éventuels additionnés
+    return days, sums
+
+
+def rolling_sums(sums: np.ndarray, windows: Iterable[int]) -> np.ndarray:
+    """
+    Sommes glissantes (fenêtres, jours, champs) via un seul cumul : fenêtre w au jour t =
+    cumul[t] - cumul[t - w]. NaN tant que la fenêtre n'est pas pleine.
+    """
+    windows = [int(w) for w in windows]
+    n = len(sums)
+    cum = np.concatenate([np.zeros((1, sums.shape[1])), np.cumsum(sums, axis=0)])
+    out = np.full((len(windows), n, sums.shape[1]), np.nan)
+    for i, w in enumerate(windows):
+        if 0 < w <= n:
+            out[i, w - 1 :] = cum[w:] - cum[: n - w + 1]
+    return out
+
+
+def rates_from_sums(s: np.ndarray, ref_tenure_days: float = REF_TENURE_DAYS) -> dict:
+    """Sommes (..., AGG_FIELDS) -> taux en % du montant (NaN si montant nul), mêmes règles que aggregates_to_presets."""
+    f = {name: s[..., i] for i, name in enumerate(AGG_FIELDS)}
+    amount = np.where(f["amount"] > 0, f["amount"], np.nan)
+    liq = f["liquidity_cost"] / amount * 100
+    with_tenure = f["amount_with_tenure"]
+    avg_tenure = f["amount_x_tenure"] / np.where(with_tenure > 0, with_tenure, np.nan)
+    out = {
+        "revenu_pct": f["revenue"] / amount * 100,
+        "cout_paiement_pct": f["payment_cost"] / amount * 100,
+        "cout_liquidite_pct": liq,
+        # ramené à la tenure de référence si le ledger a une tenure (comparable au preset)
+        "cout_liquidite_10j_pct": np.where(avg_tenure > 0, liq * ref_tenure_days / np.where(avg_tenure > 0, avg_tenure, 1.0), liq),
+        "defaut_30j_pct": f["default_30j"] / amount * 100,
+    }
+    out["contribution_margin_pct"] = out["revenu_pct"] - out["cout_paiement_pct"] - out["cout_liquidite_pct"] - out["defaut_30j_pct"]
+    return out
+
+
+def preset_predictions(days: np.ndarray, presets: Optional[Mapping] = None) -> pd.DataFrame:
+    """Preset en vigueur (as-of) pour chaque jour, ses 4 % et la contribution margin prédite."""
+    presets = PRESETS_BY_DATE if presets is None else presets
+    keys = sorted(presets)
+    out = pd.DataFrame(index=pd.DatetimeIndex(days.astype("datetime64[ns]"), name="day"))
+    if not keys:
+        out["preset"] = None
+        out["predicted_cm_pct"] = np.nan
+        return out
+    starts = np.array(keys, dtype="datetime64[D]")
+    idx = np.searchsorted(starts, days, side="right") - 1
+    valid = idx >= 0
+    safe = np.where(valid, idx, 0)
+    for k in PRESET_PCT_KEYS:
+        col = np.array([float(presets[d][k]) for d in keys])
+        out[f"preset_{k}"] = np.where(valid, col[safe], np.nan)
+    names = np.array([presets[d].get("name", str(d)) for d in keys], dtype=object)
+    out["preset"] = np.where(valid, names[safe], None)
+    out["predicted_cm_pct"] = (
+        out["preset_revenu_pct"] - out["preset_cout_paiement_pct"] - out["preset_cout_liquidite_10j_pct"] - out["preset_defaut_30j_pct"]
+    )
+    return out
+
+
+def backtest(daily: pd.DataFrame, windows: Iterable[int] = DEFAULT_WINDOWS, presets: Optional[Mapping] = None) -> pd.DataFrame:
+    """
+    Une ligne par jour du calendrier : taux glissants réalisés par fenêtre (colonnes
+    `<taux>_<w>j`), preset en vigueur, contribution margin prédite et écart réalisé - prédit.
+    """
+    windows = tuple(int(w) for w in windows)
+    days, sums = calendar_sums(daily)
+    out = preset_predictions(days, presets)
+    rolled = rolling_sums(sums, windows)
+    for i, w in enumerate(windows):
+        rates = rates_from_sums(rolled[i])
+        for k in RATE_KEYS:
+            out[f"{k}_{w}j"] = rates[k]
+        out[f"ecart_cm_{w}j"] = out[f"contribution_margin_pct_{w}j"] - out["predicted_cm_pct"]
+    out["amount_jour"] = sums[:, AGG_FIELDS.index("amount")]
+    return out
+
+
+def error_summary(bt: pd.DataFrame, windows: Iterable[int] = DEFAULT_WINDOWS) -> pd.DataFrame:
+    """Par preset en vigueur : jours couverts, biais (écart moyen) et MAE de la contribution margin, par fenêtre."""
+    rows = []
+    for w in windows:
+        col = f"ecart_cm_{w}j"
+        if col not in bt:
+            continue
+        valid = bt.dropna(subset=[col, "preset"])
+        for preset, grp in valid.groupby("preset", sort=False):
+            rows.append(
+                {
+                    "preset": preset,
+                    "fenêtre": f"{w}j",
+                    "jours": len(grp),
+                    "biais_pt": float(grp[col].mean()),
+                    "mae_pt": float(grp[col].abs().mean()),
+                }
+            )
+    return pd.DataFrame(rows, columns=["preset", "fenêtre", "jours", "biais_pt", "mae_pt"])
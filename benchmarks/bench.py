@@ -0,0 +1,187 @@
+"""
+Benchmarks du simulateur : moteur, waterfall, specs de graphiques et latence
+des reruns Streamlit (AppTest headless).
+
+    python benchmarks/bench.py                 # mesure + compare au dernier résultat
+    python benchmarks/bench.py --compare abc123 --max-regression 0.25
+
+Chaque run est enregistré dans benchmarks/results/<commit>.json ; le script
+sort en code 1 si une métrique régresse de plus de --max-regression par
+rapport à la référence (à brancher en CI avant déploiement).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from charts import history_chart, make_waterfall_df, waterfall_chart  # noqa: E402
+from engine import INPUT_KEYS, compute_metrics  # noqa: E402
+
+
+def _median_time(fn, repeat: int) -> float:
+    """Temps médian (s) d'un appel de fn sur `repeat` essais (après un appel de chauffe)."""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def _metric(value: float, unit: str, better: str) -> dict:
+    return {"value": value, "unit": unit, "better": better}
+
+
+# --------------------------------------------------
+# BENCHMARKS
+# --------------------------------------------------
+def bench_engine(n_rows: int, repeat: int) -> dict:
+    rng = np.random.default_rng(0)
+    cols = {k: rng.uniform(0.5, 5.0, n_rows) for k in INPUT_KEYS}
+    t = _median_time(lambda: compute_metrics(*(cols[k] for k in INPUT_KEYS)), repeat)
+    return {
+        "engine_scenarios_per_s": _metric(n_rows / t, "scenarios/s", "higher"),
+        "engine_single_point_us": _metric(
+            _median_time(lambda: compute_metrics(*(1.0 for _ in INPUT_KEYS)), repeat * 100) * 1e6, "us", "lower"
+        ),
+    }
+
+
+def bench_charts(repeat: int) -> dict:
+    wf_args = (3.8, 1.6, 0.4, 1.0, 0.8)
+    wf_df = make_waterfall_df(*wf_args)
+    hist_df = pd.DataFrame(
+        {"date": [date(2025, 6, 1), date(2025, 12, 1), date(2026, 6, 1)], "name": ["a", "b", "c"], "contribution_margin_pct": [0.3, 0.6, 1.2]}
+    )
+    return {
+        "make_waterfall_df_us": _metric(_median_time(lambda: make_waterfall_df(*wf_args), repeat * 10) * 1e6, "us", "lower"),
+        "waterfall_spec_ms": _metric(_median_time(lambda: waterfall_chart(wf_df).to_dict(), repeat) * 1e3, "ms", "lower"),
+        "history_spec_ms": _metric(_median_time(lambda: history_chart(hist_df).to_dict(), repeat) * 1e3, "ms", "lower"),
+    }
+
+
+def bench_app(repeat: int) -> dict:
+    """Latence de rerun complète du script via AppTest (base de scénarios temporaire)."""
+    from streamlit.testing.v1 import AppTest
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # lu à l'import de store.py (importé par app.py dans ce process)
+        os.environ["WARIBEI_DB"] = os.path.join(tmp, "bench.db")
+        at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=120)
+        t0 = time.perf_counter()
+        at.run()
+        first_run = time.perf_counter() - t0
+        if at.exception:
+            raise RuntimeError(f"app.py a levé une exception: {at.exception}")
+        first_paint = at.session_state["profiler"].first_paint_ms
+
+        values = iter(np.tile([3.5, 4.2], repeat + 1))
+        slider = _median_time(lambda: at.slider(key="revenu_pct").set_value(float(next(values))).run(), repeat)
+
+        presets = iter(np.tile(["Scénario 1 — Optimisation légère", "Scénario 2 — Open Banking"], repeat + 1))
+        preset = _median_time(lambda: at.selectbox(key="scenario_choice").set_value(str(next(presets))).run(), repeat)
+
+        save = _median_time(lambda: next(b for b in at.button if b.label == "SAVE").click().run(), repeat)
+
+    return {
+        "app_first_run_ms": _metric(first_run * 1e3, "ms", "lower"),
+        "app_first_paint_ms": _metric(first_paint, "ms", "lower"),
+        "app_rerun_slider_ms": _metric(slider * 1e3, "ms", "lower"),
+        "app_rerun_preset_ms": _metric(preset * 1e3, "ms", "lower"),
+        "app_rerun_save_ms": _metric(save * 1e3, "ms", "lower"),
+    }
+
+
+# --------------------------------------------------
+# STOCKAGE / COMPARAISON
+# --------------------------------------------------
+def _git_commit() -> str:
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, text=True).strip()
+        return f"{sha}-dirty" if dirty else sha
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _load_reference(ref, current_commit: str):
+    if ref:
+        path = Path(ref) if Path(ref).exists() else RESULTS_DIR / f"{ref}.json"
+        return json.loads(path.read_text()) if path.exists() else None
+    previous = sorted(
+        (p for p in RESULTS_DIR.glob("*.json") if p.stem != current_commit), key=lambda p: p.stat().st_mtime
+    )
+    return json.loads(previous[-1].read_text()) if previous else None
+
+
+def compare(current: dict, reference: dict, max_regression: float) -> list:
+    """Liste des (nom, ancien, nouveau, variation) qui régressent au-delà du seuil."""
+    regressions = []
+    for name, m in current["metrics"].items():
+        old = reference.get("metrics", {}).get(name)
+        if not old or not old["value"]:
+            continue
+        change = (m["value"] - old["value"]) / old["value"]
+        worse = -change if m["better"] == "higher" else change
+        if worse > max_regression:
+            regressions.append((name, old["value"], m["value"], change))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks du simulateur Waribei.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Scénarios pour le débit du moteur")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-app", action="store_true", help="Sans les reruns AppTest (Streamlit non installé)")
+    parser.add_argument("--compare", default=None, help="Commit ou fichier de référence (défaut: dernier résultat)")
+    parser.add_argument("--max-regression", type=float, default=0.20)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args(argv)
+
+    commit = _git_commit()
+    metrics = {}
+    metrics.update(bench_engine(args.rows, args.repeat))
+    metrics.update(bench_charts(args.repeat))
+    if not args.skip_app:
+        metrics.update(bench_app(args.repeat))
+
+    result = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "metrics": metrics,
+    }
+    for name, m in metrics.items():
+        print(f"{name:<28} {m['value']:>16,.2f} {m['unit']}")
+
+    reference = _load_reference(args.compare, commit)
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        (RESULTS_DIR / f"{commit}.json").write_text(json.dumps(result, indent=2))
+
+    if reference is None:
+        return 0
+    regressions = compare(result, reference, args.max_regression)
+    for name, old, new, change in regressions:
+        print(f"RÉGRESSION {name}: {old:,.2f} -> {new:,.2f} ({change:+.0%}) vs {reference['commit']}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Données et specs Altair des graphiques (sans Streamlit).
+"""
+import altair as alt
+import pandas as pd
+
+
+# --------------------------------------------------
+# WATERFALL
+# --------------------------------------------------
+def make_waterfall_df(revenue, pay_cost, liq_cost, default_cost, margin, liq_label: str = "Coût liquidité (10j)"):
+    steps = ["Revenu", "Coût paiement", liq_label, "Défaut 30j", "Contribution"]
+    values = [revenue, -pay_cost, -liq_cost, -default_cost, margin]
+
+    start, end = [], []
+    running = 0.0
+    for v in values[:-1]:
+        start.append(running)
+        running += v
+        end.append(running)
+
+    start.append(0.0)
+    end.append(margin)
+
+    types = []
+    for i, v in enumerate(values):
+        if i == len(values) - 1:
+            types.append("total")
+        elif v >= 0:
+            types.append("positive")
+        else:
+            types.append("negative")
+
+    return pd.DataFrame({"step": steps, "value": values, "start": start, "end": end, "type": types})
+
+
+def make_waterfalls_df(frame: pd.DataFrame, label_col: str = "scenario") -> pd.DataFrame:
+    """Waterfalls de N scénarios (colonnes des 4 % + contribution_margin_pct) en un DataFrame long."""
+    return pd.concat(
+        [
+            make_waterfall_df(
+                row.revenu_pct, row.cout_paiement_pct, row.cout_liquidite_10j_pct, row.defaut_30j_pct, row.contribution_margin_pct, "Coût liquidité"
+            ).assign(**{label_col: getattr(row, label_col)})
+            for row in frame.itertuples(index=False)
+        ],
+        ignore_index=True,
+    )
+
+
+def waterfall_chart(wf_df: pd.DataFrame, row: str = None):
+    """Waterfall ; avec `row`, un waterfall par valeur de cette colonne, empilés (facet)."""
+    color_scale = alt.Scale(domain=["positive", "negative", "total"], range=["#1B5A43", "#F83131", "#064C72"])
+    bars = (
+        alt.Chart(wf_df)
+        .mark_bar()
+        .encode(
+            x=alt.X("step:N", title=None, sort=list(dict.fromkeys(wf_df["step"]))),
+            y=alt.Y("start:Q", axis=alt.Axis(title="%")),
+            y2="end:Q",
+            color=alt.Color("type:N", scale=color_scale, legend=None),
+        )
+    )
+    wf_labels = (
+        alt.Chart(wf_df)
+        .mark_text(dy=-6, color="#333", fontSize=11)
+        .encode(
+            x=alt.X("step:N", sort=list(dict.fromkeys(wf_df["step"]))),
+            y="end:Q",
+            text=alt.Text("value:Q", format=".2f"),
+        )
+    )
+    if row is None:
+        return (bars + wf_labels).properties(height=260)
+    return (bars + wf_labels).properties(height=160).facet(row=alt.Row(f"{row}:N", title=None, sort=list(dict.fromkeys(wf_df[row]))))
+
+
+# --------------------------------------------------
+# HISTORIQUE (contribution_margin_pct)
+# --------------------------------------------------
+def history_chart(df_hist: pd.DataFrame, max_markers: int = 60):
+    """Courbe d'historique ; points marqués seulement pour les séries courtes."""
+    return (
+        alt.Chart(df_hist)
+        .mark_line(point=len(df_hist) <= max_markers)
+        .encode(
+            x=alt.X("date:T", title="Date"),
+            y=alt.Y("contribution_margin_pct:Q", title="%"),
+            tooltip=[alt.Tooltip("date:T", title="Date"), alt.Tooltip("contribution_margin_pct:Q", title="Contribution (%)", format=".2f")],
+        )
+        .properties(height=260)
+    )
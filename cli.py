@@ -0,0 +1,231 @@
+"""
+Batch unit economics en ligne de commande (sans Streamlit).
+
+    python cli.py scenarios.csv -o results.parquet --workers 8
+    python cli.py --builtin-presets -o presets.csv
+
+Entrée : CSV, JSON / JSONL, YAML ou Parquet, mêmes clés que SCENARIOS_PRESETS
+(+ avg_loan_value_eur, tx_per_client_per_month). Seules les colonnes d'input
+absentes prennent DEFAULT_INPUTS : une cellule vide ou non numérique arrête le
+batch avec ses numéros de ligne. Une tenure (duree_liquidite_jours) sans coût de
+liquidité est chiffrée sur la courbe de taux (--curve, sinon DEFAULT_CURVE).
+L'entrée est lue par chunks, évaluée en parallèle et écrite au fil de l'eau
+(CSV ou Parquet) : la mémoire reste bornée quel que soit le fichier.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from functools import partial
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from engine import INPUT_KEYS, OUTPUT_KEYS, TENURE_KEY, compute_frame
+from parallel import imap_ordered
+from presets import DEFAULT_INPUTS, SCENARIOS_PRESETS, records_from_obj
+from termstructure import TermStructure, price_liquidity
+
+DEFAULT_CHUNK_ROWS = 200_000
+MAX_REPORTED_ROWS = 10
+
+
+# --------------------------------------------------
+# LECTURE
+# --------------------------------------------------
+def _chunks_of(records: list, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    for i in range(0, len(records), chunk_rows):
+        yield pd.DataFrame(records[i : i + chunk_rows], index=pd.RangeIndex(i, min(i + chunk_rows, len(records))))
+
+
+def read_scenarios(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Itère sur les scénarios d'un fichier, par chunks de DataFrame (index = rang du scénario dans le fichier)."""
+    ext = os.path.splitext(path.lower().removesuffix(".gz"))[1]
+    if ext == ".csv":
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+    elif ext in (".jsonl", ".ndjson"):
+        yield from pd.read_json(path, lines=True, chunksize=chunk_rows)
+    elif ext == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            yield from _chunks_of(records_from_obj(json.load(f)), chunk_rows)
+    elif ext in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:  # dépendance optionnelle
+            raise ImportError("La lecture YAML nécessite `pyyaml` (pip install pyyaml).") from e
+        with open(path, "r", encoding="utf-8") as f:
+            yield from _chunks_of(records_from_obj(yaml.safe_load(f)), chunk_rows)
+    elif ext in (".parquet", ".pq"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("La lecture Parquet nécessite `pyarrow` (pip install pyarrow).") from e
+        start = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas().set_axis(pd.RangeIndex(start, start + batch.num_rows))
+            start += batch.num_rows
+    else:
+        raise ValueError(f"Format non supporté: {path}")
+
+
+def builtin_presets() -> Iterator[pd.DataFrame]:
+    yield pd.DataFrame(records_from_obj(SCENARIOS_PRESETS))
+
+
+# --------------------------------------------------
+# ÉVALUATION
+# --------------------------------------------------
+def _row_numbers(rows: pd.Index, mask) -> str:
+    """Numéros (1 = premier scénario du fichier) des lignes de `mask`, tronqués à MAX_REPORTED_ROWS."""
+    numbers = [str(i + 1) for i in rows[np.asarray(mask)]]
+    more = f" (+{len(numbers) - MAX_REPORTED_ROWS} autres)" if len(numbers) > MAX_REPORTED_ROWS else ""
+    return ", ".join(numbers[:MAX_REPORTED_ROWS]) + more
+
+
+def evaluate_chunk(chunk: pd.DataFrame, curve: Optional[TermStructure] = None) -> pd.DataFrame:
+    """
+    Complète les inputs manquants puis évalue le chunk en une passe (appelé dans les workers).
+    Seule une colonne absente du fichier prend DEFAULT_INPUTS. Une cellule présente mais non
+    numérique, ou vide dans une colonne d'input, lève ValueError avec les numéros de ligne ;
+    exceptions : tenure vide -> tenure de référence, coût de liquidité vide avec une tenure
+    -> coût lu sur `curve` (DEFAULT_CURVE si None).
+    """
+    rows = chunk.index
+    chunk = chunk.reset_index(drop=True)
+    if "name" not in chunk and "scenario_name_autofill" in chunk:
+        chunk = chunk.rename(columns={"scenario_name_autofill": "name"})
+    chunk = chunk.drop(columns=["scenario_name_autofill"], errors="ignore")
+    absent = [k for k in (*INPUT_KEYS, TENURE_KEY) if k not in chunk]
+    for k in (*INPUT_KEYS, TENURE_KEY):
+        if k in absent:
+            chunk[k] = np.nan
+            continue
+        raw = chunk[k]
+        blank = raw.isna() | raw.astype("string").str.strip().eq("").fillna(True)
+        values = pd.to_numeric(raw.where(~blank), errors="coerce").astype(np.float64)
+        invalid = ~blank & ~np.isfinite(values)
+        if invalid.any():
+            raise ValueError(f"{k} : valeur non numérique ligne(s) {_row_numbers(rows, invalid)}")
+        chunk[k] = values
+    chunk["cout_liquidite_10j_pct"] = price_liquidity(chunk["cout_liquidite_10j_pct"], chunk[TENURE_KEY], curve)
+    for k in INPUT_KEYS:
+        blank = chunk[k].isna()
+        if k not in absent and blank.any():
+            raise ValueError(f"{k} : valeur manquante ligne(s) {_row_numbers(rows, blank)}")
+    chunk = chunk.fillna({k: DEFAULT_INPUTS[k] for k in (*absent, TENURE_KEY)})
+    return compute_frame(chunk, curve)
+
+
+def evaluate_stream(chunks, workers: int = 1, curve: Optional[TermStructure] = None) -> Iterator[pd.DataFrame]:
+    """
+    Évalue les chunks dans l'ordre. workers > 1 -> pool de process avec au plus
+    2 x workers chunks en vol (lecture, calcul et écriture se recouvrent sans tout charger).
+    """
+    yield from imap_ordered(partial(evaluate_chunk, curve=curve), ((chunk,) for chunk in chunks), workers)
+
+
+# --------------------------------------------------
+# ÉCRITURE
+# --------------------------------------------------
+def output_schema(first: pd.DataFrame) -> dict:
+    """
+    Schéma de sortie fixé au premier chunk : {colonne: "float64" | "string"}. name, puis
+    les colonnes de passage du fichier (float64 si numériques et renseignées dans ce chunk,
+    string sinon), puis les inputs, la tenure et les outputs du modèle (float64).
+    """
+    model = (*INPUT_KEYS, TENURE_KEY, *OUTPUT_KEYS)
+    schema = {"name": "string"}
+    for col in first.columns:
+        if col in schema or col in model:
+            continue
+        numeric = pd.api.types.is_numeric_dtype(first[col]) and first[col].notna().any()
+        schema[col] = "float64" if numeric else "string"
+    schema.update({k: "float64" for k in model})
+    return schema
+
+
+def conform(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """
+    Chunk -> colonnes et types du schéma (colonnes absentes = vides). Une colonne apparue
+    après le premier chunk, ou du texte dans une colonne numérique, lève ValueError.
+    """
+    extra = [c for c in df.columns if c not in schema]
+    if extra:
+        raise ValueError(f"Colonnes absentes du premier chunk: {', '.join(map(str, extra))}")
+    out = df.reindex(columns=list(schema))
+    for col, dtype in schema.items():
+        if dtype == "string":
+            out[col] = out[col].astype("string")
+        else:
+            try:
+                out[col] = pd.to_numeric(out[col]).astype("float64")
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Colonne {col}: valeur non numérique ({e})") from e
+    return out
+
+
+def write_results(results, out_path: str) -> int:
+    """
+    Écrit les chunks au fil de l'eau (CSV ou Parquet), tous ramenés au schéma du
+    premier chunk (output_schema) : en-tête CSV et schéma Parquet ne changent jamais.
+    Retourne le nb de lignes.
+    """
+    n = 0
+    schema = None
+    if out_path.lower().endswith((".parquet", ".pq")):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("L'écriture Parquet nécessite `pyarrow` (pip install pyarrow).") from e
+        writer = None
+        try:
+            for df in results:
+                if schema is None:
+                    schema = output_schema(df)
+                    arrow_schema = pa.schema([(c, pa.string() if t == "string" else pa.float64()) for c, t in schema.items()])
+                    writer = pq.ParquetWriter(out_path, arrow_schema)
+                writer.write_table(pa.Table.from_pandas(conform(df, schema), schema=arrow_schema, preserve_index=False))
+                n += len(df)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        for df in results:
+            first = schema is None
+            if first:
+                schema = output_schema(df)
+            conform(df, schema).to_csv(out_path, mode="w" if first else "a", header=first, index=False)
+            n += len(df)
+    return n
+
+
+# --------------------------------------------------
+# MAIN
+# --------------------------------------------------
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Unit economics Waribei en batch (sans Streamlit).")
+    parser.add_argument("input", nargs="?", help="Fichier de scénarios (.csv, .json, .jsonl, .yaml, .parquet)")
+    parser.add_argument("-o", "--output", required=True, help="Fichier résultat (.csv ou .parquet)")
+    parser.add_argument("--builtin-presets", action="store_true", help="Évalue SCENARIOS_PRESETS au lieu d'un fichier")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Nombre de process (défaut: nb de CPU)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Lignes par chunk")
+    parser.add_argument("--curve", help="Courbe de taux CSV (tenure_days, taux_annuel_pct) ; défaut: DEFAULT_CURVE")
+    args = parser.parse_args(argv)
+
+    if not args.input and not args.builtin_presets:
+        parser.error("donner un fichier d'entrée ou --builtin-presets")
+
+    chunks = builtin_presets() if args.builtin_presets else read_scenarios(args.input, args.chunk_rows)
+    t0 = time.perf_counter()
+    curve = TermStructure.from_csv(args.curve) if args.curve else None
+    n = write_results(evaluate_stream(chunks, workers=args.workers, curve=curve), args.output)
+    elapsed = time.perf_counter() - t0
+    print(f"{n:,} scénarios -> {args.output} en {elapsed:.2f}s ({n / max(elapsed, 1e-9):,.0f} scénarios/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
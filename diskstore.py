@@ -0,0 +1,264 @@
+"""
+Stockage sur disque des gros résultats (batches de scénarios, grilles, séries).
+
+Un résultat = un dossier <racine>/<clé>/ avec un fichier .npy par colonne et un
+meta.json (type, paramètres, forme et dtype des colonnes). La clé est le hash
+canonique (type + paramètres) : toutes les sessions et tous les redémarrages du
+process retombent sur le même dossier. La lecture se fait en np.load(mmap_mode="r") :
+ouvrir un résultat ne lit rien, un slice ne charge que les pages touchées, et le
+cache de pages de l'OS est partagé entre sessions (une seule copie en RAM).
+
+Écriture atomique : dossier temporaire puis rename ; un résultat visible est complet.
+Taille bornée : après chaque écriture, les résultats les moins récemment ouverts
+au-delà de max_bytes (WARIBEI_RESULTS_MAX_MB, 2 Go par défaut) sont supprimés.
+Colonnes numériques / datetime uniquement (les colonnes texte ne se mappent pas).
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Callable, Iterable, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_STORE_DIR = os.environ.get("WARIBEI_RESULTS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "results_store"))
+META_FILE = "meta.json"
+DEFAULT_MAX_BYTES = int(os.environ.get("WARIBEI_RESULTS_MAX_MB", 2048)) * 1024**2
+COPY_BLOCK_ROWS = 1 << 20
+
+
+def store_key(kind: str, params: Mapping) -> str:
+    """Hash canonique (sha1 hex) du type de résultat + paramètres (JSON trié) ; aussi la clé de déduplication des jobs."""
+    payload = json.dumps([kind, params], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _storable(values) -> Optional[np.ndarray]:
+    arr = np.asarray(values)
+    if arr.dtype.kind in "biufcmM":
+        return arr
+    return None
+
+
+class StoredResult:
+    """Résultat ouvert : colonnes en memmap (lecture seule), chargées à la demande."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.key = os.path.basename(path)
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self._arrays = {}
+
+    @property
+    def columns(self) -> list:
+        return list(self.meta["columns"])
+
+    @property
+    def n_rows(self) -> int:
+        """Longueur commune des colonnes 1-D (0 s'il n'y en a pas)."""
+        return int(self.meta.get("n_rows", 0))
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in self.meta["columns"]:
+            raise KeyError(name)
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+        return self._arrays[name]
+
+    def slice(self, start: int = 0, stop: Optional[int] = None, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Lignes [start, stop) des colonnes 1-D, copiées en DataFrame (seules ces pages sont lues)."""
+        names = [c for c in (columns or self.columns) if len(self.meta["columns"][c]["shape"]) == 1]
+        return pd.DataFrame({c: np.array(self[c][start:stop]) for c in names})
+
+    def nbytes(self) -> int:
+        return sum(int(np.prod(c["shape"])) * np.dtype(c["dtype"]).itemsize for c in self.meta["columns"].values())
+
+
+class _ColumnWriter:
+    """Ajout par chunks : colonnes brutes (.bin) puis conversion en .npy à la fermeture."""
+
+    def __init__(self, tmp: str):
+        self.tmp = tmp
+        self.files = {}
+        self.dtypes = {}
+        self.n_rows = 0
+
+    def append(self, chunk) -> None:
+        cols = chunk.items() if isinstance(chunk, pd.DataFrame) else dict(chunk).items()
+        n = None
+        for name, values in cols:
+            arr = _storable(values)
+            if arr is None:
+                continue
+            if name not in self.files:
+                if self.n_rows:
+                    raise ValueError(f"Colonne {name} absente des chunks précédents")
+                self.files[name] = open(os.path.join(self.tmp, f"{name}.bin"), "wb")
+                self.dtypes[name] = arr.dtype
+            arr = np.ascontiguousarray(arr, dtype=self.dtypes[name])
+            if n is not None and len(arr) != n:
+                raise ValueError("Colonnes de longueurs différentes dans un chunk")
+            n = len(arr)
+            self.files[name].write(arr.tobytes())
+        self.n_rows += n or 0
+
+    def close(self) -> dict:
+        meta = {}
+        for name, f in self.files.items():
+            f.close()
+            raw_path = os.path.join(self.tmp, f"{name}.bin")
+            raw = np.memmap(raw_path, dtype=self.dtypes[name], mode="r", shape=(self.n_rows,)) if self.n_rows else np.empty(0, self.dtypes[name])
+            out = np.lib.format.open_memmap(os.path.join(self.tmp, f"{name}.npy"), mode="w+", dtype=self.dtypes[name], shape=(self.n_rows,))
+            for lo in range(0, self.n_rows, COPY_BLOCK_ROWS):
+                out[lo : lo + COPY_BLOCK_ROWS] = raw[lo : lo + COPY_BLOCK_ROWS]
+            out.flush()
+            del out, raw
+            os.remove(raw_path)
+            meta[name] = {"dtype": self.dtypes[name].str, "shape": [self.n_rows]}
+        return meta
+
+
+class ResultStore:
+    def __init__(self, root: str = DEFAULT_STORE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._open = {}  # clé -> StoredResult (memmaps partagés par les sessions du process)
+        self._lock = threading.Lock()
+
+    def _dir(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    # --------------------------------------------------
+    # LECTURE
+    # --------------------------------------------------
+    def open_key(self, key: str, touch: bool = True) -> Optional[StoredResult]:
+        """Résultat `key` (None s'il n'existe pas). touch : date de dernier accès mise à jour (LRU de prune)."""
+        path = self._dir(key)
+        if not os.path.exists(os.path.join(path, META_FILE)):
+            # jamais écrit, ou supprimé par une autre session / un autre process : le handle en cache est périmé
+            with self._lock:
+                self._open.pop(key, None)
+            return None
+        with self._lock:
+            result = self._open.get(key)
+        if result is None:
+            try:
+                result = StoredResult(path)
+            except FileNotFoundError:
+                return None
+            with self._lock:
+                result = self._open.setdefault(key, result)
+        if touch:
+            try:
+                os.utime(result.path)
+            except FileNotFoundError:  # supprimé entre-temps (prune d'une autre session)
+                self.delete(key)
+                return None
+        return result
+
+    def get(self, kind: str, params: Mapping) -> Optional[StoredResult]:
+        return self.open_key(store_key(kind, params))
+
+    # --------------------------------------------------
+    # ÉCRITURE
+    # --------------------------------------------------
+    def _publish(self, kind: str, params: Mapping, tmp: str, columns_meta: dict, n_rows: int) -> StoredResult:
+        key = store_key(kind, params)
+        meta = {"kind": kind, "params": params, "columns": columns_meta, "n_rows": n_rows, "created_at": time.time()}
+        with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, default=str)
+        try:
+            os.rename(tmp, self._dir(key))
+        except OSError:
+            # déjà écrit (autre session / autre process) : on garde l'existant
+            shutil.rmtree(tmp, ignore_errors=True)
+        return self.open_key(key)
+
+    def _tmp_dir(self) -> str:
+        os.makedirs(self.root, exist_ok=True)
+        tmp = os.path.join(self.root, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp)
+        return tmp
+
+    def put(self, kind: str, params: Mapping, arrays) -> StoredResult:
+        """Écrit des arrays (dict nom -> array de forme quelconque, ou DataFrame) en une fois."""
+        items = arrays.items() if isinstance(arrays, pd.DataFrame) else dict(arrays).items()
+        tmp = self._tmp_dir()
+        try:
+            meta, lengths = {}, set()
+            for name, values in items:
+                arr = _storable(values)
+                if arr is None:
+                    continue
+                np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(arr))
+                meta[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape)}
+                if arr.ndim == 1:
+                    lengths.add(len(arr))
+            result = self._publish(kind, params, tmp, meta, lengths.pop() if len(lengths) == 1 else 0)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self.prune()
+        return result
+
+    def write_chunks(self, kind: str, params: Mapping, chunks: Iterable) -> StoredResult:
+        """Écrit un flux de chunks (DataFrame ou dict de colonnes 1-D) sans tout garder en mémoire."""
+        tmp = self._tmp_dir()
+        try:
+            writer = _ColumnWriter(tmp)
+            for chunk in chunks:
+                writer.append(chunk)
+            result = self._publish(kind, params, tmp, writer.close(), writer.n_rows)
+        except BaseException:  # y compris JobCancelled : pas de résultat partiel visible
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self.prune()
+        return result
+
+    def get_or_compute(self, kind: str, params: Mapping, compute: Callable[[], object]) -> StoredResult:
+        """Résultat stocké, ou compute() (arrays / DataFrame) écrit puis rouvert en memmap."""
+        found = self.get(kind, params)
+        return found if found is not None else self.put(kind, params, compute())
+
+    # --------------------------------------------------
+    # ENTRETIEN
+    # --------------------------------------------------
+    def entries(self) -> pd.DataFrame:
+        rows = []
+        if os.path.isdir(self.root):
+            for key in os.listdir(self.root):
+                result = None if key.startswith(".") else self.open_key(key, touch=False)
+                if result is not None and os.path.isdir(result.path):
+                    rows.append(
+                        {
+                            "key": key,
+                            "kind": result.meta["kind"],
+                            "n_rows": result.n_rows,
+                            "mb": result.nbytes() / 1024**2,
+                            "last_access": os.path.getmtime(result.path),
+                        }
+                    )
+        return pd.DataFrame(rows, columns=["key", "kind", "n_rows", "mb", "last_access"])
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._open.pop(key, None)
+        shutil.rmtree(self._dir(key), ignore_errors=True)
+
+    def prune(self, max_bytes: Optional[int] = None) -> int:
+        """Supprime les résultats les moins récemment ouverts au-delà de max_bytes (self.max_bytes par défaut). Retourne le nombre supprimé."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        df = self.entries().sort_values("last_access", ascending=False)
+        over = df["mb"].cumsum() * 1024**2 > max_bytes
+        over.iloc[:1] = False  # le plus récent (souvent celui qu'on vient d'écrire) est toujours gardé
+        for key in df.loc[over, "key"]:
+            self.delete(key)
+        return int(over.sum())
+
+
+STORE = ResultStore()
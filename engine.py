@@ -0,0 +1,162 @@
+"""
+Moteur unit economics Waribei (sans Streamlit).
+
+Toutes les formules de la page "Simulateur" sont ici, écrites en NumPy pour
+évaluer N scénarios d'un coup. La page appelle le même moteur pour son point
+unique (N = 1).
+"""
+from typing import Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from termstructure import TermStructure, check_tenure, price_liquidity
+
+# --------------------------------------------------
+# CONSTANTES
+# --------------------------------------------------
+DUREE_PERIODE_LIQUIDITE_JOURS = 10
+
+# Les 8 inputs du modèle (même noms que les clés de st.session_state)
+INPUT_KEYS = (
+    "revenu_pct",
+    "cout_paiement_pct",
+    "cout_liquidite_10j_pct",
+    "defaut_30j_pct",
+    "loan_book_k",
+    "cycles_per_month",
+    "avg_loan_value_eur",
+    "tx_per_client_per_month",
+)
+
+# Tenure (jours) du coût de liquidité : optionnelle, DUREE_PERIODE_LIQUIDITE_JOURS si absente
+TENURE_KEY = "duree_liquidite_jours"
+
+OUTPUT_KEYS = (
+    "taux_liquidite_annuel_pct",
+    "cout_total_pct",
+    "contribution_margin_pct",
+    "monthly_volume_eur",
+    "monthly_revenue_eur",
+    "annual_revenue_eur",
+    "contribution_value_k",
+    "nb_loans_per_month",
+    "nb_clients_per_month",
+    "revenue_per_loan_eur",
+    "revenue_per_client_month_eur",
+    "take_rate_effective_pct",
+)
+
+
+def _safe_div(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """num / den, 0 là où den <= 0 (comme les `if x > 0 else 0.0` historiques)."""
+    out = np.zeros(np.broadcast(num, den).shape, dtype=np.float64)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+def compute_metrics(
+    revenu_pct,
+    cout_paiement_pct,
+    cout_liquidite_10j_pct,
+    defaut_30j_pct,
+    loan_book_k,
+    cycles_per_month,
+    avg_loan_value_eur,
+    tx_per_client_per_month,
+    duree_liquidite_jours=DUREE_PERIODE_LIQUIDITE_JOURS,
+) -> dict:
+    """
+    Calcule tous les outputs en une passe.
+    Chaque input peut être un scalaire ou un array (broadcast NumPy) ;
+    chaque output est un np.ndarray float64 de la forme broadcastée.
+    duree_liquidite_jours : tenure à laquelle correspond cout_liquidite_10j_pct
+    (10 par défaut ; autre valeur via termstructure.py), sert à l'annualisation ;
+    ValueError si <= 0.
+    """
+    revenu_pct = np.asarray(revenu_pct, dtype=np.float64)
+    cout_paiement_pct = np.asarray(cout_paiement_pct, dtype=np.float64)
+    cout_liquidite_10j_pct = np.asarray(cout_liquidite_10j_pct, dtype=np.float64)
+    defaut_30j_pct = np.asarray(defaut_30j_pct, dtype=np.float64)
+    loan_book_k = np.asarray(loan_book_k, dtype=np.float64)
+    cycles_per_month = np.asarray(cycles_per_month, dtype=np.float64)
+    avg_loan_value_eur = np.asarray(avg_loan_value_eur, dtype=np.float64)
+    tx_per_client_per_month = np.asarray(tx_per_client_per_month, dtype=np.float64)
+    duree_liquidite_jours = check_tenure(duree_liquidite_jours)
+
+    shape = np.broadcast_shapes(
+        revenu_pct.shape,
+        cout_paiement_pct.shape,
+        cout_liquidite_10j_pct.shape,
+        defaut_30j_pct.shape,
+        loan_book_k.shape,
+        cycles_per_month.shape,
+        avg_loan_value_eur.shape,
+        tx_per_client_per_month.shape,
+        duree_liquidite_jours.shape,
+    )
+
+    taux_liquidite_annuel_pct = cout_liquidite_10j_pct * _safe_div(np.float64(365), duree_liquidite_jours)
+    cout_total_pct = cout_paiement_pct + cout_liquidite_10j_pct + defaut_30j_pct
+    contribution_margin_pct = revenu_pct - cout_total_pct
+
+    monthly_volume_eur = loan_book_k * 1000 * cycles_per_month
+    monthly_revenue_eur = monthly_volume_eur * (revenu_pct / 100)
+    annual_revenue_eur = monthly_revenue_eur * 12
+    contribution_value_k = loan_book_k * cycles_per_month * contribution_margin_pct / 100
+
+    nb_loans_per_month = _safe_div(monthly_volume_eur, avg_loan_value_eur)
+    nb_clients_per_month = _safe_div(nb_loans_per_month, tx_per_client_per_month)
+
+    revenue_per_loan_eur = avg_loan_value_eur * (revenu_pct / 100)
+    revenue_per_client_month_eur = revenue_per_loan_eur * tx_per_client_per_month
+    take_rate_effective_pct = _safe_div(monthly_revenue_eur, monthly_volume_eur) * 100
+
+    out = {
+        "taux_liquidite_annuel_pct": taux_liquidite_annuel_pct,
+        "cout_total_pct": cout_total_pct,
+        "contribution_margin_pct": contribution_margin_pct,
+        "monthly_volume_eur": monthly_volume_eur,
+        "monthly_revenue_eur": monthly_revenue_eur,
+        "annual_revenue_eur": annual_revenue_eur,
+        "contribution_value_k": contribution_value_k,
+        "nb_loans_per_month": nb_loans_per_month,
+        "nb_clients_per_month": nb_clients_per_month,
+        "revenue_per_loan_eur": revenue_per_loan_eur,
+        "revenue_per_client_month_eur": revenue_per_client_month_eur,
+        "take_rate_effective_pct": take_rate_effective_pct,
+    }
+    # toutes les colonnes ont la même forme, même si un output ne dépend que d'un input scalaire
+    return {k: np.broadcast_to(v, shape).astype(np.float64, copy=False) for k, v in out.items()}
+
+
+def compute_from_mapping(inputs: Mapping) -> dict:
+    """
+    Même chose, à partir d'un dict / DataFrame / structured array indexé par INPUT_KEYS
+    (+ TENURE_KEY optionnel).
+    """
+    missing = [k for k in INPUT_KEYS if k not in inputs]
+    if missing:
+        raise KeyError(f"Inputs manquants: {', '.join(missing)}")
+    tenure = inputs[TENURE_KEY] if TENURE_KEY in inputs else DUREE_PERIODE_LIQUIDITE_JOURS
+    return compute_metrics(*(inputs[k] for k in INPUT_KEYS), duree_liquidite_jours=tenure)
+
+
+def compute_frame(df: pd.DataFrame, curve: Optional[TermStructure] = None) -> pd.DataFrame:
+    """
+    DataFrame d'inputs -> DataFrame inputs + outputs (même index).
+    Avec une colonne TENURE_KEY, un coût de liquidité absent (colonne ou NaN) est
+    lu sur `curve` (DEFAULT_CURVE si None) à cette tenure.
+    """
+    cols = {k: df[k].to_numpy(dtype=np.float64) for k in (*INPUT_KEYS, TENURE_KEY) if k in df}
+    if TENURE_KEY in cols:
+        cost = cols.get("cout_liquidite_10j_pct", np.nan)
+        cols["cout_liquidite_10j_pct"] = price_liquidity(cost, cols[TENURE_KEY], curve)
+        df = df.assign(cout_liquidite_10j_pct=cols["cout_liquidite_10j_pct"])
+    return df.assign(**compute_from_mapping(cols))
+
+
+def compute_point(inputs: Mapping) -> dict:
+    """Un seul scénario (ex: st.session_state) -> dict de floats."""
+    metrics = compute_from_mapping({k: float(inputs[k]) for k in (*INPUT_KEYS, TENURE_KEY) if k in inputs})
+    return {k: float(v) for k, v in metrics.items()}
@@ -0,0 +1,324 @@
+"""
+File de calculs longs en arrière-plan (partagée par toutes les sessions du process).
+
+Un job = une fonction de TASKS appelée dans un pool de threads avec un JobContext :
+elle publie sa progression (et un résultat partiel) via ctx.progress(), qui lève
+JobCancelled si le job a été annulé — l'annulation est coopérative, entre deux blocs.
+Le script Streamlit ne bloque jamais : il soumet, puis relit l'état du job à chaque rerun.
+Les gros résultats (grilles, batches) vont dans diskstore : le job ne garde que leur clé.
+
+Deux soumissions identiques (même type, mêmes paramètres) partagent le même job,
+y compris depuis deux sessions : chaque session est un « abonné », et un job n'est
+réellement annulé que lorsque plus aucune session ne l'attend. Les jobs terminés
+restent consultables (LRU borné), une re-soumission rend directement le résultat.
+"""
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Mapping, Optional
+
+import numpy as np
+
+# cli et report (writers Excel / PDF) sont importés dans les tâches qui s'en servent :
+# importer jobs au premier affichage de la page ne les charge pas
+from diskstore import STORE, store_key
+from engine import INPUT_KEYS, compute_metrics
+from ledger import aggregates_to_presets, contribution_margin_pct, daily_aggregates, ingest_ledger, read_state
+from sensitivity import SWEEP_AXES
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+ACTIVE = (QUEUED, RUNNING)
+
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 1)))
+DEFAULT_KEEP = 64
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "waribei_exports")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str, params: Mapping, key: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.kind = kind
+        self.params = dict(params)
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "En attente"
+        self.partial = None
+        self.result = None
+        self.error = None
+        self.owners = set()
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE
+
+    def elapsed_s(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobContext:
+    """Passé à la fonction du job : progression, résultat partiel, point d'annulation."""
+
+    def __init__(self, job: Job, lock: threading.Lock):
+        self._job = job
+        self._lock = lock
+
+    @property
+    def cancelled(self) -> bool:
+        return self._job.cancel_event.is_set()
+
+    def progress(self, fraction: Optional[float] = None, message: Optional[str] = None, partial=None) -> None:
+        if self.cancelled:
+            raise JobCancelled()
+        with self._lock:
+            if fraction is not None:
+                self._job.progress = float(min(max(fraction, 0.0), 1.0))
+            if message is not None:
+                self._job.message = message
+            if partial is not None:
+                self._job.partial = partial
+
+
+def _stored_key(job: Optional[Job]) -> Optional[str]:
+    """Clé diskstore du résultat d'un job terminé (None si pas de job, pas terminé ou sans résultat stocké)."""
+    if job is None or job.status != DONE or not isinstance(job.result, dict):
+        return None
+    return job.result.get("key")
+
+
+class JobQueue:
+    def __init__(self, tasks: Mapping[str, Callable], max_workers: int = DEFAULT_WORKERS, keep: int = DEFAULT_KEEP):
+        self.tasks = dict(tasks)
+        self.keep = keep
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="waribei-job")
+        self._jobs = OrderedDict()  # id -> Job (ordre de soumission)
+        self._by_key = {}  # key -> id (jobs actifs ou terminés avec succès)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.deduplicated = 0
+
+    def submit(self, kind: str, params: Mapping, owner: str) -> Job:
+        """Soumet un job, ou rattache `owner` au job identique déjà en cours / terminé."""
+        if kind not in self.tasks:
+            raise KeyError(f"Type de job inconnu: {kind}")
+        key = store_key(kind, params)
+        with self._lock:
+            candidate = self._jobs.get(self._by_key.get(key))
+            stored = _stored_key(candidate)
+        # accès disque (META, stat du fichier) hors verrou : ne bloque ni les autres sessions ni les workers
+        expired = stored is not None and STORE.open_key(stored, touch=False) is None
+        with self._lock:
+            existing = self._jobs.get(self._by_key.get(key))
+            if expired and existing is candidate:
+                # résultat supprimé du disque (STORE.prune) : le job est recalculé
+                existing.owners.discard(owner)
+                existing = None
+            if existing is not None and existing.status in (*ACTIVE, DONE):
+                existing.owners.add(owner)
+                self._jobs.move_to_end(existing.id)
+                self.deduplicated += 1
+                return existing
+            job = Job(kind, params, key)
+            job.owners.add(owner)
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+            self.submitted += 1
+            self._evict()
+        self._pool.submit(self._run, job)
+        return job
+
+    def _run(self, job: Job) -> None:
+        with self._lock:
+            if job.cancel_event.is_set():
+                return
+            job.status, job.started_at, job.message = RUNNING, time.time(), "Démarré"
+        try:
+            result = self.tasks[job.kind](JobContext(job, self._lock), **job.params)
+        except JobCancelled:
+            status, result, error = CANCELLED, None, None
+        except Exception as e:  # noqa: BLE001 — l'erreur est rendue à l'UI, pas propagée au pool
+            status, result, error = FAILED, None, f"{type(e).__name__}: {e}"
+        else:
+            status, error = DONE, None
+        with self._lock:
+            job.status, job.result, job.error, job.finished_at = status, result, error, time.time()
+            if status == DONE:
+                job.progress, job.message, job.partial = 1.0, "Terminé", None
+            elif self._by_key.get(job.key) == job.id:
+                del self._by_key[job.key]  # un job annulé / en échec peut être resoumis
+
+    def cancel(self, job_id: str, owner: str) -> bool:
+        """Détache `owner` ; annule le job s'il n'a plus d'abonné. True si le job est (ou sera) annulé."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.active:
+                return False
+            job.owners.discard(owner)
+            if job.owners:
+                return False
+            job.cancel_event.set()
+            job.message = "Annulation…"
+            if job.status == QUEUED:
+                job.status, job.finished_at = CANCELLED, time.time()
+            if self._by_key.get(job.key) == job.id:
+                del self._by_key[job.key]
+            return True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs_for(self, owner: str) -> list:
+        """Jobs d'une session, plus récents d'abord."""
+        with self._lock:
+            return [j for j in reversed(self._jobs.values()) if owner in j.owners]
+
+    def forget(self, job_id: str, owner: str) -> None:
+        """Retire un job terminé de la liste d'une session (il reste en cache pour les autres)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and not job.active:
+                job.owners.discard(owner)
+
+    def _evict(self) -> None:
+        """Garde au plus `keep` jobs terminés (les plus anciens partent en premier)."""
+        finished = [j for j in self._jobs.values() if not j.active]
+        for job in finished[: max(0, len(finished) - self.keep)]:
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) == job.id:
+                del self._by_key[job.key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {s: 0 for s in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
+            for j in self._jobs.values():
+                counts[j.status] += 1
+            return {**counts, "submitted": self.submitted, "deduplicated": self.deduplicated}
+
+
+# --------------------------------------------------
+# TÂCHES
+# --------------------------------------------------
+def sweep_task(ctx: JobContext, metric: str, x_key: str, y_key: str, fixed: list, n: int, block_rows: int = 64):
+    """
+    Grille n x n évaluée par blocs de lignes ; le partiel = (xs, ys, z des lignes déjà calculées).
+    Résultat écrit dans diskstore (colonnes xs, ys, z) : retourne sa clé.
+    """
+    params = {"metric": metric, "x_key": x_key, "y_key": y_key, "fixed": fixed, "n": n}
+    if x_key == y_key:
+        raise ValueError("Les deux axes doivent être différents.")
+
+    def grid() -> dict:
+        xs = np.linspace(SWEEP_AXES[x_key][1], SWEEP_AXES[x_key][2], n)
+        ys = np.linspace(SWEEP_AXES[y_key][1], SWEEP_AXES[y_key][2], n)
+        z = np.full((n, n), np.nan)
+        inputs = {k: 1.0 for k in INPUT_KEYS}
+        inputs.update(dict(fixed))
+        inputs[x_key] = xs[np.newaxis, :]
+        for lo in range(0, n, block_rows):
+            hi = min(lo + block_rows, n)
+            inputs[y_key] = ys[lo:hi, np.newaxis]
+            z[lo:hi] = compute_metrics(*(inputs[k] for k in INPUT_KEYS))[metric]
+            ctx.progress(hi / n, f"{hi}/{n} lignes", partial=(xs, ys[:hi], z[:hi]))
+        return {"xs": xs, "ys": ys, "z": z}
+
+    return {"key": STORE.get_or_compute("sweep", params, grid).key}
+
+
+def batch_task(ctx: JobContext, path: str, chunk_rows: int = 200_000, **stamp):
+    """
+    Fichier de scénarios (formats du CLI) évalué par chunks et écrit chunk par chunk
+    dans diskstore (colonnes numériques). Retourne la clé + un résumé de contribution_margin_pct.
+    """
+    params = {"path": path, "chunk_rows": chunk_rows, **stamp}
+    stored = STORE.get("batch", params)
+    if stored is None:
+        from cli import evaluate_chunk, read_scenarios
+
+        total_rows = _count_csv_rows(path) if path.lower().endswith(".csv") else None
+
+        def evaluated():
+            n_rows = 0
+            for chunk in read_scenarios(path, chunk_rows=chunk_rows):
+                out = evaluate_chunk(chunk)
+                n_rows += len(out)
+                ctx.progress(n_rows / total_rows if total_rows else None, f"{n_rows:,} scénarios évalués")
+                yield out
+
+        stored = STORE.write_chunks("batch", params, evaluated())
+    cm = stored["contribution_margin_pct"] if stored.n_rows else np.zeros(0)
+    summary = {
+        "scenarios": stored.n_rows,
+        "contribution_margin_moyenne_pct": float(cm.mean()) if len(cm) else 0.0,
+        "contribution_margin_min_pct": float(cm.min()) if len(cm) else 0.0,
+        "contribution_margin_max_pct": float(cm.max()) if len(cm) else 0.0,
+        "scenarios_marge_negative": int((cm < 0).sum()),
+    }
+    return {"key": stored.key, "summary": summary}
+
+
+def _count_csv_rows(path: str, block: int = 1 << 20) -> int:
+    """Nombre de lignes de données d'un CSV (comptage des retours à la ligne, sans parser)."""
+    n, last = 0, b"\n"
+    with open(path, "rb") as f:
+        while data := f.read(block):
+            n += data.count(b"\n")
+            last = data[-1:]
+    return max(n - 1 + (last != b"\n"), 0)
+
+
+def ledger_task(ctx: JobContext, path: str, **_file_stamp):
+    """Ingestion (incrémentale) d'un ledger ; rend les presets mensuels, la marge et les agrégats journaliers."""
+    monthly = ingest_ledger(path, progress=lambda f: ctx.progress(f, f"Lecture du ledger : {f:.0%}"))
+    ctx.progress(1.0, "Agrégats journaliers")
+    daily = daily_aggregates(read_state(path))
+    daily_cm = contribution_margin_pct(daily).to_frame("contribution_margin_pct")
+    return {"presets": aggregates_to_presets(monthly), "daily_cm": daily_cm, "daily": daily}
+
+
+def export_task(ctx: JobContext, formats: list, preset_names: list, saved_ids=None, include_saved: bool = True, db_version=None):
+    """
+    Pack Excel / PDF (report.export_pack) dans EXPORT_DIR/<clé du job>/ ; rend les chemins et les
+    statistiques. db_version (store.history_version) ne sert qu'à invalider la déduplication.
+    """
+    from report import export_pack
+
+    params = {"formats": formats, "preset_names": preset_names, "saved_ids": saved_ids, "include_saved": include_saved, "db_version": db_version}
+    out_dir = os.path.join(EXPORT_DIR, store_key("export", params))
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {fmt: os.path.join(out_dir, f"waribei_pack.{fmt}") for fmt in formats}
+    stats = export_pack(
+        paths.get("xlsx"),
+        paths.get("pdf"),
+        preset_names=preset_names,
+        saved_ids=saved_ids,
+        include_saved=include_saved,
+        workers=os.cpu_count() or 1,
+        progress=lambda f: ctx.progress(f, f"{f:.0%} des scénarios rendus"),
+    )
+    return {"paths": paths, "stats": stats}
+
+
+def file_stamp(path: str) -> dict:
+    """Taille + mtime d'un fichier : ajoutés aux paramètres pour qu'un fichier modifié ne soit pas dédupliqué."""
+    st = os.stat(path)
+    return {"_size": st.st_size, "_mtime_ns": st.st_mtime_ns}
+
+
+TASKS = {"sweep": sweep_task, "batch": batch_task, "ledger": ledger_task, "export": export_task}
+
+QUEUE = JobQueue(TASKS)
@@ -0,0 +1,328 @@
+"""
+Ingestion en streaming d'un ledger de prêts (CSV ou Parquet) -> presets mensuels.
+
+Le fichier est lu par chunks (jamais chargé en entier) et seuls des agrégats
+journaliers sont gardés (les mois en sont dérivés, les jours alimentent la
+courbe d'historique). Un fichier d'état JSON mémorise ce qui a déjà été lu : si
+le fichier a seulement grossi (lignes / row groups ajoutés), la ré-ingestion ne
+lit que la fin. Pour un CSV, le début du fichier et les octets juste avant
+l'offset déjà lu doivent être inchangés, sinon tout est relu.
+
+Les états vont dans le dossier de l'app (WARIBEI_LEDGER_STATE, ./ledger_state par
+défaut), un fichier par chemin absolu de ledger : le dossier des données peut
+être en lecture seule ou partagé.
+"""
+import hashlib
+import io
+import json
+import os
+from datetime import date
+from typing import Callable, Mapping, Optional
+
+import pandas as pd
+
+# Colonnes attendues dans le ledger (surchargées via `columns=`)
+LEDGER_COLUMNS = {
+    "date": "date",
+    "amount": "amount_eur",
+    "revenue": "revenue_eur",
+    "payment_cost": "payment_cost_eur",
+    "liquidity_cost": "liquidity_cost_eur",
+    "default_30j": "default_30j_eur",
+    "tenure_days": "tenure_days",  # optionnel
+}
+OPTIONAL_FIELDS = ("tenure_days",)
+# amount_x_tenure / amount_with_tenure = tenure moyenne pondérée, sur les seuls prêts dont la tenure est connue
+AGG_FIELDS = ("amount", "revenue", "payment_cost", "liquidity_cost", "default_30j", "n_loans", "amount_x_tenure", "amount_with_tenure")
+STATE_VERSION = 3
+DEFAULT_CHUNK_ROWS = 500_000
+HEAD_HASH_BYTES = 64 * 1024
+TAIL_HASH_BYTES = 64 * 1024
+DEFAULT_STATE_DIR = os.environ.get("WARIBEI_LEDGER_STATE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ledger_state"))
+
+
+# --------------------------------------------------
+# AGRÉGATION
+# --------------------------------------------------
+def _aggregate_chunk(chunk: pd.DataFrame, cols: Mapping) -> pd.DataFrame:
+    """Chunk brut -> sommes par jour (index 'YYYY-MM-DD')."""
+    # groupby sur le jour (datetime), formatage des seuls jours distincts : pas de strftime par ligne
+    day = pd.to_datetime(chunk[cols["date"]]).dt.normalize()
+    amount = pd.to_numeric(chunk[cols["amount"]], errors="coerce").fillna(0.0)
+    out = pd.DataFrame(
+        {
+            "day": day,
+            "amount": amount,
+            "revenue": pd.to_numeric(chunk[cols["revenue"]], errors="coerce").fillna(0.0),
+            "payment_cost": pd.to_numeric(chunk[cols["payment_cost"]], errors="coerce").fillna(0.0),
+            "liquidity_cost": pd.to_numeric(chunk[cols["liquidity_cost"]], errors="coerce").fillna(0.0),
+            "default_30j": pd.to_numeric(chunk[cols["default_30j"]], errors="coerce").fillna(0.0),
+            "n_loans": 1,
+        }
+    )
+    tenure_col = cols.get("tenure_days")
+    if tenure_col and tenure_col in chunk:
+        tenure = pd.to_numeric(chunk[tenure_col], errors="coerce")
+        known = tenure > 0  # tenure vide / invalide : le prêt ne compte pas dans la moyenne
+        out["amount_x_tenure"] = (amount * tenure).where(known, 0.0)
+        out["amount_with_tenure"] = amount.where(known, 0.0)
+    else:
+        out["amount_x_tenure"] = 0.0
+        out["amount_with_tenure"] = 0.0
+    daily = out.groupby("day")[list(AGG_FIELDS)].sum()
+    daily.index = daily.index.strftime("%Y-%m-%d")
+    return daily
+
+
+def _check_columns(names, cols: Mapping) -> list:
+    """Colonnes à lire ; erreur si une colonne obligatoire manque."""
+    missing = [c for f, c in cols.items() if f not in OPTIONAL_FIELDS and c not in names]
+    if missing:
+        raise KeyError(f"Colonnes manquantes dans le ledger: {', '.join(missing)}")
+    return [c for c in cols.values() if c in names]
+
+
+def _merge(totals: dict, daily: pd.DataFrame) -> None:
+    for day, row in daily.iterrows():
+        acc = totals.setdefault(day, [0.0] * len(AGG_FIELDS))
+        for i, f in enumerate(AGG_FIELDS):
+            acc[i] += float(row[f])
+
+
+# --------------------------------------------------
+# LECTURE CSV (offset en octets)
+# --------------------------------------------------
+class _BoundedReader(io.RawIOBase):
+    """Vue lecture seule sur [start, end) d'un fichier binaire."""
+
+    def __init__(self, f, start: int, end: int):
+        self._f = f
+        self._f.seek(start)
+        self._remaining = end - start
+
+    @property
+    def remaining(self) -> int:
+        return self._remaining
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), self._remaining)
+        if n <= 0:
+            return 0
+        data = self._f.read(n)
+        b[: len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+
+def _range_hash(path: str, start: int, end: int) -> str:
+    """sha1 des octets [start, end) du fichier."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        return hashlib.sha1(f.read(max(end - start, 0))).hexdigest()
+
+
+def _last_newline(path: str, size: int) -> int:
+    """Offset juste après le dernier '\\n' (on ne lit jamais une ligne en cours d'écriture)."""
+    with open(path, "rb") as f:
+        pos = size
+        while pos > 0:
+            step = min(64 * 1024, pos)
+            f.seek(pos - step)
+            block = f.read(step)
+            idx = block.rfind(b"\n")
+            if idx >= 0:
+                return pos - step + idx + 1
+            pos -= step
+    return 0
+
+
+def _ingest_csv(path: str, state: dict, cols: Mapping, chunk_rows: int, progress: Optional[Callable] = None) -> None:
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header_line = f.readline()
+    header_end = len(header_line)
+    end = _last_newline(path, size)
+
+    offset = state.get("offset", 0)
+    # début du fichier + octets juste avant l'offset : un ledger réécrit ou corrigé au-delà
+    # des 64 premiers Ko n'est pas pris pour le même fichier simplement rallongé
+    resumable = (
+        offset >= header_end
+        and offset <= end
+        and state.get("head_hash") == _range_hash(path, 0, min(offset, HEAD_HASH_BYTES))
+        and state.get("tail_hash") == _range_hash(path, max(offset - TAIL_HASH_BYTES, 0), offset)
+    )
+    if not resumable:
+        state["days"] = {}
+        offset = header_end
+
+    names = pd.read_csv(io.BytesIO(header_line), nrows=0).columns.tolist()
+    usecols = _check_columns(names, cols)
+    if offset < end:
+        with open(path, "rb") as f:
+            raw = _BoundedReader(f, offset, end)
+            reader = pd.read_csv(
+                io.BufferedReader(raw),
+                header=None,
+                names=names,
+                usecols=usecols,
+                chunksize=chunk_rows,
+            )
+            for chunk in reader:
+                _merge(state["days"], _aggregate_chunk(chunk, cols))
+                if progress is not None:
+                    progress(1 - raw.remaining / (end - offset))
+
+    state["offset"] = end
+    state["head_hash"] = _range_hash(path, 0, min(end, HEAD_HASH_BYTES))
+    state["tail_hash"] = _range_hash(path, max(end - TAIL_HASH_BYTES, 0), end)
+    state["full_rescan"] = not resumable
+
+
+# --------------------------------------------------
+# LECTURE PARQUET (row groups)
+# --------------------------------------------------
+def _row_group_fingerprint(rg) -> str:
+    """sha1 des métadonnées d'un row group : lignes, tailles, offsets et statistiques de chaque colonne."""
+    parts = [rg.num_rows, rg.total_byte_size]
+    for i in range(rg.num_columns):
+        col = rg.column(i)
+        stats = col.statistics.to_dict() if col.is_stats_set else None
+        parts.append([col.path_in_schema, col.file_offset, col.data_page_offset, col.total_compressed_size, col.total_uncompressed_size, stats])
+    return hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+def _ingest_parquet(path: str, state: dict, cols: Mapping, chunk_rows: int, progress: Optional[Callable] = None) -> None:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:  # dépendance optionnelle
+        raise ImportError("La lecture Parquet nécessite `pyarrow` (pip install pyarrow).") from e
+
+    pf = pq.ParquetFile(path)
+    groups = [pf.metadata.row_group(i) for i in range(pf.metadata.num_row_groups)]
+    rg_rows = [rg.num_rows for rg in groups]
+    fingerprints = [_row_group_fingerprint(rg) for rg in groups]
+    done = state.get("row_groups", [])
+    # append-only : les row groups déjà lus doivent être identiques (un fichier réécrit avec le
+    # même découpage en row groups change d'offsets, de tailles ou de statistiques)
+    resumable = len(done) <= len(fingerprints) and fingerprints[: len(done)] == done
+    if not resumable:
+        state["days"] = {}
+        done = []
+
+    usecols = _check_columns(pf.schema_arrow.names, cols)
+    new_groups = list(range(len(done), len(rg_rows)))
+    if new_groups:
+        total, done_rows = sum(rg_rows[i] for i in new_groups), 0
+        for batch in pf.iter_batches(batch_size=chunk_rows, row_groups=new_groups, columns=usecols):
+            _merge(state["days"], _aggregate_chunk(batch.to_pandas(), cols))
+            done_rows += batch.num_rows
+            if progress is not None:
+                progress(done_rows / max(total, 1))
+
+    state["row_groups"] = fingerprints
+    state["full_rescan"] = not resumable
+
+
+# --------------------------------------------------
+# API
+# --------------------------------------------------
+def state_path_for(path: str) -> str:
+    """Fichier d'état par défaut de `path` : DEFAULT_STATE_DIR/<nom>-<hash du chemin absolu>.ingest.json."""
+    abs_path = os.path.abspath(path)
+    digest = hashlib.sha1(abs_path.encode()).hexdigest()[:16]
+    return os.path.join(DEFAULT_STATE_DIR, f"{os.path.basename(abs_path)}-{digest}.ingest.json")
+
+
+def ingest_ledger(
+    path: str,
+    columns: Optional[Mapping] = None,
+    state_path: Optional[str] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    progress: Optional[Callable] = None,
+) -> pd.DataFrame:
+    """
+    Ingestion (incrémentale si possible) d'un ledger CSV / Parquet.
+    Retourne les agrégats mensuels (une ligne par mois, colonnes AGG_FIELDS).
+    progress(fraction) est appelé après chaque chunk (peut lever pour interrompre ;
+    l'état n'est alors pas écrit).
+    """
+    cols = dict(LEDGER_COLUMNS)
+    cols.update(columns or {})
+    state_path = state_path or state_path_for(path)
+
+    state = read_state(path, state_path)
+    if state.get("version") != STATE_VERSION or state.get("columns") != cols:
+        state = {}
+    state.update({"version": STATE_VERSION, "columns": cols})
+    state.setdefault("days", {})
+
+    if path.lower().endswith((".parquet", ".pq")):
+        _ingest_parquet(path, state, cols, chunk_rows, progress)
+    else:
+        _ingest_csv(path, state, cols, chunk_rows, progress)
+
+    os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+    return monthly_aggregates(state)
+
+
+def daily_aggregates(state: Mapping) -> pd.DataFrame:
+    days = state.get("days", {})
+    df = pd.DataFrame.from_dict(days, orient="index", columns=list(AGG_FIELDS))
+    df.index.name = "day"
+    return df.sort_index()
+
+
+def monthly_aggregates(state: Mapping) -> pd.DataFrame:
+    daily = daily_aggregates(state)
+    df = daily.groupby(daily.index.str[:7]).sum()
+    df.index.name = "month"
+    return df
+
+
+def read_state(path: str, state_path: Optional[str] = None) -> dict:
+    """État d'ingestion déjà écrit pour `path` ({} si absent)."""
+    state_path = state_path or state_path_for(path)
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def contribution_margin_pct(aggregates: pd.DataFrame) -> pd.Series:
+    """Contribution margin réalisée (%) par ligne d'agrégats (jour ou mois), coûts réels du ledger."""
+    costs = aggregates["payment_cost"] + aggregates["liquidity_cost"] + aggregates["default_30j"]
+    amount = aggregates["amount"].where(aggregates["amount"] > 0)
+    return ((aggregates["revenue"] - costs) / amount * 100).dropna()
+
+
+def aggregates_to_presets(monthly: pd.DataFrame, ref_tenure_days: int = 10, label: str = "Ledger") -> dict:
+    """
+    Agrégats mensuels -> presets au format PRESETS_BY_DATE (clé = 1er du mois).
+    Si le ledger contient une tenure, le coût de liquidité est ramené à `ref_tenure_days`.
+    """
+    presets = {}
+    for month, row in monthly.iterrows():
+        amount = float(row["amount"])
+        if amount <= 0:
+            continue
+        liq_pct = row["liquidity_cost"] / amount * 100
+        with_tenure = float(row["amount_with_tenure"])
+        avg_tenure = row["amount_x_tenure"] / with_tenure if with_tenure > 0 else 0.0
+        if avg_tenure > 0:
+            liq_pct = liq_pct * ref_tenure_days / avg_tenure
+        d = date.fromisoformat(f"{month}-01")
+        presets[d] = {
+            "name": f"{label} – {d.strftime('%b %Y')}",
+            "revenu_pct": round(float(row["revenue"]) / amount * 100, 4),
+            "cout_paiement_pct": round(float(row["payment_cost"]) / amount * 100, 4),
+            "cout_liquidite_10j_pct": round(float(liq_pct), 4),
+            "defaut_30j_pct": round(float(row["default_30j"]) / amount * 100, 4),
+        }
+    return presets
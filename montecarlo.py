@@ -0,0 +1,162 @@
+"""
+Monte Carlo sur les inputs incertains (défaut 30j, coût de liquidité, cycles / mois).
+
+Les tirages sont faits par chunks (mémoire bornée) et chaque chunk ne renvoie
+que des agrégats (sommes, min/max, histogramme) -> on peut lancer 10M+ tirages
+et répartir les chunks sur plusieurs process.
+"""
+import os
+from typing import Mapping, Optional
+
+import numpy as np
+
+from engine import INPUT_KEYS, compute_metrics
+from parallel import imap_ordered
+
+MC_METRICS = ("contribution_margin_pct", "contribution_value_k")
+MC_PERCENTILES = (5, 25, 50, 75, 95)
+DISTRIBUTIONS = ("normal", "lognormal", "triangular", "uniform")
+
+DEFAULT_CHUNK_SIZE = 250_000
+HIST_BINS = 2000
+PILOT_SIZE = 20_000
+
+
+def spec_from_spread(kind: str, center: float, spread_pct: float) -> dict:
+    """
+    Spec de distribution centrée sur `center` avec une dispersion relative `spread_pct`
+    (écart-type pour normal/lognormal, demi-largeur pour triangular/uniform).
+    """
+    if kind not in DISTRIBUTIONS:
+        raise ValueError(f"Distribution inconnue: {kind}")
+    width = abs(center) * spread_pct / 100
+    if kind in ("normal", "lognormal"):
+        return {"kind": kind, "mean": center, "sd": width}
+    if kind == "triangular":
+        return {"kind": kind, "low": center - width, "mode": center, "high": center + width}
+    return {"kind": kind, "low": center - width, "high": center + width}
+
+
+def draw(spec: dict, rng: np.random.Generator, size: int) -> np.ndarray:
+    """Tire `size` valeurs selon la spec (valeurs négatives ramenées à 0 : ce sont des coûts / des cycles)."""
+    kind = spec["kind"]
+    if kind == "normal":
+        out = rng.normal(spec["mean"], spec["sd"], size)
+    elif kind == "lognormal":
+        mean, sd = float(spec["mean"]), float(spec["sd"])
+        if mean <= 0 or sd <= 0:
+            return np.full(size, max(mean, 0.0))
+        sigma2 = np.log1p((sd / mean) ** 2)
+        out = rng.lognormal(np.log(mean) - sigma2 / 2, np.sqrt(sigma2), size)
+    elif kind == "triangular":
+        if spec["high"] <= spec["low"]:
+            return np.full(size, max(float(spec["mode"]), 0.0))
+        out = rng.triangular(spec["low"], spec["mode"], spec["high"], size)
+    elif kind == "uniform":
+        out = rng.uniform(spec["low"], spec["high"], size)
+    else:
+        raise ValueError(f"Distribution inconnue: {kind}")
+    return np.maximum(out, 0.0)
+
+
+def _simulate(base: Mapping, specs: Mapping, rng: np.random.Generator, size: int) -> dict:
+    inputs = {k: float(base[k]) for k in INPUT_KEYS}
+    for k, spec in specs.items():
+        inputs[k] = draw(spec, rng, size)
+    metrics = compute_metrics(*(inputs[k] for k in INPUT_KEYS))
+    return {m: np.broadcast_to(metrics[m], (size,)) for m in MC_METRICS}
+
+
+def _run_chunk(base: Mapping, specs: Mapping, seed: np.random.SeedSequence, size: int, edges: Mapping) -> dict:
+    """Un chunk -> agrégats seulement (appelé dans un process worker)."""
+    values = _simulate(base, specs, np.random.default_rng(seed), size)
+    out = {}
+    for m, v in values.items():
+        e = edges[m]
+        counts, _ = np.histogram(np.clip(v, e[0], e[-1]), bins=e)
+        out[m] = {
+            "n": size,
+            "sum": float(v.sum()),
+            "sumsq": float(np.square(v).sum()),
+            "min": float(v.min()),
+            "max": float(v.max()),
+            "neg": int(np.count_nonzero(v < 0)),
+            "counts": counts,
+        }
+    return out
+
+
+def _hist_edges(base: Mapping, specs: Mapping, seed: np.random.SeedSequence) -> dict:
+    """Bornes d'histogramme estimées sur un petit tirage pilote (élargies de 50%)."""
+    pilot = _simulate(base, specs, np.random.default_rng(seed), PILOT_SIZE)
+    edges = {}
+    for m, v in pilot.items():
+        lo, hi = float(v.min()), float(v.max())
+        pad = max(hi - lo, abs(hi), 1e-9) * 0.5
+        edges[m] = np.linspace(lo - pad, hi + pad, HIST_BINS + 1)
+    return edges
+
+
+def _percentiles_from_hist(counts: np.ndarray, edges: np.ndarray, qs) -> dict:
+    cdf = np.cumsum(counts) / counts.sum()
+    return {f"p{q:02d}": float(np.interp(q / 100, cdf, edges[1:])) for q in qs}
+
+
+def run_monte_carlo(
+    base: Mapping,
+    specs: Mapping,
+    n_draws: int = 1_000_000,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    seed: Optional[int] = 0,
+    workers: int = 1,
+) -> dict:
+    """
+    Lance n_draws tirages des inputs de `specs` autour de `base` (les 8 inputs).
+    workers > 1 -> chunks répartis sur un pool de process (parallel.imap_ordered).
+    Le résultat ne dépend pas de `workers` (une graine par chunk).
+
+    Retourne {metric: {mean, std, min, max, prob_negative, p05..p95, hist_counts, hist_edges}}.
+    """
+    unknown = set(specs) - set(INPUT_KEYS)
+    if unknown:
+        raise KeyError(f"Inputs inconnus: {', '.join(sorted(unknown))}")
+
+    n_draws = int(n_draws)
+    if n_draws <= 0:
+        raise ValueError("n_draws doit être > 0.")
+    chunk_size = max(1, int(chunk_size))
+    sizes = [chunk_size] * (n_draws // chunk_size)
+    if n_draws % chunk_size:
+        sizes.append(n_draws % chunk_size)
+
+    root = np.random.SeedSequence(seed)
+    pilot_seed, *chunk_seeds = root.spawn(len(sizes) + 1)
+    edges = _hist_edges(base, specs, pilot_seed)
+
+    base = {k: float(base[k]) for k in INPUT_KEYS}
+    specs = {k: dict(v) for k, v in specs.items()}
+    args = [(base, specs, s, n, edges) for s, n in zip(chunk_seeds, sizes)]
+
+    workers = max(1, min(int(workers), os.cpu_count() or 1, len(args)))
+    parts = list(imap_ordered(_run_chunk, args, workers))
+
+    result = {}
+    for m in MC_METRICS:
+        n = sum(p[m]["n"] for p in parts)
+        total = sum(p[m]["sum"] for p in parts)
+        totalsq = sum(p[m]["sumsq"] for p in parts)
+        counts = np.sum([p[m]["counts"] for p in parts], axis=0)
+        mean = total / n
+        summary = {
+            "n": n,
+            "mean": mean,
+            "std": float(np.sqrt(max(totalsq / n - mean**2, 0.0))),
+            "min": min(p[m]["min"] for p in parts),
+            "max": max(p[m]["max"] for p in parts),
+            "prob_negative": sum(p[m]["neg"] for p in parts) / n,
+            "hist_counts": counts,
+            "hist_edges": edges[m],
+        }
+        summary.update(_percentiles_from_hist(counts, edges[m], MC_PERCENTILES))
+        result[m] = summary
+    return result
@@ -0,0 +1,31 @@
+"""
+Pool de process partagé par les calculs parallèles.
+
+imap_ordered(fn, args) applique fn à chaque tuple d'arguments et rend les
+résultats dans l'ordre. Avec workers > 1 : ProcessPoolExecutor en « spawn »
+(les appels partent aussi de threads du serveur Streamlit, où un fork copierait
+des verrous tenus par les autres threads) et au plus 2 x workers tâches en vol,
+l'itérable d'arguments est consommé au fil de l'eau (mémoire bornée).
+"""
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator
+
+IN_FLIGHT_PER_WORKER = 2
+
+
+def imap_ordered(fn: Callable, args: Iterable[tuple], workers: int = 1) -> Iterator:
+    """fn(*a) pour chaque a de `args`, dans l'ordre ; fn et ses arguments doivent être picklables si workers > 1."""
+    if workers <= 1:
+        for a in args:
+            yield fn(*a)
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        in_flight = deque()
+        for a in args:
+            in_flight.append(pool.submit(fn, *a))
+            if len(in_flight) >= IN_FLIGHT_PER_WORKER * workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
@@ -0,0 +1,122 @@
+"""
+Presets du simulateur (historique par date, scénarios rapides, valeurs par défaut).
+Sans dépendance Streamlit : partagé par la page, le CLI et les autres outils.
+"""
+from datetime import date
+
+# --------------------------------------------------
+# PRESETS (historique + défaut)
+# --------------------------------------------------
+PRESETS_BY_DATE = {
+    date(2025, 6, 1): {
+        "name": "Historique – Jun 2025",
+        "revenu_pct": 3.73,
+        "cout_paiement_pct": 1.75,
+        "cout_liquidite_10j_pct": 0.21,
+        "defaut_30j_pct": 1.43,
+    },
+    date(2025, 12, 1): {
+        "name": "Historique – Dec 2025",
+        "revenu_pct": 3.76,
+        "cout_paiement_pct": 1.80,
+        "cout_liquidite_10j_pct": 0.36,
+        "defaut_30j_pct": 1.00,
+    },
+    date(2026, 6, 1): {
+        "name": "Default – Jun 2026",
+        "revenu_pct": 3.80,
+        "cout_paiement_pct": 1.20,
+        "cout_liquidite_10j_pct": 0.40,
+        "defaut_30j_pct": 1.00,
+    },
+}
+DEFAULT_DATE = date(2026, 6, 1)
+
+HISTORY_DATES = [date(2025, 6, 1), date(2025, 12, 1), date(2026, 6, 1)]
+
+# --------------------------------------------------
+# SCÉNARIOS RAPIDES (hard-coded)
+# --------------------------------------------------
+SCENARIOS_PRESETS = {
+    "Custom": None,
+
+    "Base scénario — Aujourd’hui": {
+        "revenu_pct": 3.80,
+        "cout_paiement_pct": 1.60,
+        "cout_liquidite_10j_pct": 0.40,
+        "defaut_30j_pct": 1.00,
+        "loan_book_k": 800.0,
+        "cycles_per_month": 2.9,
+        # optionnel: si tu veux aussi pré-remplir
+        "scenario_name_autofill": "Base scénario — Aujourd’hui",
+    },
+
+    "Scénario 1 — Optimisation légère": {
+        "revenu_pct": 3.80,
+        "cout_paiement_pct": 1.20,
+        "cout_liquidite_10j_pct": 0.40,
+        "defaut_30j_pct": 1.00,
+        "loan_book_k": 530.0,
+        "cycles_per_month": 2.9,
+        "scenario_name_autofill": "Scénario 1 — Optimisation légère",
+    },
+
+    "Scénario 2 — Open Banking": {
+        "revenu_pct": 3.80,
+        "cout_paiement_pct": 0.50,
+        "cout_liquidite_10j_pct": 0.40,
+        "defaut_30j_pct": 0.62,
+        "loan_book_k": 280.0,
+        "cycles_per_month": 3.0,
+        "scenario_name_autofill": "Scénario 2 — Open Banking",
+    },
+
+    "Scénario 3 — Tenure 15j + OB": {
+        "revenu_pct": 4.00,
+        "cout_paiement_pct": 0.50,
+        # NOTE: tu as mis 0.50% ici (vs 0.40% dans les autres) -> je respecte ton tableau.
+        # 0.50% = coût pour une tenure de 15j (annualisé sur 15j, cf. termstructure.py).
+        "cout_liquidite_10j_pct": 0.50,
+        "duree_liquidite_jours": 15,
+        "defaut_30j_pct": 0.65,
+        "loan_book_k": 290.0,
+        "cycles_per_month": 2.7,
+        "scenario_name_autofill": "Scénario 3 — Tenure 15j + OB",
+    },
+
+    "Scénario Seed": {
+        "revenu_pct": 3.77,
+        "cout_paiement_pct": 1.38,
+        "cout_liquidite_10j_pct": 0.34,
+        "defaut_30j_pct": 1.26,
+        # ton tableau n’a pas donné loan_book/cycles pour Seed -> je laisse volontairement inchangé
+        "loan_book_k": 294.0,
+        "cycles_per_month": 3.3,
+        "scenario_name_autofill": "Scénario Seed",
+    },
+}
+
+# Valeurs initiales des 8 inputs (session neuve, ou inputs absents d'un fichier batch)
+# + tenure du coût de liquidité (optionnelle pour le moteur, 10j = DUREE_PERIODE_LIQUIDITE_JOURS)
+DEFAULT_INPUTS = {
+    "revenu_pct": 3.8,
+    "cout_paiement_pct": 1.8,
+    "cout_liquidite_10j_pct": 0.55,
+    "defaut_30j_pct": 1.7,
+    "cycles_per_month": 2.9,
+    "loan_book_k": 300.0,
+    "avg_loan_value_eur": 300.0,
+    "tx_per_client_per_month": 2.9,
+    "duree_liquidite_jours": 10,
+}
+
+PRESET_PCT_KEYS = ("revenu_pct", "cout_paiement_pct", "cout_liquidite_10j_pct", "defaut_30j_pct")
+
+
+def records_from_obj(obj) -> list:
+    """JSON / YAML -> liste de dicts. Accepte une liste ou un mapping {nom: params} (format SCENARIOS_PRESETS)."""
+    if isinstance(obj, dict):
+        return [{"name": name, **params} for name, params in obj.items() if params]
+    if isinstance(obj, list):
+        return obj
+    raise ValueError("Le fichier doit contenir une liste de scénarios ou un mapping {nom: scénario}.")
@@ -0,0 +1,115 @@
+"""
+Profilage opt-in des reruns : temps par section du script, p50 / p95 glissants.
+Le temps jusqu'au premier affichage d'une session est mesuré dans tous les cas.
+
+Sans dépendance Streamlit : l'objet vit dans st.session_state (un par session).
+Le script appelle `lap(nom)` à la fin de chaque section : le temps écoulé depuis
+le lap précédent est attribué à cette section. Désactivé, `lap()` ne fait rien.
+Un fragment qui appelle `lap()` est décoré par `fragment(nom)` : quand il est
+relancé seul (sans le script), il est mesuré comme un rerun à part au lieu
+d'être attribué au rerun précédent.
+"""
+import json
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_MAX_RUNS = 200
+
+
+class RerunProfiler:
+    """Collecte {section: ms} pour chaque rerun complet, garde les `max_runs` derniers."""
+
+    def __init__(self, max_runs: int = DEFAULT_MAX_RUNS):
+        self.runs = deque(maxlen=max_runs)
+        self.current = None
+        self.enabled = False
+        self._in_script = False
+        self._t0 = None
+        self._last = None
+        # premier affichage : depuis la création de l'objet (1er rerun de la session)
+        self._session_t0 = time.perf_counter()
+        self.cold_start = "pandas" not in sys.modules
+        self.first_paint_ms = None
+
+    def start(self, enabled: bool) -> None:
+        """Début de rerun (un rerun précédent non terminé, ex: st.rerun(), est abandonné)."""
+        self.enabled = enabled
+        self._in_script = True
+        self.current = {} if enabled else None
+        self._t0 = self._last = time.perf_counter() if enabled else None
+
+    def lap(self, name: str) -> None:
+        """Attribue à `name` le temps écoulé depuis le lap précédent (no-op hors rerun profilé)."""
+        if self.current is None:
+            return
+        now = time.perf_counter()
+        self.current[name] = self.current.get(name, 0.0) + (now - self._last) * 1e3
+        self._last = now
+
+    def mark_first_paint(self) -> None:
+        """À appeler une fois le haut de page émis ; seul le premier appel de la session compte."""
+        if self.first_paint_ms is None:
+            self.first_paint_ms = (time.perf_counter() - self._session_t0) * 1e3
+
+    def finish(self, total: str = "total") -> None:
+        self._in_script = False
+        if self.current is None:
+            return
+        self.current[total] = (time.perf_counter() - self._t0) * 1e3
+        self.runs.append({"at": datetime.now(timezone.utc).isoformat(timespec="seconds"), "sections_ms": self.current})
+        self.current = None
+
+    @contextmanager
+    def fragment(self, name: str):
+        """
+        Corps d'un @st.fragment. Appelé depuis le script complet, ses laps comptent dans ce
+        rerun ; rerun du fragment seul, il est mesuré comme un rerun à part (total « fragment:name »).
+        """
+        if self._in_script:
+            yield
+            return
+        self.start(self.enabled)
+        try:
+            yield
+        finally:
+            self.finish(total=f"fragment:{name}")
+
+    def summary(self) -> "pd.DataFrame":
+        """Une ligne par section : dernier rerun, p50, p95 (ms) sur la fenêtre glissante."""
+        import numpy as np
+        import pandas as pd
+
+        if not self.runs:
+            return pd.DataFrame(columns=["section", "last_ms", "p50_ms", "p95_ms", "n"])
+        names = list(dict.fromkeys(n for r in self.runs for n in r["sections_ms"]))
+        rows = []
+        for name in names:
+            samples = np.array([r["sections_ms"][name] for r in self.runs if name in r["sections_ms"]])
+            rows.append(
+                {
+                    "section": name,
+                    "last_ms": self.runs[-1]["sections_ms"].get(name, np.nan),
+                    "p50_ms": float(np.percentile(samples, 50)),
+                    "p95_ms": float(np.percentile(samples, 95)),
+                    "n": len(samples),
+                }
+            )
+        return pd.DataFrame(rows)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "first_paint_ms": self.first_paint_ms,
+                "cold_start": self.cold_start,
+                "runs": list(self.runs),
+                "summary": self.summary().to_dict(orient="records"),
+            },
+            indent=2,
+        )
@@ -0,0 +1,144 @@
+"""
+Projection mensuelle (12–60 mois) avec recalcul incrémental.
+
+Chaque mois a son vecteur d'inputs, résolu colonne par colonne :
+    valeur[m] = override[m]                         si override renseigné
+              = valeur[m-1] x (1 + croissance[m]/100) sinon
+    valeur[0] = inputs actuels (sauf override)
+
+Un mois ne dépend donc que des mois précédents. Quand un driver change au mois k,
+seuls les mois >= k de cette colonne sont re-résolus, et la propagation s'arrête
+dès qu'un mois retrouve sa valeur précédente (ex: override plus loin). Les outputs
+ne sont recalculés que sur la plage de mois effectivement modifiée.
+"""
+from datetime import date
+from typing import Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from engine import INPUT_KEYS, OUTPUT_KEYS, compute_metrics
+
+CUMULATIVE_KEYS = {
+    "cum_contribution_value_k": "contribution_value_k",
+    "cum_monthly_revenue_eur": "monthly_revenue_eur",
+}
+
+
+class Projection:
+    """État d'une projection : drivers (overrides, croissance), inputs résolus et outputs par mois."""
+
+    def __init__(self, base: Mapping, horizon: int, start: Optional[date] = None):
+        self.horizon = int(horizon)
+        self.start = start or date.today().replace(day=1)
+        n_in = len(INPUT_KEYS)
+        self.base = np.array([float(base[k]) for k in INPUT_KEYS])
+        self.overrides = np.full((self.horizon, n_in), np.nan)
+        self.growth = np.zeros((self.horizon, n_in))
+        self.inputs = np.empty((self.horizon, n_in))
+        self.metrics = {k: np.empty(self.horizon) for k in OUTPUT_KEYS}
+        self.cumulative = {k: np.empty(self.horizon) for k in CUMULATIVE_KEYS}
+        self.last_recomputed_months = 0
+
+        for j in range(n_in):
+            self._resolve_column(j, 0, force=True)
+        self._recompute(0, self.horizon)
+
+    # --------------------------------------------------
+    # RÉSOLUTION
+    # --------------------------------------------------
+    def _resolve_column(self, j: int, start: int, last_driver_change: int = -1, force: bool = False) -> int:
+        """
+        Re-résout la colonne j à partir du mois `start`. La propagation s'arrête au premier
+        mois inchangé situé après le dernier driver modifié. Retourne la fin (exclue) de la plage re-résolue.
+        """
+        prev = self.base[j] if start == 0 else self.inputs[start - 1, j]
+        for m in range(start, self.horizon):
+            o = self.overrides[m, j]
+            if not np.isnan(o):
+                new = o
+            else:
+                new = prev * (1 + self.growth[m, j] / 100) if m > 0 else prev
+            if not force and m > last_driver_change and new == self.inputs[m, j]:
+                return m
+            self.inputs[m, j] = new
+            prev = new
+        return self.horizon
+
+    def _recompute(self, lo: int, hi: int) -> None:
+        """Outputs des mois [lo, hi), puis cumuls à partir de lo."""
+        if hi > lo:
+            block = compute_metrics(*(self.inputs[lo:hi, j] for j in range(len(INPUT_KEYS))))
+            for k in OUTPUT_KEYS:
+                self.metrics[k][lo:hi] = block[k]
+        for cum_key, src in CUMULATIVE_KEYS.items():
+            offset = self.cumulative[cum_key][lo - 1] if lo > 0 else 0.0
+            self.cumulative[cum_key][lo:] = offset + np.cumsum(self.metrics[src][lo:])
+        self.last_recomputed_months = max(hi - lo, 0)
+
+    # --------------------------------------------------
+    # MISE À JOUR
+    # --------------------------------------------------
+    def update(self, base: Optional[Mapping] = None, overrides: Optional[np.ndarray] = None, growth: Optional[np.ndarray] = None) -> int:
+        """
+        Remplace tout ou partie des drivers et ne recalcule que ce qui en dépend.
+        overrides / growth : matrices (horizon x 8), NaN = pas d'override.
+        Retourne le nombre de mois dont les outputs ont été recalculés.
+        """
+        first_changed = np.full(len(INPUT_KEYS), self.horizon)
+        last_changed = np.full(len(INPUT_KEYS), -1)
+
+        if base is not None:
+            new_base = np.array([float(base[k]) for k in INPUT_KEYS])
+            first_changed[new_base != self.base] = 0
+            self.base = new_base
+        for attr, new in (("overrides", overrides), ("growth", growth)):
+            if new is None:
+                continue
+            new = np.asarray(new, dtype=np.float64)
+            old = getattr(self, attr)
+            diff = ~((new == old) | (np.isnan(new) & np.isnan(old)))
+            touched = diff.any(axis=0)
+            first_changed = np.minimum(first_changed, np.where(touched, diff.argmax(axis=0), self.horizon))
+            last_changed = np.maximum(last_changed, np.where(touched, self.horizon - 1 - diff[::-1].argmax(axis=0), -1))
+            setattr(self, attr, new.copy())
+
+        lo, hi = self.horizon, 0
+        for j in np.flatnonzero(first_changed < self.horizon):
+            start = int(first_changed[j])
+            end = self._resolve_column(j, start, int(last_changed[j]))
+            if end > start:
+                lo, hi = min(lo, start), max(hi, end)
+        if hi > lo:
+            self._recompute(lo, hi)
+        else:
+            self.last_recomputed_months = 0
+        return self.last_recomputed_months
+
+    # --------------------------------------------------
+    # SORTIE
+    # --------------------------------------------------
+    def months(self) -> pd.DatetimeIndex:
+        return pd.date_range(self.start, periods=self.horizon, freq="MS", name="month")
+
+    def to_frame(self) -> pd.DataFrame:
+        df = pd.DataFrame(self.inputs, columns=list(INPUT_KEYS), index=self.months())
+        for k in OUTPUT_KEYS:
+            df[k] = self.metrics[k]
+        for k in CUMULATIVE_KEYS:
+            df[k] = self.cumulative[k]
+        return df
+
+
+def ramp_overrides(horizon: int, key: str, start_month: int, end_month: int, start_value: float, end_value: float) -> np.ndarray:
+    """
+    Overrides (horizon x 8) d'une rampe linéaire sur `key` entre start_month et end_month
+    (ex: baisse de cout_paiement_pct après Open Banking) ; les mois suivants héritent de end_value.
+    """
+    out = np.full((horizon, len(INPUT_KEYS)), np.nan)
+    j = INPUT_KEYS.index(key)
+    start_month = max(0, min(int(start_month), horizon - 1))
+    end_month = max(start_month, min(int(end_month), horizon - 1))
+    n = end_month - start_month + 1
+    out[start_month : end_month + 1, j] = np.linspace(start_value, end_value, n + 1)[1:]
+    return out
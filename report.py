@@ -0,0 +1,532 @@
+"""
+Pack de rapports : waterfall, panneau d'outputs et historique pour N scénarios
+(SCENARIOS_PRESETS et / ou scénarios sauvegardés), en Excel multi-feuilles et en PDF.
+
+Tout est écrit en flux, chunk par chunk : les scénarios sont lus dans la base par
+pages (store.iter_scenarios), évalués en une passe vectorisée par chunk, puis
+- ajoutés ligne à ligne au classeur (xlsxwriter en mode constant_memory) ;
+- rendus en pages PDF (flux de dessin compressés) dans un pool de process, et
+  écrits sur disque dès qu'ils reviennent, dans l'ordre.
+La mémoire ne dépend que de la taille d'un chunk, pas du nombre de scénarios.
+
+Le PDF est écrit à la main (PDF 1.4, polices standard Helvetica, aucune dépendance) ;
+l'Excel nécessite `xlsxwriter` (optionnel). Usage en ligne de commande :
+
+    python report.py --xlsx pack.xlsx --pdf pack.pdf            # presets + toute la base
+    python report.py --pdf presets.pdf --no-saved -w 4
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from cli import evaluate_chunk
+from engine import INPUT_KEYS, OUTPUT_KEYS, TENURE_KEY
+from parallel import imap_ordered
+from presets import SCENARIOS_PRESETS, records_from_obj
+from store import DEFAULT_DB_PATH, count_scenarios, iter_scenarios, latest_per_date
+from timeseries import downsample, series_from_frame
+
+DEFAULT_CHUNK_ROWS = 500
+HISTORY_MAX_POINTS = 500
+
+INPUT_LABELS = {
+    "revenu_pct": ("Revenus / trx", "{:.2f} %"),
+    "cout_paiement_pct": ("Coût paiement / trx", "{:.2f} %"),
+    "cout_liquidite_10j_pct": ("Coût liquidité / prêt", "{:.2f} %"),
+    "defaut_30j_pct": ("Défaut 30j / trx", "{:.2f} %"),
+    "loan_book_k": ("Loan book moyen", "{:,.0f} k€"),
+    "cycles_per_month": ("Cycles de liquidité / mois", "{:.2f}"),
+    "avg_loan_value_eur": ("Valeur moyenne par prêt", "{:,.0f} €"),
+    "tx_per_client_per_month": ("Transactions / client / mois", "{:.2f}"),
+    TENURE_KEY: ("Tenure liquidité", "{:g} j"),
+}
+# même ordre et mêmes libellés que le panneau d'outputs de la page
+OUTPUT_LABELS = {
+    "contribution_margin_pct": ("Contribution margin / trx", "{:.2f} %"),
+    "contribution_value_k": ("Contribution value / mois", "{:,.2f} k€"),
+    "taux_liquidite_annuel_pct": ("Coût de liquidité annualisé", "{:.1f} %"),
+    "monthly_revenue_eur": ("Revenue / mois", "{:,.0f} €"),
+    "annual_revenue_eur": ("Revenue / an", "{:,.0f} €"),
+    "revenue_per_loan_eur": ("Revenue / prêt", "{:,.0f} €"),
+    "revenue_per_client_month_eur": ("Revenue / client / mois", "{:,.0f} €"),
+    "take_rate_effective_pct": ("Take-rate effectif", "{:.2f} %"),
+    "monthly_volume_eur": ("Volume / mois", "{:,.0f} €"),
+    "nb_loans_per_month": ("Prêts / mois", "{:,.0f}"),
+    "nb_clients_per_month": ("Clients / mois", "{:,.0f}"),
+}
+WATERFALL_STEPS = ("Revenu", "Coût paiement", "Coût liquidité", "Défaut 30j", "Contribution")
+# couleurs des graphiques de la page (charts.py)
+COLORS = {"positive": "#1B5A43", "negative": "#F83131", "total": "#064C72", "text": "#111111", "grid": "#DDDDDD"}
+SCENARIO_COLUMNS = ("source", "id", "date", "name", *INPUT_KEYS, TENURE_KEY, *OUTPUT_KEYS)
+
+
+# --------------------------------------------------
+# SCÉNARIOS (chunks évalués)
+# --------------------------------------------------
+def preset_frame(names: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """SCENARIOS_PRESETS (tous, ou `names`) en DataFrame d'inputs."""
+    presets = {k: v for k, v in SCENARIOS_PRESETS.items() if v and (names is None or k in set(names))}
+    return pd.DataFrame(records_from_obj(presets)) if presets else pd.DataFrame()
+
+
+def scenario_chunks(
+    preset_names: Optional[Iterable[str]] = None,
+    saved_ids: Optional[Iterable[int]] = None,
+    include_saved: bool = True,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    path: str = DEFAULT_DB_PATH,
+) -> Iterator[pd.DataFrame]:
+    """
+    Chunks évalués (colonnes SCENARIO_COLUMNS) : presets d'abord, puis scénarios sauvegardés
+    (ceux de `saved_ids`, ou toute la base si saved_ids est None et include_saved).
+    """
+    presets = preset_frame(preset_names)
+    if len(presets):
+        yield _finish(evaluate_chunk(presets).assign(source="Preset", id=None, date=None))
+    if not include_saved:
+        return
+    for chunk in iter_scenarios(ids=saved_ids, chunk_rows=chunk_rows, path=path):
+        if len(chunk):
+            yield _finish(evaluate_chunk(chunk).assign(source="Sauvegardé"))
+
+
+def _finish(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame.reindex(columns=list(SCENARIO_COLUMNS))
+
+
+def waterfall_arrays(frame: pd.DataFrame) -> tuple:
+    """(values, start, end) de forme (n, 5), pour tous les scénarios d'un coup (cf. charts.make_waterfall_df)."""
+    rev = frame["revenu_pct"].to_numpy(dtype=np.float64)
+    pay = frame["cout_paiement_pct"].to_numpy(dtype=np.float64)
+    liq = frame["cout_liquidite_10j_pct"].to_numpy(dtype=np.float64)
+    dft = frame["defaut_30j_pct"].to_numpy(dtype=np.float64)
+    margin = frame["contribution_margin_pct"].to_numpy(dtype=np.float64)
+    values = np.stack([rev, -pay, -liq, -dft, margin], axis=1)
+    end = np.cumsum(values[:, :4], axis=1)
+    start = np.concatenate([np.zeros((len(frame), 1)), end[:, :3], np.zeros((len(frame), 1))], axis=1)
+    end = np.concatenate([end, margin[:, np.newaxis]], axis=1)
+    return values, start, end
+
+
+def _label(rec: dict) -> str:
+    name = rec.get("name")
+    return str(name) if name is not None and not (isinstance(name, float) and np.isnan(name)) else "Sans nom"
+
+
+# --------------------------------------------------
+# EXCEL (xlsxwriter, constant_memory)
+# --------------------------------------------------
+class ExcelPack:
+    """Classeur : Synthèse, Scénarios (1 ligne / scénario), Waterfalls (5 lignes / scénario), Historique."""
+
+    def __init__(self, path: str):
+        try:
+            import xlsxwriter
+        except ImportError as e:  # dépendance optionnelle
+            raise ImportError("L'export Excel nécessite `xlsxwriter` (pip install xlsxwriter).") from e
+        self.path = path
+        # fichiers temporaires de constant_memory dans un dossier à nous : supprimé d'un bloc à la fin
+        self.tmpdir = tempfile.mkdtemp(prefix="waribei-xlsx-")
+        self.wb = xlsxwriter.Workbook(
+            path, {"constant_memory": True, "nan_inf_to_errors": True, "default_date_format": "yyyy-mm-dd", "tmpdir": self.tmpdir}
+        )
+        self.bold = self.wb.add_format({"bold": True, "font_color": COLORS["total"]})
+        self.num = self.wb.add_format({"num_format": "#,##0.00"})
+        self.ws_summary = self.wb.add_worksheet("Synthèse")
+        self.ws_scen = self.wb.add_worksheet("Scénarios")
+        self.ws_wf = self.wb.add_worksheet("Waterfalls")
+        self.ws_hist = self.wb.add_worksheet("Historique")
+        self.ws_scen.write_row(0, 0, list(SCENARIO_COLUMNS), self.bold)
+        self.ws_scen.freeze_panes(1, 4)
+        self.ws_wf.write_row(0, 0, ["source", "id", "name", "step", "value", "start", "end", "type"], self.bold)
+        self.row_scen = 1
+        self.row_wf = 1
+        self.closed = False
+
+    def add(self, frame: pd.DataFrame) -> None:
+        values, start, end = waterfall_arrays(frame)
+        for i, rec in enumerate(frame.to_dict("records")):
+            for j, col in enumerate(SCENARIO_COLUMNS):
+                v = rec[col]
+                if v is None or (isinstance(v, float) and np.isnan(v) and col in ("id", "date", "name")):
+                    continue
+                if col in ("source", "name"):
+                    self.ws_scen.write_string(self.row_scen, j, str(v))
+                else:
+                    self.ws_scen.write(self.row_scen, j, v, self.num if isinstance(v, float) else None)
+            self.row_scen += 1
+            for k, step in enumerate(WATERFALL_STEPS):
+                kind = "total" if k == len(WATERFALL_STEPS) - 1 else ("positive" if values[i, k] >= 0 else "negative")
+                self.ws_wf.write_string(self.row_wf, 0, rec["source"])
+                if rec["id"] is not None and not pd.isna(rec["id"]):
+                    self.ws_wf.write_number(self.row_wf, 1, int(rec["id"]))
+                self.ws_wf.write_string(self.row_wf, 2, _label(rec))
+                self.ws_wf.write_string(self.row_wf, 3, step)
+                self.ws_wf.write_row(self.row_wf, 4, [values[i, k], start[i, k], end[i, k]], self.num)
+                self.ws_wf.write_string(self.row_wf, 7, kind)
+                self.row_wf += 1
+
+    def close(self, stats: dict, history: pd.DataFrame) -> None:
+        self.ws_hist.write_row(0, 0, ["date", "name", "contribution_margin_pct"], self.bold)
+        for r, rec in enumerate(history.itertuples(index=False), start=1):
+            self.ws_hist.write_datetime(r, 0, datetime(rec.date.year, rec.date.month, rec.date.day))
+            self.ws_hist.write_string(r, 1, str(rec.name))
+            self.ws_hist.write_number(r, 2, float(rec.contribution_margin_pct), self.num)
+        if len(history) > 1:
+            chart = self.wb.add_chart({"type": "line"})
+            chart.add_series(
+                {
+                    "name": "Contribution margin (%)",
+                    "categories": ["Historique", 1, 0, len(history), 0],
+                    "values": ["Historique", 1, 2, len(history), 2],
+                    "line": {"color": COLORS["total"]},
+                }
+            )
+            chart.set_legend({"none": True})
+            chart.set_title({"name": "Historique de la contribution margin"})
+            self.ws_hist.insert_chart(1, 4, chart)
+
+        self.ws_summary.write_string(0, 0, "Pack unit economics Waribei", self.bold)
+        for r, (label, value) in enumerate(_summary_rows(stats), start=2):
+            self.ws_summary.write_string(r, 0, label)
+            self.ws_summary.write(r, 1, value)
+        self.ws_summary.set_column(0, 0, 36)
+        self.ws_summary.set_column(1, 1, 40)
+        self.wb.close()
+        self.closed = True
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def discard(self) -> None:
+        """Abandon (erreur, annulation) : ferme le classeur, puis supprime le dossier temporaire et le fichier partiel."""
+        if not self.closed:
+            self.closed = True
+            try:
+                self.wb.close()
+            except Exception:  # noqa: BLE001 — on nettoie, l'erreur d'origine est relancée par l'appelant
+                pass
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _summary_rows(stats: dict) -> list:
+    if not stats["n"]:
+        return [("Scénarios", 0)]
+    return [
+        ("Généré le", stats["generated_at"]),
+        ("Scénarios", stats["n"]),
+        ("Contribution margin moyenne (%)", round(stats["cm_sum"] / stats["n"], 4)),
+        ("Meilleure contribution margin", f"{stats['best'][0]:.2f} % — {stats['best'][1]}"),
+        ("Pire contribution margin", f"{stats['worst'][0]:.2f} % — {stats['worst'][1]}"),
+        ("Scénarios à marge négative", stats["negative"]),
+    ]
+
+
+# --------------------------------------------------
+# PDF (écrit au fil de l'eau, sans dépendance)
+# --------------------------------------------------
+PAGE_W, PAGE_H = 595, 842  # A4 en points
+
+
+def _rgb(hex_color: str) -> str:
+    h = hex_color.lstrip("#")
+    return " ".join(f"{int(h[i : i + 2], 16) / 255:.3f}" for i in (0, 2, 4))
+
+
+def _pdf_text(s: str) -> str:
+    raw = str(s).encode("cp1252", errors="replace").decode("latin-1")
+    return raw.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+class PdfPage:
+    """Flux de dessin d'une page (opérateurs PDF), compressé à la fin."""
+
+    def __init__(self):
+        self.ops = []
+
+    def text(self, x: float, y: float, s: str, size: float = 10, bold: bool = False, color: str = COLORS["text"]) -> None:
+        self.ops.append(f"BT {_rgb(color)} rg /{'F2' if bold else 'F1'} {size} Tf {x:.1f} {y:.1f} Td ({_pdf_text(s)}) Tj ET")
+
+    def rect(self, x: float, y: float, w: float, h: float, color: str) -> None:
+        self.ops.append(f"{_rgb(color)} rg {x:.1f} {y:.1f} {w:.1f} {h:.1f} re f")
+
+    def line(self, xs, ys, color: str, width: float = 1.0) -> None:
+        if len(xs) < 2:
+            return
+        path = " ".join(f"{x:.1f} {y:.1f} {'m' if i == 0 else 'l'}" for i, (x, y) in enumerate(zip(xs, ys)))
+        self.ops.append(f"{_rgb(color)} RG {width} w {path} S")
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress("\n".join(self.ops).encode("latin-1"))
+
+
+class PdfStream:
+    """
+    PDF 1.4 écrit objet par objet : une page ajoutée est sur disque, seuls les offsets
+    restent en mémoire. L'ordre des pages est fixé à la fermeture (la page de synthèse,
+    calculée en dernier, peut passer en tête).
+    """
+
+    CATALOG, PAGES, FONT, FONT_BOLD = 1, 2, 3, 4
+
+    def __init__(self, path: str):
+        self.path = path
+        self.f = open(path, "wb")
+        self.offsets = {}
+        self.page_ids = []
+        self.front_ids = []
+        self.next_id = 5
+        self.f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._obj(self.FONT, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        self._obj(self.FONT_BOLD, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+
+    def _obj(self, oid: int, body: bytes) -> None:
+        self.offsets[oid] = self.f.tell()
+        self.f.write(b"%d 0 obj\n" % oid + body + b"\nendobj\n")
+
+    def add_page(self, content: bytes, front: bool = False) -> None:
+        """`content` = flux déjà compressé (PdfPage.to_bytes)."""
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self._obj(content_id, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content) + content + b"\nendstream")
+        self._obj(
+            page_id,
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> >>" % (self.PAGES, PAGE_W, PAGE_H, content_id, self.FONT, self.FONT_BOLD),
+        )
+        (self.front_ids if front else self.page_ids).append(page_id)
+
+    def close(self) -> None:
+        kids = self.front_ids + self.page_ids
+        self._obj(self.PAGES, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids)))
+        self._obj(self.CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % self.PAGES)
+        xref = self.f.tell()
+        n = self.next_id
+        self.f.write(b"xref\n0 %d\n0000000000 65535 f \n" % n)
+        for oid in range(1, n):
+            self.f.write(b"%010d 00000 n \n" % self.offsets[oid])
+        self.f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (n, self.CATALOG, xref))
+        self.f.close()
+
+
+def _waterfall(page: PdfPage, x0: float, y0: float, w: float, h: float, values, start, end) -> None:
+    lo = min(0.0, float(np.min(start)), float(np.min(end)))
+    hi = max(0.0, float(np.max(start)), float(np.max(end)))
+    span = (hi - lo) or 1.0
+
+    def y(v):
+        return y0 + (v - lo) / span * h
+
+    page.line([x0, x0 + w], [y(0), y(0)], COLORS["grid"], 0.8)
+    slot = w / len(WATERFALL_STEPS)
+    for k, step in enumerate(WATERFALL_STEPS):
+        kind = "total" if k == len(WATERFALL_STEPS) - 1 else ("positive" if values[k] >= 0 else "negative")
+        bx = x0 + k * slot + slot * 0.15
+        b, t = sorted((y(start[k]), y(end[k])))
+        page.rect(bx, b, slot * 0.7, max(t - b, 0.5), COLORS[kind])
+        page.text(bx, t + 4, f"{values[k]:+.2f} %", size=8)
+        page.text(bx, y0 - 14, step, size=8)
+
+
+def scenario_page(rec: dict, values, start, end, number: int) -> bytes:
+    """Une page : en-tête, inputs, panneau d'outputs, waterfall (flux compressé)."""
+    page = PdfPage()
+    page.rect(0, PAGE_H - 70, PAGE_W, 70, COLORS["total"])
+    page.text(40, PAGE_H - 40, _label(rec), size=18, bold=True, color="#FFFFFF")
+    sub = rec["source"] + (f" · {rec['date']}" if rec.get("date") is not None and not pd.isna(rec["date"]) else "")
+    page.text(40, PAGE_H - 58, sub, size=10, color="#FFFFFF")
+    page.text(PAGE_W - 70, 24, f"{number}", size=8)
+
+    y = PAGE_H - 110
+    page.text(40, y, "Inputs", size=12, bold=True, color=COLORS["total"])
+    page.text(310, y, "Outputs", size=12, bold=True, color=COLORS["total"])
+    for i, (k, (label, fmt)) in enumerate(INPUT_LABELS.items()):
+        page.text(40, y - 22 - i * 18, label, size=9)
+        page.text(200, y - 22 - i * 18, fmt.format(rec[k]), size=9, bold=True)
+    for i, (k, (label, fmt)) in enumerate(OUTPUT_LABELS.items()):
+        highlight = k in ("contribution_margin_pct", "contribution_value_k")
+        color = COLORS["positive"] if rec[k] >= 0 else COLORS["negative"]
+        page.text(310, y - 22 - i * 18, label, size=9)
+        page.text(470, y - 22 - i * 18, fmt.format(rec[k]), size=9, bold=True, color=color if highlight else COLORS["text"])
+
+    page.text(40, 380, "Décomposition par transaction (waterfall, %)", size=12, bold=True, color=COLORS["total"])
+    _waterfall(page, 60, 110, PAGE_W - 120, 230, values, start, end)
+    return page.to_bytes()
+
+
+def _render_pages(frame: pd.DataFrame, first_number: int) -> list:
+    """Pages d'un chunk (appelé dans les workers)."""
+    values, start, end = waterfall_arrays(frame)
+    return [scenario_page(rec, values[i], start[i], end[i], first_number + i) for i, rec in enumerate(frame.to_dict("records"))]
+
+
+def summary_page(stats: dict, history: pd.DataFrame) -> bytes:
+    """Page de garde : synthèse du pack + courbe d'historique (réduite à HISTORY_MAX_POINTS points)."""
+    page = PdfPage()
+    page.rect(0, PAGE_H - 90, PAGE_W, 90, COLORS["total"])
+    page.text(40, PAGE_H - 50, "Pack unit economics Waribei", size=22, bold=True, color="#FFFFFF")
+    page.text(40, PAGE_H - 72, "Waterfall, outputs et historique par scénario", size=11, color="#FFFFFF")
+    for i, (label, value) in enumerate(_summary_rows(stats)):
+        page.text(40, PAGE_H - 130 - i * 20, label, size=11)
+        page.text(260, PAGE_H - 130 - i * 20, f"{value:,}" if isinstance(value, int) else str(value), size=11, bold=True)
+
+    page.text(40, 430, "Historique de la contribution margin (dernier SAVE par date)", size=12, bold=True, color=COLORS["total"])
+    t, cm = downsample(series_from_frame(history, "contribution_margin_pct"), HISTORY_MAX_POINTS)
+    if len(t) > 1:
+        x0, y0, w, h = 60, 120, PAGE_W - 120, 280
+        tx = t.astype(np.int64).astype(np.float64)
+        lo, hi = min(0.0, float(cm.min())), max(0.0, float(cm.max()))
+        span_y, span_x = (hi - lo) or 1.0, (tx[-1] - tx[0]) or 1.0
+        xs = x0 + (tx - tx[0]) / span_x * w
+        ys = y0 + (cm - lo) / span_y * h
+        page.line([x0, x0 + w], [y0 + (0 - lo) / span_y * h] * 2, COLORS["grid"], 0.8)
+        page.line(xs, ys, COLORS["total"], 1.5)
+        page.text(x0, y0 - 16, str(t[0]), size=8)
+        page.text(x0 + w - 50, y0 - 16, str(t[-1]), size=8)
+        page.text(x0 - 40, y0 + h, f"{hi:.2f} %", size=8)
+        page.text(x0 - 40, y0, f"{lo:.2f} %", size=8)
+    else:
+        page.text(60, 400, "Pas assez de scénarios sauvegardés pour tracer un historique.", size=10)
+    return page.to_bytes()
+
+
+# --------------------------------------------------
+# PACK
+# --------------------------------------------------
+def _update_stats(stats: dict, frame: pd.DataFrame) -> None:
+    cm = frame["contribution_margin_pct"].to_numpy(dtype=np.float64)
+    if not len(cm):
+        return
+    stats["n"] += len(cm)
+    stats["cm_sum"] += float(cm.sum())
+    stats["negative"] += int((cm < 0).sum())
+    i_max, i_min = int(cm.argmax()), int(cm.argmin())
+    if stats["best"] is None or cm[i_max] > stats["best"][0]:
+        stats["best"] = (float(cm[i_max]), _label(frame.iloc[i_max].to_dict()))
+    if stats["worst"] is None or cm[i_min] < stats["worst"][0]:
+        stats["worst"] = (float(cm[i_min]), _label(frame.iloc[i_min].to_dict()))
+
+
+def _pages_stream(chunks: Iterable[pd.DataFrame], workers: int, on_chunk: Callable) -> Iterator[list]:
+    """
+    Pages PDF des chunks, dans l'ordre, rendues sur `workers` process (parallel.imap_ordered).
+    on_chunk(frame) est appelé à la lecture de chaque chunk (Excel, statistiques).
+    """
+
+    def numbered():
+        number = 1
+        for frame in chunks:
+            on_chunk(frame)
+            yield frame, number
+            number += len(frame)
+
+    yield from imap_ordered(_render_pages, numbered(), workers)
+
+
+def export_pack(
+    xlsx_path: Optional[str] = None,
+    pdf_path: Optional[str] = None,
+    preset_names: Optional[Iterable[str]] = None,
+    saved_ids: Optional[Iterable[int]] = None,
+    include_saved: bool = True,
+    workers: int = 1,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    progress: Optional[Callable] = None,
+    path: str = DEFAULT_DB_PATH,
+) -> dict:
+    """
+    Écrit le pack (Excel et / ou PDF) et retourne les statistiques (n, marges…).
+    progress(fraction) est appelé après chaque chunk (peut lever pour interrompre).
+    """
+    if not xlsx_path and not pdf_path:
+        raise ValueError("Donner au moins un fichier de sortie (xlsx ou pdf).")
+    saved_ids = None if saved_ids is None else [int(i) for i in saved_ids]
+    n_presets = len(preset_frame(preset_names))
+    n_saved = (len(saved_ids) if saved_ids is not None else count_scenarios(path=path)) if include_saved else 0
+    total = max(n_presets + n_saved, 1)
+
+    stats = {"n": 0, "cm_sum": 0.0, "negative": 0, "best": None, "worst": None, "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M")}
+    excel = ExcelPack(xlsx_path) if xlsx_path else None
+    pdf = PdfStream(pdf_path) if pdf_path else None
+    history = latest_per_date(path=path)
+
+    def on_chunk(frame):
+        _update_stats(stats, frame)
+        if excel is not None:
+            excel.add(frame)
+
+    try:
+        chunks = scenario_chunks(preset_names, saved_ids, include_saved, chunk_rows, path)
+        if pdf is None:
+            for frame in chunks:
+                on_chunk(frame)
+                if progress is not None:
+                    progress(stats["n"] / total)
+        else:
+            done = 0
+            for pages in _pages_stream(chunks, workers, on_chunk):
+                for content in pages:
+                    pdf.add_page(content)
+                done += len(pages)
+                if progress is not None:
+                    progress(done / total)
+            pdf.add_page(summary_page(stats, history), front=True)
+            pdf.close()
+        if excel is not None:
+            excel.close(stats, history)
+    except BaseException:
+        # pas de fichier tronqué sur disque ni de fichiers temporaires xlsxwriter (erreur ou annulation)
+        if pdf is not None and not pdf.f.closed:
+            pdf.f.close()
+            os.remove(pdf_path)
+        if excel is not None:
+            excel.discard()
+        raise
+    return {k: v for k, v in stats.items() if k != "cm_sum"} | {"cm_mean": stats["cm_sum"] / stats["n"] if stats["n"] else 0.0}
+
+
+# --------------------------------------------------
+# CLI
+# --------------------------------------------------
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pack de rapports Waribei (Excel multi-feuilles + PDF).")
+    parser.add_argument("--xlsx", help="Classeur de sortie (.xlsx, nécessite xlsxwriter)")
+    parser.add_argument("--pdf", help="PDF de sortie")
+    parser.add_argument("--preset", action="append", help="Preset à inclure (répétable ; défaut : tous)")
+    parser.add_argument("--no-presets", action="store_true", help="N'inclut aucun preset")
+    parser.add_argument("--no-saved", action="store_true", help="N'inclut pas les scénarios sauvegardés")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Base de scénarios (défaut: WARIBEI_DB)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Process pour le rendu PDF (défaut: nb de CPU)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Scénarios par chunk")
+    args = parser.parse_args(argv)
+
+    if not args.xlsx and not args.pdf:
+        parser.error("donner --xlsx et / ou --pdf")
+
+    t0 = time.perf_counter()
+    stats = export_pack(
+        args.xlsx,
+        args.pdf,
+        preset_names=[] if args.no_presets else args.preset,
+        include_saved=not args.no_saved,
+        workers=args.workers,
+        chunk_rows=args.chunk_rows,
+        path=args.db,
+    )
+    elapsed = time.perf_counter() - t0
+    outputs = " + ".join(p for p in (args.xlsx, args.pdf) if p)
+    print(f"{stats['n']:,} scénarios -> {outputs} en {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Cache de résultats partagé par tout le process (toutes les sessions Streamlit).
+
+Clé = hash canonique des 8 inputs (floats normalisés, ordre de INPUT_KEYS) +
+tenure du coût de liquidité + mode du modèle : deux analystes sur le même preset tombent sur la même entrée.
+Valeur = tout ce que la page dérive du point : metrics, DataFrame et spec
+Vega-Lite du waterfall. Taille bornée, éviction LRU, compteurs hits / misses.
+Les valeurs sont partagées : ne pas les modifier.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Mapping
+
+from charts import make_waterfall_df, waterfall_chart
+from engine import DUREE_PERIODE_LIQUIDITE_JOURS, INPUT_KEYS, TENURE_KEY, compute_point
+
+DEFAULT_MAXSIZE = 256
+DEFAULT_MODE = "unitaire"
+# chiffres significatifs gardés dans la clé (absorbe le bruit des sliders float)
+KEY_SIGNIFICANT_DIGITS = 12
+
+
+def input_key(inputs: Mapping, mode: str = DEFAULT_MODE) -> str:
+    """Hash canonique (sha1 hex) des 8 inputs + tenure + mode ; KeyError si un input manque."""
+    tenure = inputs[TENURE_KEY] if TENURE_KEY in inputs else DUREE_PERIODE_LIQUIDITE_JOURS
+    raw = [*(inputs[k] for k in INPUT_KEYS), tenure]
+    values = [float(f"{float(v):.{KEY_SIGNIFICANT_DIGITS}g}") + 0.0 for v in raw]  # + 0.0 : -0.0 -> 0.0
+    payload = json.dumps([mode, values], separators=(",", ":"))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class LRUCache:
+    """Dict borné thread-safe (les sessions Streamlit tournent dans des threads)."""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key: str, compute: Callable[[], object]):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        # calcul hors verrou : deux sessions peuvent calculer la même clé, la dernière écrase
+        value = compute()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+# Une instance par process (module importé une seule fois)
+RESULTS = LRUCache()
+
+
+def _point_results(inputs: Mapping) -> dict:
+    metrics = compute_point(inputs)
+    wf_df = make_waterfall_df(
+        float(inputs["revenu_pct"]),
+        float(inputs["cout_paiement_pct"]),
+        float(inputs["cout_liquidite_10j_pct"]),
+        float(inputs["defaut_30j_pct"]),
+        metrics["contribution_margin_pct"],
+        liq_label=f"Coût liquidité ({inputs[TENURE_KEY]:g}j)",
+    )
+    return {"metrics": metrics, "waterfall_df": wf_df, "waterfall_spec": waterfall_chart(wf_df).to_dict()}
+
+
+def point_results(inputs: Mapping, mode: str = DEFAULT_MODE, cache: LRUCache = RESULTS) -> dict:
+    """{"metrics", "waterfall_df", "waterfall_spec"} pour un point, depuis le cache si possible."""
+    inputs = {TENURE_KEY: DUREE_PERIODE_LIQUIDITE_JOURS, **{k: float(v) for k, v in inputs.items() if k in (*INPUT_KEYS, TENURE_KEY)}}
+    return cache.get_or_compute(input_key(inputs, mode), lambda: _point_results(inputs))
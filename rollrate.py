@@ -0,0 +1,203 @@
+"""
+Modèle de défaut roll-rate / vintage (remplace un défaut 30j fixe).
+
+Chaque prêt passe, période après période (30 jours), entre les états
+current -> 30j -> 60j -> 90j+ -> write-off, avec guérison possible et
+remboursement (repaid). Les transitions forment une matrice stochastique P
+(une par vintage, empilées en (V, S, S)) ; la distribution après k périodes
+est e0 · P^k, calculée pour tous les vintages à la fois.
+
+Perte attendue (% du montant) = P(write-off à l'horizon) x (1 - recouvrement),
+à utiliser comme defaut_30j_pct dans le moteur et le waterfall.
+"""
+from typing import Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+STATES = ("current", "dpd30", "dpd60", "dpd90", "write_off", "repaid")
+STATE_LABELS = {
+    "current": "Courant",
+    "dpd30": "30j",
+    "dpd60": "60j",
+    "dpd90": "90j+",
+    "write_off": "Write-off",
+    "repaid": "Remboursé",
+}
+ABSORBING = ("write_off", "repaid")
+# Transitions "vers l'avant" (aggravation), amplifiées par le stress
+FORWARD_ROLLS = (("current", "dpd30"), ("dpd30", "dpd60"), ("dpd60", "dpd90"), ("dpd90", "write_off"))
+
+# Matrice par défaut (par période de 30j), calée sur ~1.6 % de perte à 6 périodes
+DEFAULT_ROLL_RATES = {
+    "current": {"current": 0.00, "dpd30": 0.07, "repaid": 0.93},
+    "dpd30": {"current": 0.35, "dpd60": 0.40, "repaid": 0.25},
+    "dpd60": {"current": 0.15, "dpd90": 0.70, "repaid": 0.15},
+    "dpd90": {"write_off": 0.80, "repaid": 0.20},
+}
+DEFAULT_HORIZON = 6
+
+_IDX = {s: i for i, s in enumerate(STATES)}
+
+
+# --------------------------------------------------
+# MATRICES
+# --------------------------------------------------
+def matrix_from_rates(rates: Mapping) -> np.ndarray:
+    """{état: {état suivant: proba}} -> matrice (S, S) ; états absorbants = identité, lignes renormalisées."""
+    P = np.zeros((len(STATES), len(STATES)))
+    for s, row in rates.items():
+        for t, p in row.items():
+            P[_IDX[s], _IDX[t]] = float(p)
+    for s in ABSORBING:
+        P[_IDX[s]] = 0.0
+        P[_IDX[s], _IDX[s]] = 1.0
+    return _normalize(P)
+
+
+def _normalize(P: np.ndarray) -> np.ndarray:
+    sums = P.sum(axis=-1, keepdims=True)
+    # ligne vide : le prêt reste dans son état
+    eye = np.broadcast_to(np.eye(P.shape[-1]), P.shape)
+    return np.where(sums > 0, P / np.where(sums > 0, sums, 1.0), eye)
+
+
+def matrix_to_frame(P: np.ndarray) -> pd.DataFrame:
+    labels = [STATE_LABELS[s] for s in STATES]
+    return pd.DataFrame(P, index=labels, columns=labels)
+
+
+def stress(P: np.ndarray, factor) -> np.ndarray:
+    """
+    Multiplie les roll-rates vers l'avant par `factor` (scalaire ou (V,) pour un stress par vintage)
+    et retire la différence des autres transitions de la ligne, au prorata. P : (..., S, S).
+    """
+    P = np.array(P, dtype=np.float64, copy=True)
+    factor = np.asarray(factor, dtype=np.float64)
+    for s, t in FORWARD_ROLLS:
+        i, j = _IDX[s], _IDX[t]
+        row = P[..., i, :]
+        fwd = np.clip(row[..., j] * factor, 0.0, 1.0)
+        others = row.sum(axis=-1) - row[..., j]
+        scale = np.where(others > 0, (1.0 - fwd) / np.where(others > 0, others, 1.0), 0.0)
+        row *= scale[..., np.newaxis]
+        row[..., j] = fwd
+    return P
+
+
+# --------------------------------------------------
+# PROJECTION
+# --------------------------------------------------
+def project(P: np.ndarray, horizon: int = DEFAULT_HORIZON, start: str = "current") -> np.ndarray:
+    """
+    Distribution par état après 0..horizon périodes pour chaque vintage.
+    P : (S, S) ou (V, S, S). Retourne (V, horizon + 1, S) — une multiplication vectorisée par période.
+    """
+    P = np.asarray(P, dtype=np.float64)
+    if P.ndim == 2:
+        P = P[np.newaxis]
+    dist = np.zeros((P.shape[0], horizon + 1, len(STATES)))
+    dist[:, 0, _IDX[start]] = 1.0
+    for k in range(1, horizon + 1):
+        dist[:, k] = np.einsum("vs,vst->vt", dist[:, k - 1], P)
+    return dist
+
+
+def loss_pct(P: np.ndarray, horizon: int = DEFAULT_HORIZON, recovery_pct: float = 0.0) -> np.ndarray:
+    """Perte attendue (% du montant) par vintage à l'horizon, via P^horizon (matrix_power sur la pile)."""
+    P = np.asarray(P, dtype=np.float64)
+    if P.ndim == 2:
+        P = P[np.newaxis]
+    p_wo = np.linalg.matrix_power(P, int(horizon))[:, _IDX["current"], _IDX["write_off"]]
+    return p_wo * (1 - recovery_pct / 100) * 100
+
+
+def loss_curves(P: np.ndarray, horizon: int = DEFAULT_HORIZON, recovery_pct: float = 0.0) -> np.ndarray:
+    """Perte cumulée (%) par vintage et par période : (V, horizon + 1)."""
+    return project(P, horizon)[:, :, _IDX["write_off"]] * (1 - recovery_pct / 100) * 100
+
+
+def portfolio_loss_pct(losses: np.ndarray, volumes: Optional[np.ndarray] = None) -> float:
+    """Perte moyenne pondérée par le volume des vintages (équipondérée sans volumes)."""
+    losses = np.asarray(losses, dtype=np.float64)
+    if volumes is None or np.sum(volumes) <= 0:
+        return float(losses.mean()) if losses.size else 0.0
+    return float(np.average(losses, weights=volumes))
+
+
+# --------------------------------------------------
+# ESTIMATION (CSV de statuts)
+# --------------------------------------------------
+STATUS_ALIASES = {
+    "current": "current", "courant": "current", "0": "current",
+    "30": "dpd30", "dpd30": "dpd30", "30j": "dpd30",
+    "60": "dpd60", "dpd60": "dpd60", "60j": "dpd60",
+    "90": "dpd90", "90+": "dpd90", "dpd90": "dpd90", "90j+": "dpd90",
+    "write_off": "write_off", "writeoff": "write_off", "wo": "write_off", "charged_off": "write_off",
+    "repaid": "repaid", "paid": "repaid", "closed": "repaid", "rembourse": "repaid", "remboursé": "repaid",
+}  # fmt: skip
+
+
+def estimate_roll_rates(
+    panel: pd.DataFrame,
+    loan_col: str = "loan_id",
+    period_col: str = "period",
+    status_col: str = "status",
+    amount_col: Optional[str] = "amount",
+    vintage_col: Optional[str] = None,
+    min_obs: int = 30,
+):
+    """
+    Panel de statuts (une ligne par prêt et par période) -> matrices par vintage.
+
+    Les transitions (statut t -> statut t+1 du même prêt) sont comptées, pondérées par
+    le montant si `amount_col` existe. Vintage = colonne `vintage_col` ou mois de la
+    première période du prêt. Un état peu observé dans un vintage (< min_obs transitions)
+    prend la ligne du pool. Retourne (vintages, P (V, S, S), volumes (V,), P_pool (S, S)).
+    """
+    missing = [c for c in (loan_col, period_col, status_col) if c not in panel]
+    if missing:
+        raise KeyError(f"Colonnes manquantes: {', '.join(missing)}")
+    df = panel.copy()
+    df["_state"] = df[status_col].astype(str).str.strip().str.lower().map(STATUS_ALIASES)
+    if df["_state"].isna().any():
+        unknown = sorted(df.loc[df["_state"].isna(), status_col].astype(str).unique())[:5]
+        raise ValueError(f"Statuts inconnus: {', '.join(unknown)}")
+    df["_period"] = pd.to_datetime(df[period_col])
+    df = df.sort_values([loan_col, "_period"], kind="stable")
+    df["_w"] = pd.to_numeric(df[amount_col], errors="coerce").fillna(0.0) if amount_col and amount_col in df else 1.0
+    if vintage_col and vintage_col in df:
+        df["_vintage"] = df[vintage_col].astype(str)
+    else:
+        df["_vintage"] = df.groupby(loan_col)["_period"].transform("min").dt.strftime("%Y-%m")
+
+    nxt = df.groupby(loan_col)["_state"].shift(-1)
+    trans = df.assign(_next=nxt).dropna(subset=["_next"])
+    vintages = sorted(df["_vintage"].unique())
+    v_idx = {v: i for i, v in enumerate(vintages)}
+    S = len(STATES)
+
+    counts = np.zeros((len(vintages), S, S))
+    np.add.at(
+        counts,
+        (trans["_vintage"].map(v_idx).to_numpy(), trans["_state"].map(_IDX).to_numpy(), trans["_next"].map(_IDX).to_numpy()),
+        trans["_w"].to_numpy(dtype=np.float64),
+    )
+    n_obs = np.zeros((len(vintages), S))
+    np.add.at(n_obs, (trans["_vintage"].map(v_idx).to_numpy(), trans["_state"].map(_IDX).to_numpy()), 1)
+
+    pooled = _normalize(counts.sum(axis=0))
+    P = np.where((n_obs >= min_obs)[..., np.newaxis], _normalize(counts), pooled)
+    for s in ABSORBING:
+        P[:, _IDX[s]] = 0.0
+        P[:, _IDX[s], _IDX[s]] = 1.0
+        pooled[_IDX[s]] = 0.0
+        pooled[_IDX[s], _IDX[s]] = 1.0
+
+    first = df.drop_duplicates(loan_col)
+    volumes = first.groupby("_vintage")["_w"].sum().reindex(vintages).to_numpy(dtype=np.float64)
+    return vintages, P, volumes, pooled
+
+
+def default_matrix() -> np.ndarray:
+    return matrix_from_rates(DEFAULT_ROLL_RATES)
@@ -0,0 +1,138 @@
+"""
+Portefeuille multi-segments (produits / segments marchands).
+
+Une table de segments en colonnes NumPy : un nom et une part du loan book par
+segment, plus les inputs du modèle. Une case vide (NaN) hérite de la valeur
+globale de la page (ex: cycles_per_month), ce qui permet de ne renseigner que
+ce qui diffère. Le loan book d'un segment = part x loan_book_k global. Un segment
+qui donne sa tenure sans coût de liquidité est chiffré sur la courbe de taux.
+
+evaluate() résout les N segments et appelle le moteur une seule fois sur des
+arrays (N,) ; les agrégats du portefeuille sont des sommes (volumes, revenus,
+contribution, prêts, clients) ou des moyennes pondérées par le volume (les %).
+"""
+from typing import Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from engine import DUREE_PERIODE_LIQUIDITE_JOURS, INPUT_KEYS, OUTPUT_KEYS, TENURE_KEY, compute_metrics
+from termstructure import TermStructure, price_liquidity
+
+NAME_COL = "segment"
+SHARE_COL = "part_loan_book_pct"
+# inputs renseignables par segment (loan_book_k vient de la part)
+SEGMENT_KEYS = tuple(k for k in INPUT_KEYS if k != "loan_book_k") + (TENURE_KEY,)
+PCT_KEYS = ("revenu_pct", "cout_paiement_pct", "cout_liquidite_10j_pct", "defaut_30j_pct")
+# outputs additifs entre segments
+SUM_KEYS = ("monthly_volume_eur", "monthly_revenue_eur", "annual_revenue_eur", "contribution_value_k", "nb_loans_per_month", "nb_clients_per_month")
+
+DEFAULT_SEGMENTS = [
+    {NAME_COL: "Grande distribution", SHARE_COL: 55.0},
+    {NAME_COL: "Pharmacies", SHARE_COL: 25.0, "revenu_pct": 4.2, "defaut_30j_pct": 0.7, "avg_loan_value_eur": 180.0},
+    {NAME_COL: "E-commerce", SHARE_COL: 20.0, "revenu_pct": 4.5, "cout_paiement_pct": 2.1, "defaut_30j_pct": 1.8, "cycles_per_month": 2.2},
+]
+
+
+class SegmentTable:
+    """Noms + colonnes float64 alignées (NaN = hérité du global)."""
+
+    def __init__(self, names: Sequence[str], columns: Mapping[str, Sequence[float]]):
+        self.names = np.asarray(names, dtype=object)
+        n = len(self.names)
+        self.columns = {}
+        for k in (SHARE_COL, *SEGMENT_KEYS):
+            col = np.asarray(columns[k], dtype=np.float64) if k in columns else np.full(n, np.nan)
+            if col.shape != (n,):
+                raise ValueError(f"Colonne {k}: {col.shape[0]} valeurs pour {n} segments")
+            self.columns[k] = col
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_records(cls, records: Sequence[Mapping]) -> "SegmentTable":
+        return cls.from_frame(pd.DataFrame.from_records(records))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "SegmentTable":
+        """DataFrame (data_editor, CSV) -> table ; lignes sans part ignorées, noms manquants numérotés."""
+        if SHARE_COL not in df:
+            raise KeyError(f"Colonne manquante: {SHARE_COL}")
+        df = df[pd.to_numeric(df[SHARE_COL], errors="coerce").notna()]
+        if NAME_COL in df:
+            names = [str(v) if pd.notna(v) and str(v) else f"Segment {i + 1}" for i, v in enumerate(df[NAME_COL])]
+        else:
+            names = [f"Segment {i + 1}" for i in range(len(df))]
+        columns = {k: pd.to_numeric(df[k], errors="coerce").to_numpy(dtype=np.float64) for k in (SHARE_COL, *SEGMENT_KEYS) if k in df}
+        return cls(names, columns)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({NAME_COL: self.names, **self.columns})
+
+    def shares(self) -> np.ndarray:
+        """Parts normalisées à 1 (une table qui ne somme pas à 100 % est mise à l'échelle)."""
+        s = np.clip(np.nan_to_num(self.columns[SHARE_COL]), 0.0, None)
+        total = s.sum()
+        return s / total if total > 0 else s
+
+    def resolve(self, global_inputs: Mapping, curve: Optional[TermStructure] = None) -> dict:
+        """
+        Inputs complets (N,) par segment : valeur du segment, sinon valeur globale.
+        Tenure du segment sans coût de liquidité : coût lu sur `curve` (DEFAULT_CURVE si None).
+        """
+        out = {"loan_book_k": self.shares() * float(global_inputs["loan_book_k"])}
+        cost = price_liquidity(self.columns["cout_liquidite_10j_pct"], self.columns[TENURE_KEY], curve)
+        for k in SEGMENT_KEYS:
+            default = global_inputs[k] if k in global_inputs else DUREE_PERIODE_LIQUIDITE_JOURS
+            col = cost if k == "cout_liquidite_10j_pct" else self.columns[k]
+            out[k] = np.where(np.isnan(col), float(default), col)
+        return out
+
+
+def aggregate(inputs: Mapping, metrics: Mapping) -> dict:
+    """
+    Agrégat portefeuille (axe segments = dernier axe) : sommes pour les grandeurs
+    additives, % pondérés par le volume mensuel, ratios recalculés.
+    """
+    vol = np.asarray(metrics["monthly_volume_eur"], dtype=np.float64)
+    total_vol = vol.sum(axis=-1)
+
+    def weighted(x):
+        x = np.asarray(x, dtype=np.float64)
+        return np.divide((x * vol).sum(axis=-1), total_vol, out=np.zeros_like(total_vol, dtype=np.float64), where=total_vol > 0)
+
+    def ratio(num, den):
+        return np.divide(num, den, out=np.zeros_like(np.asarray(num, dtype=np.float64)), where=np.asarray(den) > 0)
+
+    agg = {k: np.asarray(metrics[k], dtype=np.float64).sum(axis=-1) for k in SUM_KEYS}
+    agg.update({k: weighted(inputs[k]) for k in (*PCT_KEYS, TENURE_KEY)})
+    agg["loan_book_k"] = np.asarray(inputs["loan_book_k"], dtype=np.float64).sum(axis=-1)
+    agg["cout_total_pct"] = agg["cout_paiement_pct"] + agg["cout_liquidite_10j_pct"] + agg["defaut_30j_pct"]
+    agg["contribution_margin_pct"] = agg["revenu_pct"] - agg["cout_total_pct"]
+    agg["taux_liquidite_annuel_pct"] = weighted(metrics["taux_liquidite_annuel_pct"])
+    agg["cycles_per_month"] = ratio(total_vol, agg["loan_book_k"] * 1000)
+    agg["avg_loan_value_eur"] = ratio(total_vol, agg["nb_loans_per_month"])
+    agg["tx_per_client_per_month"] = ratio(agg["nb_loans_per_month"], agg["nb_clients_per_month"])
+    agg["revenue_per_loan_eur"] = ratio(agg["monthly_revenue_eur"], agg["nb_loans_per_month"])
+    agg["revenue_per_client_month_eur"] = ratio(agg["monthly_revenue_eur"], agg["nb_clients_per_month"])
+    agg["take_rate_effective_pct"] = ratio(agg["monthly_revenue_eur"], total_vol) * 100
+    return agg
+
+
+def evaluate(table: SegmentTable, global_inputs: Mapping, curve: Optional[TermStructure] = None) -> tuple:
+    """
+    Une passe vectorisée sur tous les segments.
+    Retourne (DataFrame segments : inputs résolus + outputs + part du volume, dict agrégat de floats).
+    """
+    inputs = table.resolve(global_inputs, curve)
+    metrics = compute_metrics(*(inputs[k] for k in INPUT_KEYS), duree_liquidite_jours=inputs[TENURE_KEY])
+    agg = aggregate(inputs, metrics)
+    total_vol = agg["monthly_volume_eur"]
+    seg_df = pd.DataFrame({NAME_COL: table.names, **inputs, **metrics})
+    seg_df["part_volume_pct"] = metrics["monthly_volume_eur"] / total_vol * 100 if total_vol > 0 else 0.0
+    return seg_df, {k: float(v) for k, v in agg.items() if k in (*OUTPUT_KEYS, *INPUT_KEYS, TENURE_KEY)}
+
+
+def default_segments() -> SegmentTable:
+    return SegmentTable.from_records(DEFAULT_SEGMENTS)
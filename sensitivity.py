@@ -0,0 +1,135 @@
+"""
+Sensibilité 2D : balayage de deux inputs sur une grille fine, en une passe NumPy.
+Tornado : chaque input perturbé de ±X% autour du point courant, en un seul batch
+(±X% de la plage du curseur pour un input à 0, sinon il n'aurait aucun impact).
+"""
+from typing import Mapping
+
+import numpy as np
+import pandas as pd
+
+from engine import INPUT_KEYS, compute_metrics
+
+# Axes balayables (mêmes bornes que les widgets de la page)
+SWEEP_AXES = {
+    "revenu_pct": ("Revenus / trx (%)", 1.0, 5.0),
+    "cout_paiement_pct": ("Coût paiement / trx (%)", 0.0, 2.0),
+    "cout_liquidite_10j_pct": ("Coût liquidité 10j (%)", 0.0, 1.5),
+    "defaut_30j_pct": ("Défaut 30j / trx (%)", 0.0, 5.0),
+    "loan_book_k": ("Loan book moyen (k€)", 50.0, 10000.0),
+    "cycles_per_month": ("Cycles de liquidité / mois", 1.0, 4.0),
+}
+
+# Plage des curseurs des 8 inputs : pas du tornado quand le point courant est à 0
+INPUT_RANGES = {
+    **{k: (lo, hi) for k, (_, lo, hi) in SWEEP_AXES.items()},
+    "avg_loan_value_eur": (150.0, 1000.0),
+    "tx_per_client_per_month": (1.0, 12.0),
+}
+
+# Outputs affichables + inputs dont ils dépendent réellement.
+# Sert de clé de cache : un slider hors de cette liste ne change pas la surface.
+SURFACE_METRICS = {
+    "contribution_margin_pct": (
+        "Contribution margin (%)",
+        ("revenu_pct", "cout_paiement_pct", "cout_liquidite_10j_pct", "defaut_30j_pct"),
+    ),
+    "contribution_value_k": (
+        "Contribution value (k€ / mois)",
+        ("revenu_pct", "cout_paiement_pct", "cout_liquidite_10j_pct", "defaut_30j_pct", "loan_book_k", "cycles_per_month"),
+    ),
+}
+
+# Outputs classés par le tornado
+TORNADO_METRICS = {
+    "contribution_value_k": "Contribution value (k€ / mois)",
+    "nb_clients_per_month": "Clients / mois",
+}
+
+
+def fixed_inputs_key(metric: str, x_key: str, y_key: str, state: Mapping) -> tuple:
+    """Inputs figés dont dépend la surface (hors axes balayés), en tuple hashable et trié."""
+    deps = SURFACE_METRICS[metric][1]
+    return tuple(sorted((k, float(state[k])) for k in deps if k not in (x_key, y_key)))
+
+
+def sweep_grid(metric: str, x_key: str, y_key: str, fixed: tuple, n: int = 500):
+    """
+    Évalue `metric` sur une grille n x n (x_key en colonnes, y_key en lignes).
+    `fixed` = sortie de fixed_inputs_key ; les inputs dont le metric ne dépend pas
+    sont remplis avec 1.0 (sans effet sur le résultat).
+    Retourne (xs, ys, z) avec z.shape == (n, n).
+    """
+    if x_key == y_key:
+        raise ValueError("Les deux axes doivent être différents.")
+
+    xs = np.linspace(SWEEP_AXES[x_key][1], SWEEP_AXES[x_key][2], n)
+    ys = np.linspace(SWEEP_AXES[y_key][1], SWEEP_AXES[y_key][2], n)
+
+    inputs = {k: 1.0 for k in INPUT_KEYS}
+    inputs.update(dict(fixed))
+    inputs[x_key] = xs[np.newaxis, :]
+    inputs[y_key] = ys[:, np.newaxis]
+
+    z = compute_metrics(*(inputs[k] for k in INPUT_KEYS))[metric]
+    return xs, ys, z
+
+
+def surface_to_df(xs: np.ndarray, ys: np.ndarray, z: np.ndarray, max_cells: int = 80) -> pd.DataFrame:
+    """
+    Grille -> DataFrame long (x, x2, y, y2, value) pour un heatmap Altair.
+    Sous-échantillonne à max_cells par axe pour garder un payload navigateur léger.
+    """
+    sx = max(1, int(np.ceil(len(xs) / max_cells)))
+    sy = max(1, int(np.ceil(len(ys) / max_cells)))
+    xs_d, ys_d, z_d = xs[::sx], ys[::sy], z[::sy, ::sx]
+
+    dx = (xs_d[1] - xs_d[0]) if len(xs_d) > 1 else 1.0
+    dy = (ys_d[1] - ys_d[0]) if len(ys_d) > 1 else 1.0
+    gx, gy = np.meshgrid(xs_d, ys_d)
+    return pd.DataFrame(
+        {
+            "x": (gx - dx / 2).ravel(),
+            "x2": (gx + dx / 2).ravel(),
+            "y": (gy - dy / 2).ravel(),
+            "y2": (gy + dy / 2).ravel(),
+            "value": z_d.ravel(),
+        }
+    )
+
+
+def tornado(base: Mapping, pct: float = 10.0, metrics: tuple = tuple(TORNADO_METRICS)) -> pd.DataFrame:
+    """
+    Perturbe chaque input de -pct% / +pct% (les autres au point `base`) : 1 + 2 x 8
+    scénarios évalués en une passe. Un input à 0 est perturbé de ±pct% de sa plage
+    (INPUT_RANGES) : sans ça, son swing serait nul et il finirait toujours dernier.
+    Une ligne par (metric, input) avec base, low, high et swing = |high - low|,
+    triée par swing décroissant dans chaque metric.
+    """
+    base_vec = np.array([float(base[k]) for k in INPUT_KEYS])
+    span = np.array([INPUT_RANGES[k][1] - INPUT_RANGES[k][0] for k in INPUT_KEYS])
+    step = np.where(base_vec != 0, np.abs(base_vec), span) * pct / 100
+    n_in = len(INPUT_KEYS)
+    values = np.tile(base_vec, (1 + 2 * n_in, 1))
+    idx = np.arange(n_in)
+    values[1 + idx, idx] -= step
+    values[1 + n_in + idx, idx] += step
+    out = compute_metrics(*values.T)
+
+    frames = []
+    for m in metrics:
+        y = out[m]
+        frames.append(
+            pd.DataFrame(
+                {
+                    "metric": m,
+                    "input": INPUT_KEYS,
+                    "base": y[0],
+                    "low": y[1 : 1 + n_in],
+                    "high": y[1 + n_in :],
+                }
+            )
+            .assign(swing=lambda d: (d["high"] - d["low"]).abs())
+            .sort_values("swing", ascending=False, kind="stable")
+        )
+    return pd.concat(frames, ignore_index=True)
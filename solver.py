@@ -0,0 +1,111 @@
+"""
+Goal seek : quelle valeur d'un input donne une cible sur un output ?
+
+Pour chaque (output, input libre), on teste si le modèle est affine en l'input
+(c'est le cas des % par trx, du loan book, des cycles...) : solution
+fermée. Sinon (ex: nb_clients_per_month en fonction de avg_loan_value_eur) :
+bisection vectorisée. Cibles et autres inputs peuvent être des arrays ->
+une seule évaluation pour toutes les cibles (courbes iso-marge).
+"""
+from typing import Mapping, Optional, Tuple
+
+import numpy as np
+
+from engine import INPUT_KEYS, compute_metrics
+from sensitivity import INPUT_RANGES, SWEEP_AXES
+
+# Bornes de recherche = bornes des widgets
+SOLVER_BOUNDS = INPUT_RANGES
+INPUT_LABELS = {
+    **{k: label for k, (label, _, _) in SWEEP_AXES.items()},
+    "avg_loan_value_eur": "Valeur moyenne par prêt (€)",
+    "tx_per_client_per_month": "Transactions / client / mois",
+}
+# Outputs proposés comme cible
+GOAL_METRICS = {
+    "contribution_margin_pct": "Contribution margin (%)",
+    "contribution_value_k": "Contribution value (k€ / mois)",
+    "monthly_revenue_eur": "Revenue / mois (€)",
+    "nb_loans_per_month": "Prêts / mois",
+    "nb_clients_per_month": "Clients / mois",
+}
+BISECTION_ITERS = 60
+
+
+def _evaluator(metric: str, free_key: str, base: Mapping):
+    others = {k: np.asarray(base[k], dtype=np.float64) for k in INPUT_KEYS if k != free_key}
+
+    def f(x):
+        inputs = dict(others)
+        inputs[free_key] = x
+        return compute_metrics(*(inputs[k] for k in INPUT_KEYS))[metric]
+
+    return f
+
+
+def solve_for(
+    metric: str,
+    free_key: str,
+    targets,
+    base: Mapping,
+    bounds: Optional[Tuple[float, float]] = None,
+) -> Tuple[np.ndarray, str]:
+    """
+    Résout metric(free_key = x) = targets, les autres inputs pris dans `base`
+    (scalaires ou arrays, broadcast avec targets).
+
+    Retourne (x, méthode) avec méthode "fermée" ou "bisection".
+    - fermée : solution exacte, éventuellement hors des bornes des widgets ;
+      NaN si l'output ne dépend pas de l'input (pente nulle).
+    - bisection : solution dans `bounds` ; NaN si la cible n'y est pas atteignable.
+    """
+    if free_key not in INPUT_KEYS:
+        raise KeyError(f"Input inconnu: {free_key}")
+    lo, hi = bounds or SOLVER_BOUNDS[free_key]
+    targets = np.asarray(targets, dtype=np.float64)
+    f = _evaluator(metric, free_key, base)
+
+    # test d'affinité sur 3 points (par élément)
+    x0, x1, x2 = lo, (lo + hi) / 2, hi
+    f0, f1, f2 = f(np.float64(x0)), f(np.float64(x1)), f(np.float64(x2))
+    slope_a = (f1 - f0) / (x1 - x0)
+    slope_b = (f2 - f1) / (x2 - x1)
+    scale = np.maximum(np.abs(slope_a), np.abs(slope_b))
+    if np.all(np.abs(slope_a - slope_b) <= 1e-9 * np.maximum(scale, 1.0)):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = np.where(slope_a != 0, x0 + (targets - f0) / slope_a, np.nan)
+        return np.broadcast_to(x, np.broadcast_shapes(targets.shape, np.shape(f0))).astype(np.float64), "fermée"
+
+    # bisection vectorisée (f monotone sur [lo, hi] pour les outputs du modèle)
+    shape = np.broadcast_shapes(targets.shape, np.shape(f0))
+    a = np.full(shape, lo, dtype=np.float64)
+    b = np.full(shape, hi, dtype=np.float64)
+    fa = np.broadcast_to(f(a) - targets, shape)
+    fb = np.broadcast_to(f(b) - targets, shape)
+    reachable = np.sign(fa) != np.sign(fb)
+    reachable |= (fa == 0) | (fb == 0)
+    fa = fa.copy()
+    for _ in range(BISECTION_ITERS):
+        m = (a + b) / 2
+        fm = np.broadcast_to(f(m) - targets, shape)
+        left = np.sign(fm) == np.sign(fa)
+        a = np.where(left, m, a)
+        fa = np.where(left, fm, fa)
+        b = np.where(left, b, m)
+    return np.where(reachable, (a + b) / 2, np.nan), "bisection"
+
+
+def iso_curves(metric: str, free_key: str, targets, x_key: str, base: Mapping, n: int = 200):
+    """
+    Courbes iso-output : pour chaque cible et chaque x de la grille de `x_key`,
+    valeur de `free_key` qui atteint la cible. Retourne (xs, ys) avec
+    ys.shape == (len(targets), n), en un seul appel à solve_for.
+    """
+    if x_key == free_key:
+        raise ValueError("L'axe X et l'input libre doivent être différents.")
+    lo, hi = SOLVER_BOUNDS[x_key]
+    xs = np.linspace(lo, hi, n)
+    grid_base = dict(base)
+    grid_base[x_key] = xs[np.newaxis, :]
+    ys, _ = solve_for(metric, free_key, np.asarray(targets, dtype=np.float64)[:, np.newaxis], grid_base)
+    return xs, ys
@@ -0,0 +1,229 @@
+"""
+Stockage persistant des scénarios sauvegardés (SQLite).
+
+Un scénario = date + label + les 8 inputs + tous les outputs du moteur.
+La base est partagée entre sessions et survit aux redémarrages ; (date, name)
+est unique et indexé, date est indexée seule pour la courbe d'historique.
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from typing import Iterable, Iterator, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from engine import DUREE_PERIODE_LIQUIDITE_JOURS, INPUT_KEYS, OUTPUT_KEYS, TENURE_KEY, compute_frame
+from termstructure import price_liquidity
+
+DEFAULT_DB_PATH = os.environ.get("WARIBEI_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios.db"))
+SCENARIO_INPUTS = INPUT_KEYS + (TENURE_KEY,)
+VALUE_COLUMNS = SCENARIO_INPUTS + OUTPUT_KEYS
+BULK_CHUNK_ROWS = 50_000
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS scenarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    name TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    {", ".join(f"{c} REAL" for c in VALUE_COLUMNS)},
+    UNIQUE (date, name)
+);
+CREATE INDEX IF NOT EXISTS idx_scenarios_date ON scenarios (date, updated_at);
+CREATE INDEX IF NOT EXISTS idx_scenarios_name ON scenarios (name);
+"""
+# colonnes ajoutées après coup : (nom, DDL) appliqués aux bases existantes
+_MIGRATIONS = ((TENURE_KEY, f"ALTER TABLE scenarios ADD COLUMN {TENURE_KEY} REAL DEFAULT {DUREE_PERIODE_LIQUIDITE_JOURS}"),)
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+@contextmanager
+def _connect(path: str):
+    """Connexion courte (une par appel) : sûr entre threads Streamlit et entre process."""
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        with _init_lock:
+            if path not in _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                existing = {row[1] for row in conn.execute("PRAGMA table_info(scenarios)")}
+                for column, ddl in _MIGRATIONS:
+                    if column not in existing:
+                        conn.execute(ddl)
+                _initialized.add(path)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _iso(d) -> str:
+    return d.isoformat() if isinstance(d, date) else str(d)
+
+
+_UPSERT = f"""
+INSERT INTO scenarios (date, name, updated_at, {", ".join(VALUE_COLUMNS)})
+VALUES (?, ?, ?, {", ".join("?" for _ in VALUE_COLUMNS)})
+ON CONFLICT (date, name) DO UPDATE SET
+    updated_at = excluded.updated_at,
+    {", ".join(f"{c} = excluded.{c}" for c in VALUE_COLUMNS)}
+"""
+
+_INSERT_IGNORE = _UPSERT.split("ON CONFLICT")[0].replace("INSERT INTO", "INSERT OR IGNORE INTO")
+
+
+def save_scenario(d, name: str, inputs: Mapping, metrics: Mapping, path: str = DEFAULT_DB_PATH) -> None:
+    """Crée ou remplace le scénario (date, name)."""
+    inputs = {TENURE_KEY: DUREE_PERIODE_LIQUIDITE_JOURS, **inputs}
+    row = (_iso(d), name, time.time(), *(float(inputs[c]) if c in inputs else float(metrics[c]) for c in VALUE_COLUMNS))
+    with _connect(path) as conn:
+        conn.execute(_UPSERT, row)
+
+
+def bulk_insert(df: pd.DataFrame, path: str = DEFAULT_DB_PATH, replace: bool = True) -> int:
+    """
+    Insertion en masse d'un DataFrame (colonnes date, name + les 8 inputs, tenure optionnelle).
+    Les outputs sont recalculés en une passe par le moteur. Retourne le nb de lignes.
+    """
+    if df.empty:
+        return 0
+    if TENURE_KEY in df:
+        # tenure sans coût de liquidité : coût lu sur la courbe par défaut, avant de compléter la tenure
+        tenure = pd.to_numeric(df[TENURE_KEY], errors="coerce")
+        cost = pd.to_numeric(df["cout_liquidite_10j_pct"], errors="coerce") if "cout_liquidite_10j_pct" in df else np.nan
+        df = df.assign(cout_liquidite_10j_pct=price_liquidity(cost, tenure), **{TENURE_KEY: tenure.fillna(DUREE_PERIODE_LIQUIDITE_JOURS)})
+    else:
+        df = df.assign(**{TENURE_KEY: DUREE_PERIODE_LIQUIDITE_JOURS})
+    full = compute_frame(df)
+    now = time.time()
+    rows = zip(
+        full["date"].map(_iso),
+        full["name"].astype(str),
+        [now] * len(full),
+        *(full[c].astype(float) for c in VALUE_COLUMNS),
+    )
+    with _connect(path) as conn:
+        conn.executemany(_UPSERT if replace else _INSERT_IGNORE, rows)
+    return len(full)
+
+
+def import_csv(source, path: str = DEFAULT_DB_PATH, chunk_rows: int = BULK_CHUNK_ROWS) -> int:
+    """Import CSV (fichier ou buffer) par chunks -> bulk_insert. Retourne le nb de lignes."""
+    total = 0
+    for chunk in pd.read_csv(source, chunksize=chunk_rows):
+        total += bulk_insert(chunk, path=path)
+    return total
+
+
+def seed_if_missing(rows: Iterable[Mapping], path: str = DEFAULT_DB_PATH) -> None:
+    """Insère des scénarios de référence sans écraser ce qui existe déjà."""
+    df = pd.DataFrame(list(rows))
+    if not df.empty:
+        bulk_insert(df, path=path, replace=False)
+
+
+def count_scenarios(date_from=None, date_to=None, name_like: Optional[str] = None, path: str = DEFAULT_DB_PATH) -> int:
+    where, params = _filters(date_from, date_to, name_like)
+    with _connect(path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM scenarios{where}", params).fetchone()[0]
+
+
+def _filters(date_from=None, date_to=None, name_like=None):
+    clauses, params = [], []
+    if date_from is not None:
+        clauses.append("date >= ?")
+        params.append(_iso(date_from))
+    if date_to is not None:
+        clauses.append("date <= ?")
+        params.append(_iso(date_to))
+    if name_like:
+        clauses.append("name LIKE ?")
+        params.append(f"%{name_like}%")
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def query_page(
+    page: int = 0,
+    page_size: int = 50,
+    date_from=None,
+    date_to=None,
+    name_like: Optional[str] = None,
+    path: str = DEFAULT_DB_PATH,
+) -> pd.DataFrame:
+    """Une page de scénarios (plus récents d'abord)."""
+    where, params = _filters(date_from, date_to, name_like)
+    sql = f"SELECT date, name, {', '.join(VALUE_COLUMNS)} FROM scenarios{where} ORDER BY date DESC, updated_at DESC LIMIT ? OFFSET ?"
+    with _connect(path) as conn:
+        df = pd.read_sql_query(sql, conn, params=[*params, int(page_size), int(page) * int(page_size)])
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    return df
+
+
+def list_scenarios(name_like: Optional[str] = None, limit: int = 1000, path: str = DEFAULT_DB_PATH) -> pd.DataFrame:
+    """id, date, name des scénarios (plus récents d'abord) : options d'une sélection."""
+    where, params = _filters(name_like=name_like)
+    sql = f"SELECT id, date, name FROM scenarios{where} ORDER BY date DESC, updated_at DESC LIMIT ?"
+    with _connect(path) as conn:
+        return pd.read_sql_query(sql, conn, params=[*params, int(limit)])
+
+
+def load_scenarios(ids: Iterable[int], path: str = DEFAULT_DB_PATH) -> pd.DataFrame:
+    """Scénarios par id (id, date, name + les 8 inputs + tenure), dans l'ordre de `ids`."""
+    ids = [int(i) for i in ids]
+    if not ids:
+        return pd.DataFrame(columns=["id", "date", "name", *SCENARIO_INPUTS])
+    sql = f"SELECT id, date, name, {', '.join(SCENARIO_INPUTS)} FROM scenarios WHERE id IN ({', '.join('?' for _ in ids)})"
+    with _connect(path) as conn:
+        df = pd.read_sql_query(sql, conn, params=ids)
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    return df.set_index("id").reindex(ids).dropna(subset=["name"]).reset_index()
+
+
+def iter_scenarios(ids: Optional[Iterable[int]] = None, chunk_rows: int = BULK_CHUNK_ROWS, path: str = DEFAULT_DB_PATH) -> Iterator[pd.DataFrame]:
+    """
+    Tous les scénarios (ou ceux de `ids`) par chunks de DataFrame, triés par date puis id :
+    pour les exports, sans charger la table entière.
+    """
+    if ids is not None:
+        ids = [int(i) for i in ids]
+        for i in range(0, len(ids), chunk_rows):
+            yield load_scenarios(ids[i : i + chunk_rows], path=path)
+        return
+    sql = f"SELECT id, date, name, {', '.join(SCENARIO_INPUTS)} FROM scenarios ORDER BY date, id"
+    with _connect(path) as conn:
+        for df in pd.read_sql_query(sql, conn, chunksize=chunk_rows):
+            df["date"] = pd.to_datetime(df["date"]).dt.date
+            yield df
+
+
+def history_version(path: str = DEFAULT_DB_PATH) -> tuple:
+    """(nb de lignes, dernier updated_at) : change à chaque SAVE / import (clé de cache)."""
+    with _connect(path) as conn:
+        return tuple(conn.execute("SELECT COUNT(*), MAX(updated_at) FROM scenarios").fetchone())
+
+
+def latest_per_date(dates: Optional[Iterable] = None, columns: Iterable[str] = ("contribution_margin_pct",), path: str = DEFAULT_DB_PATH) -> pd.DataFrame:
+    """Dernier scénario sauvegardé pour chaque date (courbe d'historique)."""
+    cols = ", ".join(columns)
+    params = []
+    where = ""
+    if dates is not None:
+        dates = [_iso(d) for d in dates]
+        where = f" WHERE date IN ({', '.join('?' for _ in dates)})"
+        params = dates
+    sql = f"""
+        SELECT date, name, {cols} FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY date ORDER BY updated_at DESC, id DESC) AS rn
+            FROM scenarios{where}
+        ) WHERE rn = 1 ORDER BY date
+    """
+    with _connect(path) as conn:
+        df = pd.read_sql_query(sql, conn, params=params)
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    return df
@@ -0,0 +1,103 @@
+"""
+Structure par terme du coût de liquidité : taux de financement annuel par tenure.
+
+La courbe (tenure en jours -> taux annuel %) vient d'une table (dict, DataFrame
+ou CSV `tenure_days, taux_annuel_pct`). À la construction, elle est interpolée
+une fois pour toutes sur une grille journalière (linéaire, plate hors bornes) ;
+ensuite tout est lookup + interpolation vectorisée, pour N scénarios et des
+mix de tenures.
+
+Coût de liquidité d'un prêt de tenure T (en % du montant) = taux(T) x T / 365,
+soit l'équivalent de cout_liquidite_10j_pct pour T = 10. Un scénario qui donne une
+tenure sans coût explicite est chiffré sur la courbe (price_liquidity : moteur,
+CLI, API, segments).
+"""
+from typing import Mapping, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# Courbe par défaut (calée sur 0.40 % à 10 jours, comme les presets)
+DEFAULT_CURVE = {1: 13.5, 7: 14.2, 10: 14.6, 15: 15.2, 30: 16.0, 60: 17.0, 90: 17.5}
+MAX_TENURE_DAYS = 365
+
+
+class TermStructure:
+    def __init__(self, curve: Union[Mapping, pd.DataFrame], max_days: int = MAX_TENURE_DAYS):
+        if isinstance(curve, pd.DataFrame):
+            curve = dict(zip(curve["tenure_days"], curve["taux_annuel_pct"]))
+        points = sorted((float(t), float(r)) for t, r in curve.items() if pd.notna(t) and pd.notna(r))
+        if not points or points[0][0] <= 0:
+            raise ValueError("La courbe doit contenir au moins une tenure > 0 jour.")
+        self.tenors = np.array([t for t, _ in points])
+        self.rates = np.array([r for _, r in points])
+        self.max_days = max(int(max_days), int(np.ceil(self.tenors[-1])))
+        # grille journalière 0..max_days précalculée
+        self.days = np.arange(self.max_days + 1, dtype=np.float64)
+        self.daily_rate = np.interp(self.days, self.tenors, self.rates)
+        self.daily_cost = self.daily_rate * self.days / 365
+
+    @classmethod
+    def from_csv(cls, source, **kwargs) -> "TermStructure":
+        df = pd.read_csv(source)
+        missing = {"tenure_days", "taux_annuel_pct"} - set(df.columns)
+        if missing:
+            raise KeyError(f"Colonnes manquantes: {', '.join(sorted(missing))}")
+        return cls(df, **kwargs)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({"tenure_days": self.tenors, "taux_annuel_pct": self.rates})
+
+    def rate(self, tenure_days) -> np.ndarray:
+        """Taux annuel (%) pour des tenures quelconques (arrays, jours fractionnaires acceptés)."""
+        t = np.clip(np.asarray(tenure_days, dtype=np.float64), 0, self.max_days)
+        return np.interp(t, self.days, self.daily_rate)
+
+    def cost_pct(self, tenure_days) -> np.ndarray:
+        """Coût de liquidité par prêt (% du montant) pour une tenure."""
+        t = np.clip(np.asarray(tenure_days, dtype=np.float64), 0, self.max_days)
+        return np.interp(t, self.days, self.daily_cost)
+
+    def mix_cost(self, tenors, weights) -> tuple:
+        """
+        Mix de tenures pondéré par les montants. tenors / weights : (..., k), une
+        ligne par scénario. Retourne (coût % par prêt, tenure moyenne en jours),
+        à passer comme cout_liquidite_10j_pct et duree_liquidite_jours au moteur.
+        """
+        tenors = np.asarray(tenors, dtype=np.float64)
+        w = np.asarray(weights, dtype=np.float64)
+        w = w / np.where(w.sum(axis=-1, keepdims=True) > 0, w.sum(axis=-1, keepdims=True), 1.0)
+        return (w * self.cost_pct(tenors)).sum(axis=-1), (w * tenors).sum(axis=-1)
+
+
+def default_term_structure() -> TermStructure:
+    return TermStructure(DEFAULT_CURVE)
+
+
+def check_tenure(tenure_days, allow_missing: bool = False) -> np.ndarray:
+    """
+    Tenures en float64 ; ValueError si une tenure n'est pas un nombre fini > 0.
+    allow_missing=True : NaN = tenure non renseignée, laissée telle quelle (price_liquidity).
+    """
+    t = np.asarray(tenure_days, dtype=np.float64)
+    invalid = ~(t > 0) | np.isinf(t)
+    if allow_missing:
+        invalid &= ~np.isnan(t)
+    if np.any(invalid):
+        raise ValueError("duree_liquidite_jours doit être un nombre fini > 0.")
+    return t
+
+
+def price_liquidity(cost_pct, tenure_days, curve: Optional[TermStructure] = None) -> np.ndarray:
+    """
+    cout_liquidite_10j_pct complété par la courbe : là où le coût manque (NaN) et
+    où une tenure est donnée, coût = curve.cost_pct(tenure). Le reste est inchangé
+    (un coût explicite prime, sans tenure le coût reste NaN). Courbe par défaut : DEFAULT_CURVE.
+    """
+    cost, tenure = np.broadcast_arrays(np.asarray(cost_pct, dtype=np.float64), check_tenure(tenure_days, allow_missing=True))
+    priced = np.isnan(cost) & ~np.isnan(tenure)
+    if not priced.any():
+        return cost
+    curve = default_term_structure() if curve is None else curve
+    return np.where(priced, curve.cost_pct(np.where(priced, tenure, 0.0)), cost)
+
@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+import pytest
+
+from api import ApiServer
+
+
+async def _exchange(server: ApiServer, raws: list) -> list:
+    """Envoie des requêtes HTTP brutes (une connexion chacune) à un serveur lancé sur un port libre."""
+    ready = asyncio.Event()
+    task = asyncio.create_task(server.serve("127.0.0.1", 0, ready))
+    await ready.wait()
+    results = []
+    try:
+        port = server.sockets[0].getsockname()[1]
+        for raw in raws:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(raw)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            head, _, body = response.partition(b"\r\n\r\n")
+            results.append((int(head.split()[1]), json.loads(body)))
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    return results
+
+
+def request(raw: bytes) -> tuple:
+    """-> (statut, corps JSON)."""
+    return asyncio.run(_exchange(ApiServer(), [raw]))[0]
+
+
+def post(body: bytes, extra_headers: str = "") -> bytes:
+    return (
+        f"POST /evaluate HTTP/1.1\r\nContent-Length: {len(body)}\r\n{extra_headers}Connection: close\r\n\r\n"
+    ).encode() + body
+
+
+def test_evaluate_records_and_columns():
+    status, obj = request(post(json.dumps({"scenarios": [{"name": "a"}, {"revenu_pct": 5.0}]}).encode()))
+    assert status == 200
+    assert [r.get("name") for r in obj["results"]] == ["a", None]
+    assert obj["results"][1]["contribution_margin_pct"] > obj["results"][0]["contribution_margin_pct"]
+
+    status, obj = request(post(json.dumps({"columns": {"revenu_pct": [3.0, 5.0]}}).encode()))
+    assert status == 200
+    assert len(obj["columns"]["contribution_margin_pct"]) == 2
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"{not json",
+        b"[1, 2]",
+        b'{"foo": 1}',
+        b'{"scenarios": [{"revenu_pct": "abc"}]}',
+        b'{"columns": {"revenu_pct": [1.0, 2.0], "defaut_30j_pct": [1.0]}}',
+        b'{"columns": {"revenu_pct": [[1.0, 2.0]]}}',
+        b'{"scenarios": [{"duree_liquidite_jours": 0}]}',
+    ],
+)
+def test_bad_bodies_are_400(body):
+    status, obj = request(post(body))
+    assert status == 400
+    assert "error" in obj
+
+
+@pytest.mark.parametrize(
+    "body, column",
+    [
+        (b'{"columns": {"revenu_pct": [3.0, null]}}', "revenu_pct"),
+        (b'{"columns": {"defaut_30j_pct": [NaN, 1.0]}}', "defaut_30j_pct"),
+        (b'{"columns": {"duree_liquidite_jours": [30.0, NaN]}}', "duree_liquidite_jours"),
+        (b'{"scenarios": [{"revenu_pct": null}]}', "revenu_pct"),
+        (b'{"scenarios": [{"duree_liquidite_jours": Infinity}]}', "duree_liquidite_jours"),
+    ],
+)
+def test_non_finite_inputs_are_400(body, column):
+    status, obj = request(post(body))
+    assert status == 400
+    assert column in obj["error"]
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_bad_content_length_is_400(length):
+    raw = f"POST /evaluate HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}".encode()
+    status, obj = request(raw)
+    assert status == 400
+    assert "Content-Length" in obj["error"]
+
+
+def test_oversized_body_is_413(monkeypatch):
+    monkeypatch.setattr("api.MAX_BODY_BYTES", 10)
+    status, _ = request(post(b'{"scenarios": []}'))
+    assert status == 413
+
+
+def test_routes_and_methods():
+    assert request(b"GET /health HTTP/1.1\r\nConnection: close\r\n\r\n") == (200, {"status": "ok"})
+    assert request(b"GET /nowhere HTTP/1.1\r\nConnection: close\r\n\r\n")[0] == 404
+    assert request(b"GET /evaluate HTTP/1.1\r\nConnection: close\r\n\r\n")[0] == 405
+    assert request(b"POST /health HTTP/1.1\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")[0] == 405
+
+
+def test_unknown_routes_share_one_latency_series():
+    server = ApiServer()
+    raws = [f"POST /x{i} HTTP/1.1\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode() for i in range(5)]
+    raws += [f"GET /y{i} HTTP/1.1\r\nConnection: close\r\n\r\n".encode() for i in range(5)]
+    raws += [b"BREW /health HTTP/1.1\r\nConnection: close\r\n\r\n", b"GET /health HTTP/1.1\r\nConnection: close\r\n\r\n"]
+    asyncio.run(_exchange(server, raws))
+    routes = server.metrics.snapshot(server.batcher)["routes"]
+    assert set(routes) == {"other", "GET /health"}
+    assert routes["other"]["count"] == 11
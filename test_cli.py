@@ -0,0 +1,52 @@
+import json
+
+import pandas as pd
+import pytest
+
+from cli import evaluate_chunk, main
+from presets import DEFAULT_INPUTS, SCENARIOS_PRESETS
+
+
+def run(tmp_path, text: str, name: str = "in.csv") -> pd.DataFrame:
+    src, out = tmp_path / name, tmp_path / "out.csv"
+    src.write_text(text, encoding="utf-8")
+    assert main([str(src), "-o", str(out), "-w", "1", "--chunk-rows", "2"]) == 0
+    return pd.read_csv(out)
+
+
+def test_absent_columns_take_the_defaults(tmp_path):
+    out = run(tmp_path, "name,revenu_pct\na,5.0\nb,4.0\nc,3.0\n")
+    assert out["revenu_pct"].tolist() == [5.0, 4.0, 3.0]
+    assert (out["defaut_30j_pct"] == DEFAULT_INPUTS["defaut_30j_pct"]).all()
+    assert out.loc[0, "contribution_margin_pct"] == pytest.approx(
+        5.0 - DEFAULT_INPUTS["cout_paiement_pct"] - DEFAULT_INPUTS["cout_liquidite_10j_pct"] - DEFAULT_INPUTS["defaut_30j_pct"]
+    )
+
+
+@pytest.mark.parametrize(
+    "cell, message",
+    [("abc", r"non numérique ligne\(s\) 3"), ("", r"manquante ligne\(s\) 3"), ("inf", r"non numérique ligne\(s\) 3")],
+)
+def test_bad_cells_fail_with_their_row_number(tmp_path, cell, message):
+    # ligne 3 = premier scénario du 2e chunk : les numéros restent ceux du fichier
+    with pytest.raises(ValueError, match=f"revenu_pct : valeur {message}"):
+        run(tmp_path, f"name,revenu_pct\na,5.0\nb,4.0\nc,{cell}\n")
+
+
+def test_bad_cells_in_json_records(tmp_path):
+    records = [{"name": "a", "revenu_pct": 4.0}, {"name": "b", "revenu_pct": "x"}, {"name": "c", "revenu_pct": None}]
+    with pytest.raises(ValueError, match=r"revenu_pct : valeur non numérique ligne\(s\) 2"):
+        run(tmp_path, json.dumps(records), name="in.json")
+
+
+def test_blank_tenure_and_priced_liquidity_cost_are_allowed():
+    chunk = pd.DataFrame({"revenu_pct": [4.0, 4.0], "cout_liquidite_10j_pct": [None, 0.5], "duree_liquidite_jours": [30.0, None]})
+    out = evaluate_chunk(chunk)
+    assert out.loc[1, "duree_liquidite_jours"] == DEFAULT_INPUTS["duree_liquidite_jours"]
+    assert out.loc[0, "cout_liquidite_10j_pct"] > 0
+
+
+def test_builtin_presets(tmp_path):
+    out = tmp_path / "presets.csv"
+    assert main(["--builtin-presets", "-o", str(out), "-w", "1"]) == 0
+    assert len(pd.read_csv(out)) == sum(1 for p in SCENARIOS_PRESETS.values() if p)
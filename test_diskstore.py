@@ -0,0 +1,83 @@
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from diskstore import META_FILE, ResultStore, store_key
+
+
+def test_put_then_reopen_from_a_new_store(tmp_path):
+    store = ResultStore(str(tmp_path))
+    z = np.arange(12.0).reshape(3, 4)
+    written = store.put("grid", {"n": 3}, {"z": z, "xs": np.arange(4.0), "label": ["a", "b", "c", "d"]})
+    assert written.key == store_key("grid", {"n": 3})
+    assert "label" not in written.columns  # colonnes texte ignorées
+
+    reopened = ResultStore(str(tmp_path)).get("grid", {"n": 3})
+    assert isinstance(reopened["z"], np.memmap)
+    np.testing.assert_array_equal(reopened["z"], z)
+    assert reopened.n_rows == 4
+    assert ResultStore(str(tmp_path)).get("grid", {"n": 4}) is None
+
+
+def test_write_chunks_matches_concatenation(tmp_path):
+    store = ResultStore(str(tmp_path))
+    chunks = [pd.DataFrame({"a": np.arange(i, i + 5, dtype=float), "b": np.arange(5)}) for i in range(0, 20, 5)]
+    stored = store.write_chunks("batch", {"p": 1}, iter(chunks))
+    expected = pd.concat(chunks, ignore_index=True)
+    assert stored.n_rows == 20
+    pd.testing.assert_frame_equal(stored.slice(3, 17), expected.iloc[3:17].reset_index(drop=True))
+
+
+def test_failed_write_leaves_nothing_visible(tmp_path):
+    store = ResultStore(str(tmp_path))
+
+    def chunks():
+        yield {"a": np.arange(3.0)}
+        raise RuntimeError("boom")
+
+    try:
+        store.write_chunks("batch", {"p": 2}, chunks())
+    except RuntimeError:
+        pass
+    assert store.get("batch", {"p": 2}) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_prune_keeps_most_recently_opened(tmp_path):
+    store = ResultStore(str(tmp_path), max_bytes=10**9)
+    keys = []
+    for i in range(3):
+        keys.append(store.put("r", {"i": i}, {"v": np.zeros(1000)}).key)  # 8 ko chacun
+        os.utime(os.path.join(tmp_path, keys[-1]), (time.time() - 100 + i, time.time() - 100 + i))
+    store.open_key(keys[0])  # le plus ancien redevient le plus récent
+
+    removed = store.prune(max_bytes=20_000)
+    assert removed == 1
+    assert store.open_key(keys[1], touch=False) is None
+    assert store.open_key(keys[0], touch=False) is not None
+    assert store.open_key(keys[2], touch=False) is not None
+
+
+def test_prune_after_write_bounds_the_store(tmp_path):
+    store = ResultStore(str(tmp_path), max_bytes=20_000)
+    for i in range(5):
+        store.put("r", {"i": i}, {"v": np.zeros(1000)})
+    assert len(store.entries()) == 2
+
+
+def test_entry_deleted_elsewhere_is_not_served_from_cache(tmp_path):
+    store = ResultStore(str(tmp_path))
+    key = store.put("r", {"i": 0}, {"v": np.ones(10)}).key
+    assert store.open_key(key, touch=False) is not None
+
+    shutil.rmtree(os.path.join(tmp_path, key))  # autre process / autre session
+    assert store.open_key(key, touch=False) is None
+    assert store.open_key(key) is None
+    assert key not in store._open
+    assert store.entries().empty
+
+    assert store.put("r", {"i": 0}, {"v": np.full(10, 2.0)})["v"][0] == 2.0
+    assert os.path.exists(os.path.join(tmp_path, key, META_FILE))
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import INPUT_KEYS, OUTPUT_KEYS, TENURE_KEY, compute_frame, compute_metrics, compute_point
+from presets import DEFAULT_INPUTS, SCENARIOS_PRESETS
+from termstructure import default_term_structure
+
+
+def baseline_metrics(
+    revenu_pct,
+    cout_paiement_pct,
+    cout_liquidite_10j_pct,
+    defaut_30j_pct,
+    loan_book_k,
+    cycles_per_month,
+    avg_loan_value_eur,
+    tx_per_client_per_month,
+):
+    """Formules scalaires de la page avant l'extraction du moteur (référence)."""
+    taux_liquidite_annuel_pct = cout_liquidite_10j_pct * 365 / 10
+    cout_total_pct = cout_paiement_pct + cout_liquidite_10j_pct + defaut_30j_pct
+    contribution_margin_pct = revenu_pct - cout_total_pct
+    monthly_volume_eur = loan_book_k * 1000 * cycles_per_month
+    monthly_revenue_eur = monthly_volume_eur * (revenu_pct / 100)
+    annual_revenue_eur = monthly_revenue_eur * 12
+    contribution_value_k = loan_book_k * cycles_per_month * contribution_margin_pct / 100
+    nb_loans_per_month = monthly_volume_eur / avg_loan_value_eur if avg_loan_value_eur > 0 else 0.0
+    nb_clients_per_month = nb_loans_per_month / tx_per_client_per_month if tx_per_client_per_month > 0 else 0.0
+    revenue_per_loan_eur = avg_loan_value_eur * (revenu_pct / 100)
+    revenue_per_client_month_eur = revenue_per_loan_eur * tx_per_client_per_month
+    take_rate_effective_pct = (monthly_revenue_eur / monthly_volume_eur * 100) if monthly_volume_eur > 0 else 0.0
+    return {
+        "taux_liquidite_annuel_pct": taux_liquidite_annuel_pct,
+        "cout_total_pct": cout_total_pct,
+        "contribution_margin_pct": contribution_margin_pct,
+        "monthly_volume_eur": monthly_volume_eur,
+        "monthly_revenue_eur": monthly_revenue_eur,
+        "annual_revenue_eur": annual_revenue_eur,
+        "contribution_value_k": contribution_value_k,
+        "nb_loans_per_month": nb_loans_per_month,
+        "nb_clients_per_month": nb_clients_per_month,
+        "revenue_per_loan_eur": revenue_per_loan_eur,
+        "revenue_per_client_month_eur": revenue_per_client_month_eur,
+        "take_rate_effective_pct": take_rate_effective_pct,
+    }
+
+
+def random_inputs(n: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    cols = {
+        "revenu_pct": rng.uniform(0, 10, n),
+        "cout_paiement_pct": rng.uniform(0, 5, n),
+        "cout_liquidite_10j_pct": rng.uniform(0, 2, n),
+        "defaut_30j_pct": rng.uniform(0, 5, n),
+        "loan_book_k": rng.uniform(0, 10_000, n),
+        "cycles_per_month": rng.uniform(0, 4, n),
+        "avg_loan_value_eur": rng.uniform(0, 1000, n),
+        "tx_per_client_per_month": rng.uniform(0, 12, n),
+    }
+    # divisions par zéro de la page : mises à 0, pas NaN / inf
+    for k in ("loan_book_k", "avg_loan_value_eur", "tx_per_client_per_month"):
+        cols[k][rng.random(n) < 0.1] = 0.0
+    return cols
+
+
+def test_vectorized_matches_baseline_formulas():
+    cols = random_inputs(500)
+    out = compute_metrics(*(cols[k] for k in INPUT_KEYS))
+    assert set(out) == set(OUTPUT_KEYS)
+    for i in range(500):
+        expected = baseline_metrics(*(float(cols[k][i]) for k in INPUT_KEYS))
+        for k in OUTPUT_KEYS:
+            assert out[k][i] == pytest.approx(expected[k], rel=1e-12, abs=1e-12), (k, i)
+
+
+@pytest.mark.parametrize("name", [n for n, p in SCENARIOS_PRESETS.items() if p])
+def test_point_matches_baseline_for_presets(name):
+    inputs = {**DEFAULT_INPUTS, **{k: v for k, v in SCENARIOS_PRESETS[name].items() if k in INPUT_KEYS}}
+    point = compute_point({k: inputs[k] for k in INPUT_KEYS})
+    expected = baseline_metrics(*(float(inputs[k]) for k in INPUT_KEYS))
+    assert point == pytest.approx(expected)
+
+
+def test_broadcast_shapes_and_scalar_inputs():
+    out = compute_metrics(3.8, 1.8, 0.55, 1.7, np.array([100.0, 200.0, 300.0]), 2.9, 300.0, 2.9)
+    assert all(v.shape == (3,) and v.dtype == np.float64 for v in out.values())
+    assert np.all(out["contribution_margin_pct"] == out["contribution_margin_pct"][0])
+
+
+def test_tenure_annualizes_the_liquidity_cost():
+    args = [DEFAULT_INPUTS[k] for k in INPUT_KEYS]
+    default = compute_metrics(*args)
+    assert compute_metrics(*args, duree_liquidite_jours=10)["taux_liquidite_annuel_pct"] == default["taux_liquidite_annuel_pct"]
+    assert compute_metrics(*args, duree_liquidite_jours=20)["taux_liquidite_annuel_pct"] == pytest.approx(default["taux_liquidite_annuel_pct"] / 2)
+    for bad in (0, -5, np.nan, np.inf):
+        with pytest.raises(ValueError):
+            compute_metrics(*args, duree_liquidite_jours=bad)
+
+
+def test_frame_prices_a_tenure_without_cost_on_the_curve():
+    df = pd.DataFrame([{k: DEFAULT_INPUTS[k] for k in INPUT_KEYS}] * 2)
+    df[TENURE_KEY] = [30.0, 30.0]
+    df.loc[1, "cout_liquidite_10j_pct"] = np.nan
+    out = compute_frame(df)
+    assert out.loc[0, "cout_liquidite_10j_pct"] == DEFAULT_INPUTS["cout_liquidite_10j_pct"]
+    assert out.loc[1, "cout_liquidite_10j_pct"] == pytest.approx(float(default_term_structure().cost_pct(30.0)))
+    assert out.loc[1, "taux_liquidite_annuel_pct"] == pytest.approx(16.0)
@@ -0,0 +1,50 @@
+import time
+
+import numpy as np
+import pytest
+
+import jobs
+from diskstore import ResultStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path))
+    monkeypatch.setattr(jobs, "STORE", store)
+    return store
+
+
+def wait(queue: jobs.JobQueue, job: jobs.Job, timeout: float = 5.0) -> jobs.Job:
+    deadline = time.monotonic() + timeout
+    while queue.get(job.id).active:
+        assert time.monotonic() < deadline, "job toujours actif"
+        time.sleep(0.01)
+    return job
+
+
+def grid_task(ctx: jobs.JobContext, n: int):
+    stored = jobs.STORE.put("grid", {"n": n}, {"z": np.arange(float(n))})
+    return {"key": stored.key}
+
+
+def test_resubmit_reuses_the_result_until_it_is_pruned(store, monkeypatch):
+    queue = jobs.JobQueue({"grid": grid_task}, max_workers=1)
+    first = wait(queue, queue.submit("grid", {"n": 3}, owner="a"))
+    assert first.status == jobs.DONE
+
+    open_key = store.open_key
+
+    def unlocked_open_key(key, touch=True):
+        assert not queue._lock.locked(), "accès disque sous le verrou de la file"
+        return open_key(key, touch=touch)
+
+    monkeypatch.setattr(store, "open_key", unlocked_open_key)
+
+    assert queue.submit("grid", {"n": 3}, owner="b") is first
+    assert queue.deduplicated == 1
+
+    store.delete(first.result["key"])
+    again = wait(queue, queue.submit("grid", {"n": 3}, owner="b"))
+    assert again is not first and again.status == jobs.DONE
+    assert "b" not in first.owners
+    assert queue.submitted == 2
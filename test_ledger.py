@@ -0,0 +1,144 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+import ledger
+from ledger import daily_aggregates, ingest_ledger, read_state, state_path_for
+
+HEADER = "date,amount_eur,revenue_eur,payment_cost_eur,liquidity_cost_eur,default_30j_eur,tenure_days\n"
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ledger, "DEFAULT_STATE_DIR", str(tmp_path / "state"))
+
+
+def rows(n: int, day: str = "2025-01-15", amount: float = 100.0) -> str:
+    return "".join(f"{day},{amount},3.0,0.5,0.2,1.0,10\n" for _ in range(n))
+
+
+def write(path, text: str, mode: str = "w") -> None:
+    with open(path, mode, encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_monthly_aggregates_and_presets(tmp_path):
+    path = tmp_path / "ledger.csv"
+    write(path, HEADER + rows(3) + rows(2, day="2025-02-01", amount=50.0))
+    monthly = ingest_ledger(str(path), chunk_rows=2)
+    assert monthly.loc["2025-01", "amount"] == 300.0
+    assert monthly.loc["2025-02", "n_loans"] == 2
+    presets = ledger.aggregates_to_presets(monthly)
+    jan = presets[pd.Timestamp("2025-01-01").date()]
+    assert jan["revenu_pct"] == pytest.approx(3.0)
+    assert jan["defaut_30j_pct"] == pytest.approx(1.0)
+
+
+def test_append_only_resume_reads_only_the_new_rows(tmp_path):
+    path = tmp_path / "ledger.csv"
+    write(path, HEADER + rows(1000))
+    ingest_ledger(str(path))
+    write(path, rows(10, day="2025-02-01") + "2025-02-02,1", mode="a")  # dernière ligne en cours d'écriture
+
+    monthly = ingest_ledger(str(path))
+    state = read_state(str(path))
+    assert state["full_rescan"] is False
+    assert monthly.loc["2025-01", "n_loans"] == 1000
+    assert monthly.loc["2025-02", "n_loans"] == 10
+
+    write(path, "0,0,0,0,0,10\n", mode="a")  # la ligne se termine
+    monthly = ingest_ledger(str(path))
+    assert read_state(str(path))["full_rescan"] is False
+    assert monthly.loc["2025-02", "n_loans"] == 11
+
+
+def test_edit_past_the_head_forces_a_rescan(tmp_path):
+    path = tmp_path / "ledger.csv"
+    text = HEADER + rows(5000)  # > HEAD_HASH_BYTES
+    assert len(text) > ledger.HEAD_HASH_BYTES
+    write(path, text)
+    ingest_ledger(str(path))
+
+    # correction d'une ligne loin après les 64 premiers Ko, même longueur, puis ajout
+    edited = text[: -len(rows(1))] + rows(1, amount=900.0) + rows(1)
+    write(path, edited)
+    monthly = ingest_ledger(str(path))
+    assert read_state(str(path))["full_rescan"] is True
+    assert monthly.loc["2025-01", "amount"] == 100.0 * 4999 + 900.0 + 100.0
+    assert monthly.loc["2025-01", "n_loans"] == 5001
+
+
+def test_state_lives_in_the_state_dir_not_beside_the_ledger(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    path = data / "ledger.csv"
+    write(path, HEADER + rows(3))
+    os.chmod(data, 0o555)  # dossier de données en lecture seule
+    try:
+        ingest_ledger(str(path))
+    finally:
+        os.chmod(data, 0o755)
+    assert os.listdir(data) == ["ledger.csv"]
+    assert os.path.exists(state_path_for(str(path)))
+    assert state_path_for(str(path)) != state_path_for(str(tmp_path / "other" / "ledger.csv"))
+    assert len(daily_aggregates(read_state(str(path)))) == 1
+
+
+def test_explicit_state_path_is_used(tmp_path):
+    path = tmp_path / "ledger.csv"
+    write(path, HEADER + rows(3))
+    state_path = tmp_path / "custom.json"
+    ingest_ledger(str(path), state_path=str(state_path))
+    assert read_state(str(path), str(state_path))["offset"] == os.path.getsize(path)
+    assert read_state(str(path)) == {}
+
+
+def write_parquet(path, frames) -> None:
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    with pq.ParquetWriter(path, pa.Table.from_pandas(frames[0], preserve_index=False).schema) as writer:
+        for frame in frames:
+            writer.write_table(pa.Table.from_pandas(frame, preserve_index=False))
+
+
+def parquet_rows(n: int, day: str = "2025-01-15", amount: float = 100.0) -> pd.DataFrame:
+    return pd.read_csv(io.StringIO(HEADER + rows(n, day=day, amount=amount)))
+
+
+def test_parquet_append_resumes_and_same_layout_rewrite_rescans(tmp_path):
+    path = tmp_path / "ledger.parquet"
+    groups = [parquet_rows(100), parquet_rows(100)]
+    write_parquet(path, groups)
+    ingest_ledger(str(path))
+
+    write_parquet(path, groups + [parquet_rows(10, day="2025-02-01")])
+    monthly = ingest_ledger(str(path))
+    assert read_state(str(path))["full_rescan"] is False
+    assert monthly.loc["2025-02", "n_loans"] == 10
+
+    # correction d'un montant dans le premier row group : même nombre de groupes et de lignes
+    corrected = groups[0].copy()
+    corrected.loc[5, "amount_eur"] = 900.0
+    write_parquet(path, [corrected, groups[1], parquet_rows(10, day="2025-02-01")])
+    monthly = ingest_ledger(str(path))
+    assert read_state(str(path))["full_rescan"] is True
+    assert monthly.loc["2025-01", "amount"] == 100.0 * 199 + 900.0
+    assert monthly.loc["2025-01", "n_loans"] == 200
+
+
+def test_rows_without_tenure_do_not_dilute_the_average_tenure(tmp_path):
+    path = tmp_path / "ledger.csv"
+    with_tenure = "".join("2025-01-15,100.0,3.0,0.5,0.2,1.0,20\n" for _ in range(5))
+    without = "".join("2025-01-16,100.0,3.0,0.5,0.2,1.0,\n" for _ in range(5))
+    write(path, HEADER + with_tenure + without)
+    monthly = ingest_ledger(str(path))
+    jan = ledger.aggregates_to_presets(monthly)[pd.Timestamp("2025-01-01").date()]
+    # coût 0,2 % à 20 jours de tenure moyenne -> 0,1 % ramené à 10 jours (et non 0,2 % à 10 jours)
+    assert jan["cout_liquidite_10j_pct"] == pytest.approx(0.1)
+
+    from backtest import rates_from_sums
+
+    sums = monthly[list(ledger.AGG_FIELDS)].to_numpy().sum(axis=0)
+    assert rates_from_sums(sums)["cout_liquidite_10j_pct"] == pytest.approx(0.1)
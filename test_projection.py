@@ -0,0 +1,81 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from engine import INPUT_KEYS, OUTPUT_KEYS, compute_metrics
+from presets import DEFAULT_INPUTS
+from projection import CUMULATIVE_KEYS, Projection, ramp_overrides
+
+BASE = {k: DEFAULT_INPUTS[k] for k in INPUT_KEYS}
+
+
+def full_recompute(base: dict, overrides: np.ndarray, growth: np.ndarray) -> tuple:
+    """Résolution naïve mois par mois de toute la projection (référence)."""
+    horizon = len(overrides)
+    inputs = np.empty((horizon, len(INPUT_KEYS)))
+    prev = np.array([float(base[k]) for k in INPUT_KEYS])
+    for m in range(horizon):
+        row = prev * (1 + growth[m] / 100) if m > 0 else prev
+        row = np.where(np.isnan(overrides[m]), row, overrides[m])
+        inputs[m] = prev = row
+    metrics = compute_metrics(*inputs.T)
+    cumulative = {k: np.cumsum(metrics[src]) for k, src in CUMULATIVE_KEYS.items()}
+    return inputs, metrics, cumulative
+
+
+def assert_matches_full(proj: Projection) -> None:
+    inputs, metrics, cumulative = full_recompute(dict(zip(INPUT_KEYS, proj.base)), proj.overrides, proj.growth)
+    np.testing.assert_allclose(proj.inputs, inputs, rtol=1e-12)
+    for k in OUTPUT_KEYS:
+        np.testing.assert_allclose(proj.metrics[k], metrics[k], rtol=1e-12, atol=1e-9)
+    for k in CUMULATIVE_KEYS:
+        np.testing.assert_allclose(proj.cumulative[k], cumulative[k], rtol=1e-9, atol=1e-9)
+
+
+def test_initial_projection_matches_full_recompute():
+    proj = Projection(BASE, 24, start=date(2026, 1, 1))
+    assert_matches_full(proj)
+    frame = proj.to_frame()
+    assert len(frame) == 24 and frame.index[0] == np.datetime64("2026-01-01")
+
+
+def test_random_edits_match_full_recompute():
+    rng = np.random.default_rng(0)
+    horizon = 36
+    proj = Projection(BASE, horizon)
+    for _ in range(300):
+        overrides, growth, base = proj.overrides.copy(), proj.growth.copy(), None
+        kind = rng.integers(3)
+        m, j = rng.integers(horizon), rng.integers(len(INPUT_KEYS))
+        if kind == 0:
+            overrides[m, j] = np.nan if rng.random() < 0.3 else proj.inputs[m, j] * rng.uniform(0.5, 1.5)
+        elif kind == 1:
+            growth[m, j] = rng.choice([0.0, rng.uniform(-5, 5)])
+        else:
+            base = dict(zip(INPUT_KEYS, proj.base))
+            base[INPUT_KEYS[j]] *= rng.uniform(0.8, 1.2)
+        proj.update(base=base, overrides=overrides, growth=growth)
+        assert_matches_full(proj)
+
+
+def test_late_edit_only_recomputes_the_tail():
+    proj = Projection(BASE, 60)
+    growth = proj.growth.copy()
+    growth[50, INPUT_KEYS.index("loan_book_k")] = 2.0
+    assert proj.update(growth=growth) == 10
+    assert proj.update(growth=growth) == 0
+
+    overrides = proj.overrides.copy()
+    overrides[20, INPUT_KEYS.index("revenu_pct")] = 5.0
+    overrides[21, INPUT_KEYS.index("revenu_pct")] = BASE["revenu_pct"]
+    assert proj.update(overrides=overrides) == 2  # mois 20 et 21 ; la propagation s'arrête au mois 22
+    assert_matches_full(proj)
+
+
+def test_ramp_overrides():
+    out = ramp_overrides(12, "cout_paiement_pct", 3, 6, 1.8, 1.0)
+    j = INPUT_KEYS.index("cout_paiement_pct")
+    assert np.isnan(out[:3, j]).all() and np.isnan(out[7:, j]).all()
+    assert out[6, j] == pytest.approx(1.0)
+    assert np.all(np.diff(out[3:7, j]) < 0)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from engine import INPUT_KEYS, compute_metrics
+from presets import DEFAULT_INPUTS
+from solver import SOLVER_BOUNDS, iso_curves, solve_for
+
+BASE = {k: DEFAULT_INPUTS[k] for k in INPUT_KEYS}
+
+
+def metric_at(metric: str, free_key: str, x, base=BASE) -> np.ndarray:
+    inputs = {**base, free_key: x}
+    return compute_metrics(*(inputs[k] for k in INPUT_KEYS))[metric]
+
+
+@pytest.mark.parametrize(
+    "metric, free_key",
+    [
+        ("contribution_margin_pct", "revenu_pct"),
+        ("contribution_margin_pct", "defaut_30j_pct"),
+        ("contribution_value_k", "loan_book_k"),
+        ("monthly_revenue_eur", "cycles_per_month"),
+    ],
+)
+def test_affine_round_trip_is_closed_form(metric, free_key):
+    lo, hi = SOLVER_BOUNDS[free_key]
+    xs = np.linspace(lo, hi, 7)
+    targets = metric_at(metric, free_key, xs)
+    solved, method = solve_for(metric, free_key, targets, BASE)
+    assert method == "fermée"
+    np.testing.assert_allclose(solved, xs, rtol=1e-9, atol=1e-9)
+
+
+def test_break_even_default_rate():
+    x, _ = solve_for("contribution_margin_pct", "defaut_30j_pct", 0.0, BASE)
+    assert metric_at("contribution_margin_pct", "defaut_30j_pct", x) == pytest.approx(0.0, abs=1e-12)
+
+
+def test_nonlinear_round_trip_uses_bisection():
+    lo, hi = SOLVER_BOUNDS["avg_loan_value_eur"]
+    xs = np.linspace(lo, hi, 9)
+    targets = metric_at("nb_clients_per_month", "avg_loan_value_eur", xs)
+    solved, method = solve_for("nb_clients_per_month", "avg_loan_value_eur", targets, BASE)
+    assert method == "bisection"
+    np.testing.assert_allclose(solved, xs, rtol=1e-9)
+
+
+def test_unreachable_and_flat_targets_are_nan():
+    solved, method = solve_for("nb_clients_per_month", "avg_loan_value_eur", [1e12, -1.0], BASE)
+    assert method == "bisection" and np.isnan(solved).all()
+    solved, method = solve_for("contribution_margin_pct", "loan_book_k", 1.0, BASE)  # ne dépend pas du loan book
+    assert method == "fermée" and np.isnan(solved)
+
+
+def test_iso_curves_hit_their_targets():
+    targets = np.array([0.0, 0.5, 1.0])
+    xs, ys = iso_curves("contribution_margin_pct", "revenu_pct", targets, "defaut_30j_pct", BASE, n=50)
+    assert ys.shape == (3, 50)
+    grid = {**BASE, "defaut_30j_pct": xs[np.newaxis, :], "revenu_pct": ys}
+    cm = compute_metrics(*(grid[k] for k in INPUT_KEYS))["contribution_margin_pct"]
+    np.testing.assert_allclose(cm, np.broadcast_to(targets[:, np.newaxis], cm.shape), atol=1e-9)
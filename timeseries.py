@@ -0,0 +1,101 @@
+"""
+Séries temporelles longues (historique de contribution margin) en colonnes NumPy.
+
+Une série = deux arrays alignés et triés : t (datetime64[D]) et y (float64),
+fenêtrés par recherche binaire. Fusion de sources (base de scénarios, ledger)
+et réduction LTTB à un budget de points fixe avant de passer la main à Altair :
+la taille du payload envoyé au navigateur ne dépend pas de la longueur de
+l'historique.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_POINTS = 500
+
+Series = Tuple[np.ndarray, np.ndarray]
+
+
+# --------------------------------------------------
+# CONSTRUCTION / FENÊTRE
+# --------------------------------------------------
+def empty_series() -> Series:
+    return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.float64)
+
+
+def series_from_frame(df: pd.DataFrame, value_col: str, date_col: Optional[str] = "date") -> Series:
+    """DataFrame (dates en colonne ou en index si date_col=None) -> (t, y) triés, une valeur par jour (la dernière)."""
+    if df is None or len(df) == 0:
+        return empty_series()
+    dates = df.index if date_col is None else df[date_col]
+    t = pd.to_datetime(dates).to_numpy(dtype="datetime64[D]")
+    y = pd.to_numeric(df[value_col], errors="coerce").to_numpy(dtype=np.float64)
+    keep = ~np.isnan(y)
+    return _dedup_sorted(t[keep], y[keep])
+
+
+def _dedup_sorted(t: np.ndarray, y: np.ndarray) -> Series:
+    """Tri stable par date ; sur une date en double, la dernière occurrence gagne."""
+    order = np.argsort(t, kind="stable")
+    t, y = t[order], y[order]
+    last = np.ones(len(t), dtype=bool)
+    last[:-1] = t[1:] != t[:-1]
+    return t[last], y[last]
+
+
+def merge_series(*series: Series) -> Series:
+    """Fusionne plusieurs séries ; sur une même date, la série passée en dernier gagne."""
+    series = [s for s in series if len(s[0])]
+    if not series:
+        return empty_series()
+    return _dedup_sorted(np.concatenate([s[0] for s in series]), np.concatenate([s[1] for s in series]))
+
+
+def window(series: Series, start=None, end=None) -> Series:
+    """Sous-série [start, end] par recherche binaire (vues, sans copie)."""
+    t, y = series
+    lo = 0 if start is None else np.searchsorted(t, np.datetime64(start, "D"), side="left")
+    hi = len(t) if end is None else np.searchsorted(t, np.datetime64(end, "D"), side="right")
+    return t[lo:hi], y[lo:hi]
+
+
+# --------------------------------------------------
+# DOWNSAMPLING
+# --------------------------------------------------
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets : indices des n_out points qui préservent
+    au mieux la forme de la courbe (premier et dernier point toujours gardés).
+    Une boucle Python par bucket, calcul vectorisé à l'intérieur : O(len(x)).
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # n_out - 2 buckets intérieurs
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # moyenne du bucket suivant (ou dernier point)
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def downsample(series: Series, max_points: int = DEFAULT_MAX_POINTS) -> Series:
+    t, y = series
+    idx = lttb_indices(t.astype(np.int64), y, max_points)
+    return t[idx], y[idx]
+
+
+def to_frame(series: Series, value_col: str) -> pd.DataFrame:
+    t, y = series
+    return pd.DataFrame({"date": t.astype("datetime64[ns]"), value_col: y})